@@ -16,7 +16,8 @@ export default function ChatScreen({ currentChatId }: ChatScreenProps) {
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const { messages, isLoading: isMessagesLoading } =
     useChatMessages(currentChatId);
-  const { streamMessage, isStreaming, streamingMessage } = useStreamMessage();
+  const { streamMessage, isStreaming, streamingMessage, queuePosition } =
+    useStreamMessage();
   const [isAtBottom, setIsAtBottom] = useState(true);
 
   // Handle scroll behavior
@@ -63,7 +64,12 @@ export default function ChatScreen({ currentChatId }: ChatScreenProps) {
         {messages?.items.map((message) => (
           <MessageItem key={message.id} message={message} />
         ))}
-        {isStreaming && <StreamingMessage content={streamingMessage} />}
+        {isStreaming && (
+          <StreamingMessage
+            content={streamingMessage}
+            queuePosition={queuePosition}
+          />
+        )}
         <div ref={messagesEndRef} />
       </div>
       {/* Scroll to bottom button */}
@@ -7,9 +7,13 @@ import {
 
 interface StreamingMessageProps {
   content: string;
+  queuePosition?: number | null;
 }
 
-export default function StreamingMessage({ content }: StreamingMessageProps) {
+export default function StreamingMessage({
+  content,
+  queuePosition,
+}: StreamingMessageProps) {
   return (
     <ChatBubble variant={"received"} className={"mr-auto"}>
       <ChatBubbleAvatar fallback={"AI"} />
@@ -18,6 +22,8 @@ export default function StreamingMessage({ content }: StreamingMessageProps) {
         <ChatBubbleMessage>
           <MessageContent content={content} />
         </ChatBubbleMessage>
+      ) : queuePosition ? (
+        <ChatBubbleMessage>Waiting in queue (#{queuePosition})...</ChatBubbleMessage>
       ) : (
         <ChatBubbleMessage isLoading={true}>...</ChatBubbleMessage>
       )}
@@ -1,7 +1,7 @@
 import { useQuery, useQueryClient } from '@tanstack/react-query';
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { chatService } from '@/services/chatService';
-import { API_BASE_URL } from '@/services/api';
+import { API_BASE_URL, apiClient } from '@/services/api';
 import type { Chat, Message, PaginatedResponse } from '@/types';
 
 export const useChatMessages = (chatId: string | null, page: number = 1) => {
@@ -18,10 +18,13 @@ export const useStreamMessage = () => {
     const queryClient = useQueryClient();
     const [isStreaming, setIsStreaming] = useState(false);
     const [streamingMessage, setStreamingMessage] = useState('');
+    const [queuePosition, setQueuePosition] = useState<number | null>(null);
+    const generationIdRef = useRef<string | null>(null);
 
     const streamMessage = async (chatId: string, message: string) => {
         setIsStreaming(true);
         setStreamingMessage('');
+        setQueuePosition(null);
 
         // Create optimistic user message
         const userMessage: Message = {
@@ -59,10 +62,16 @@ export const useStreamMessage = () => {
                         message: message,
                     }),
                 }).then(async (response) => {
+                    if (response.status === 429) {
+                        const retryAfter = response.headers.get('Retry-After');
+                        throw new Error(`The server is busy, please retry in ${retryAfter ?? 'a few'} seconds`);
+                    }
                     if (!response.ok) {
                         throw new Error('Failed to stream message');
                     }
 
+                    generationIdRef.current = response.headers.get('X-Generation-Id');
+
                     const reader = response.body?.getReader();
                     const decoder = new TextDecoder();
 
@@ -70,34 +79,62 @@ export const useStreamMessage = () => {
                         throw new Error('No reader available');
                     }
 
+                    // Partial line carried over between reads, plus the
+                    // event being assembled (multi-line data is joined
+                    // with newlines, as the SSE spec requires)
+                    let buffer = '';
+                    let eventType = 'message';
+                    let dataLines: string[] = [];
+
+                    // Returns true once the stream is finished
+                    const dispatch = (): boolean => {
+                        const type = eventType;
+                        const data = dataLines.join('\n');
+                        eventType = 'message';
+                        dataLines = [];
+
+                        if (type === 'queue') {
+                            setQueuePosition(JSON.parse(data).position);
+                            return false;
+                        }
+                        setQueuePosition(null);
+
+                        if (data === '[DONE]') {
+                            setIsStreaming(false);
+                            setStreamingMessage('');
+                            // Invalidate to fetch fresh messages from server
+                            queryClient.invalidateQueries({ queryKey: ['messages', chatId] });
+                            queryClient.invalidateQueries({ queryKey: ['chats'] });
+                            resolve();
+                            return true;
+                        } else if (data.startsWith('[ERROR]')) {
+                            setIsStreaming(false);
+                            setStreamingMessage('');
+                            reject(new Error(data));
+                            return true;
+                        } else if (data) {
+                            setStreamingMessage((prev) => prev + data);
+                        }
+                        return false;
+                    };
+
                     while (true) {
                         const { done, value } = await reader.read();
 
                         if (done) break;
 
-                        const chunk = decoder.decode(value);
-                        const lines = chunk.split('\n');
+                        buffer += decoder.decode(value, { stream: true });
+                        const lines = buffer.split(/\r\n|\r|\n/);
+                        buffer = lines.pop() ?? '';
 
                         for (const line of lines) {
-                            if (line.startsWith('data: ')) {
-                                const data = line.slice(6);
-
-                                if (data === '[DONE]') {
-                                    setIsStreaming(false);
-                                    setStreamingMessage('');
-                                    // Invalidate to fetch fresh messages from server
-                                    queryClient.invalidateQueries({ queryKey: ['messages', chatId] });
-                                    queryClient.invalidateQueries({ queryKey: ['chats'] });
-                                    resolve();
-                                    return;
-                                } else if (data.startsWith('[ERROR]')) {
-                                    setIsStreaming(false);
-                                    setStreamingMessage('');
-                                    reject(new Error(data));
-                                    return;
-                                } else if (data) {
-                                    setStreamingMessage((prev) => prev + data);
-                                }
+                            if (line === '') {
+                                if (dataLines.length && dispatch()) return;
+                            } else if (line.startsWith('event:')) {
+                                eventType = line.slice(6).trim();
+                            } else if (line.startsWith('data:')) {
+                                // One optional space after the colon is not part of the data
+                                dataLines.push(line.slice(line.startsWith('data: ') ? 6 : 5));
                             }
                         }
                     }
@@ -114,9 +151,19 @@ export const useStreamMessage = () => {
         });
     };
 
+    // Stop the current response; the server saves what was generated so far
+    const cancelStream = async () => {
+        const generationId = generationIdRef.current;
+        if (!generationId) return;
+        generationIdRef.current = null;
+        await apiClient.post(`/messages/stream/${generationId}/cancel`).catch(() => undefined);
+    };
+
     return {
         streamMessage,
+        cancelStream,
         isStreaming,
         streamingMessage,
+        queuePosition,
     };
 };
\ No newline at end of file
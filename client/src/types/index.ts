@@ -18,6 +18,7 @@ export interface Chat {
     created_at: string;
     updated_at: string;
     message_count: number;
+    last_message_at?: string;
 }
 
 export interface Message {
@@ -26,6 +27,7 @@ export interface Message {
     role: 'user' | 'assistant' | 'system';
     content: string;
     tokens: number;
+    truncated?: boolean;
     created_at: string;
 }
 
@@ -54,6 +56,7 @@ export interface PaginatedResponse<T> {
     page: number;
     page_size: number;
     total_pages: number;
+    next_cursor?: string | null;
 }
 
 export interface ErrorResponse {
@@ -6,7 +6,7 @@ from sqlmodel import SQLModel
 from alembic import context
 
 from app.core.config import settings
-from app.models import user, chat, message
+from app.models import user, chat, message, message_embedding
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -25,6 +25,20 @@ config.set_main_option('sqlalchemy.url', settings.DATABASE_URL)
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
+# Full-text search objects created by hand in migrations and not part of
+# the models: the Postgres generated tsvector column and its GIN index,
+# and the SQLite FTS5 table (plus its shadow tables).
+SEARCH_OBJECTS = {"search_vector", "ix_messages_search_vector"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if name in SEARCH_OBJECTS:
+        return False
+    if type_ == "table" and name.startswith("messages_fts"):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +61,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -70,7 +85,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,37 @@
+"""add message embeddings
+
+Revision ID: 268019736118
+Revises: e3b7a2d94c10
+Create Date: 2026-10-18 15:21:02.492501
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '268019736118'
+down_revision: Union[str, Sequence[str], None] = 'e3b7a2d94c10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('message_embeddings',
+    sa.Column('message_id', sa.Uuid(), nullable=False),
+    sa.Column('model', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+    sa.Column('dim', sa.Integer(), nullable=False),
+    sa.Column('vector', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('message_id', 'model')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('message_embeddings')
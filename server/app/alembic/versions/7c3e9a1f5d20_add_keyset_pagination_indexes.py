@@ -0,0 +1,39 @@
+"""add keyset pagination indexes
+
+Revision ID: 7c3e9a1f5d20
+Revises: bed17f9d4775
+Create Date: 2026-10-18 15:42:07.501836
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e9a1f5d20'
+down_revision: Union[str, Sequence[str], None] = 'bed17f9d4775'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Build concurrently on Postgres so large tables stay writable
+    with op.get_context().autocommit_block():
+        op.create_index('ix_messages_chat_id_created_at_id', 'messages', ['chat_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_chats_user_id_updated_at_id', 'chats', ['user_id', 'updated_at', 'id'], unique=False, postgresql_concurrently=True)
+
+    # The composite indexes lead with the same column, so these are redundant
+    op.drop_index(op.f('ix_messages_chat_id'), table_name='messages')
+    op.drop_index(op.f('ix_chats_user_id'), table_name='chats')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_chats_user_id'), 'chats', ['user_id'], unique=False)
+    op.create_index(op.f('ix_messages_chat_id'), 'messages', ['chat_id'], unique=False)
+    op.drop_index('ix_chats_user_id_updated_at_id', table_name='chats')
+    op.drop_index('ix_messages_chat_id_created_at_id', table_name='messages')
@@ -0,0 +1,74 @@
+"""cascade deletes in database
+
+Revision ID: 9d1e6f3a7b52
+Revises: 268019736118
+Create Date: 2026-10-18 21:08:44.530917
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1e6f3a7b52'
+down_revision: Union[str, Sequence[str], None] = '268019736118'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Names SQLite's unnamed foreign keys get while batch mode rebuilds the table
+NAMING_CONVENTION = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+# Rebuilding messages on SQLite drops its triggers; these keep the
+# full-text index (e3b7a2d94c10) in step and must be re-created
+SQLITE_FTS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts (content, message_id) VALUES (new.content, new.id); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN "
+    "DELETE FROM messages_fts WHERE message_id = old.id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN "
+    "UPDATE messages_fts SET content = new.content WHERE message_id = old.id; "
+    "END",
+]
+
+FOREIGN_KEYS = [
+    ('chats', 'user_id', 'users'),
+    ('messages', 'chat_id', 'chats'),
+]
+
+
+def _foreign_key_name(table: str, column: str, referred: str) -> str:
+    """Existing constraint name (Postgres), or the convention name (SQLite)."""
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if fk['constrained_columns'] == [column] and fk['name']:
+            return fk['name']
+    return f'fk_{table}_{column}_{referred}'
+
+
+def _replace_foreign_keys(ondelete: Optional[str]) -> None:
+    for table, column, referred in FOREIGN_KEYS:
+        name = _foreign_key_name(table, column, referred)
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(
+                name, referred, [column], ['id'], ondelete=ondelete)
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in SQLITE_FTS_TRIGGERS:
+            op.execute(trigger)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_foreign_keys(None)
@@ -0,0 +1,33 @@
+"""add chat rolling summary
+
+Revision ID: a41f0c6b2e97
+Revises: 7c3e9a1f5d20
+Create Date: 2026-10-18 16:20:51.930417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f0c6b2e97'
+down_revision: Union[str, Sequence[str], None] = '7c3e9a1f5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chats', sa.Column('summary', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.add_column('chats', sa.Column('summary_tokens', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chats', sa.Column('summarized_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chats', 'summarized_until')
+    op.drop_column('chats', 'summary_tokens')
+    op.drop_column('chats', 'summary')
@@ -0,0 +1,41 @@
+"""add chat summarized_until_id
+
+Revision ID: b8e4d2c6f150
+Revises: f2a9c7d31e08
+Create Date: 2026-10-18 17:05:12.418903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4d2c6f150'
+down_revision: Union[str, Sequence[str], None] = 'f2a9c7d31e08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chats', sa.Column('summarized_until_id', sa.Uuid(), nullable=True))
+    # Everything at summarized_until counted as summarized; keep it that way
+    op.execute(
+        """
+        UPDATE chats SET summarized_until_id = (
+            SELECT messages.id FROM messages
+            WHERE messages.chat_id = chats.id
+                AND messages.created_at = chats.summarized_until
+            ORDER BY messages.id DESC
+            LIMIT 1
+        )
+        WHERE summarized_until IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chats', 'summarized_until_id')
@@ -0,0 +1,44 @@
+"""add chat message counters
+
+Revision ID: bed17f9d4775
+Revises: 4fd717b24a64
+Create Date: 2026-10-18 15:10:24.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bed17f9d4775'
+down_revision: Union[str, Sequence[str], None] = '4fd717b24a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chats', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chats', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+
+    # Backfill counters for existing chats
+    op.execute(
+        """
+        UPDATE chats SET
+            message_count = (
+                SELECT count(*) FROM messages WHERE messages.chat_id = chats.id
+            ),
+            last_message_at = (
+                SELECT max(messages.created_at) FROM messages WHERE messages.chat_id = chats.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chats', 'last_message_at')
+    op.drop_column('chats', 'message_count')
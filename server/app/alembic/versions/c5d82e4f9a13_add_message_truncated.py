@@ -0,0 +1,29 @@
+"""add message truncated
+
+Revision ID: c5d82e4f9a13
+Revises: a41f0c6b2e97
+Create Date: 2026-10-18 17:05:12.402981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d82e4f9a13'
+down_revision: Union[str, Sequence[str], None] = 'a41f0c6b2e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('messages', sa.Column('truncated', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('messages', 'truncated')
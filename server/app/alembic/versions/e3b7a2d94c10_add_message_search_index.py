@@ -0,0 +1,70 @@
+"""add message search index
+
+Revision ID: e3b7a2d94c10
+Revises: c5d82e4f9a13
+Create Date: 2026-10-18 19:42:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7a2d94c10'
+down_revision: Union[str, Sequence[str], None] = 'c5d82e4f9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        # Generated column: kept current on every insert/update by Postgres
+        op.execute(
+            "ALTER TABLE messages ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', content)) STORED"
+        )
+        op.execute(
+            "CREATE INDEX ix_messages_search_vector ON messages "
+            "USING GIN (search_vector)"
+        )
+        return
+
+    # SQLite: external FTS5 table maintained by triggers
+    op.execute(
+        "CREATE VIRTUAL TABLE messages_fts USING fts5(content, message_id UNINDEXED)"
+    )
+    op.execute(
+        "CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN "
+        "INSERT INTO messages_fts (content, message_id) VALUES (new.content, new.id); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN "
+        "DELETE FROM messages_fts WHERE message_id = old.id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN "
+        "UPDATE messages_fts SET content = new.content WHERE message_id = old.id; "
+        "END"
+    )
+    op.execute(
+        "INSERT INTO messages_fts (content, message_id) SELECT content, id FROM messages"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX ix_messages_search_vector")
+        op.drop_column('messages', 'search_vector')
+        return
+
+    op.execute("DROP TRIGGER messages_fts_update")
+    op.execute("DROP TRIGGER messages_fts_delete")
+    op.execute("DROP TRIGGER messages_fts_insert")
+    op.execute("DROP TABLE messages_fts")
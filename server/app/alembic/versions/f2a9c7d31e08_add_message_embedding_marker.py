@@ -0,0 +1,41 @@
+"""add message embedding marker
+
+Revision ID: f2a9c7d31e08
+Revises: 9d1e6f3a7b52
+Create Date: 2026-10-19 10:12:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlmodel
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a9c7d31e08'
+down_revision: Union[str, Sequence[str], None] = '9d1e6f3a7b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('messages', sa.Column('embedded_model', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True))
+    # Messages embedded before the marker existed are not pending
+    op.execute(
+        "UPDATE messages SET embedded_model = ("
+        "SELECT MIN(model) FROM message_embeddings"
+        " WHERE message_embeddings.message_id = messages.id)"
+    )
+    op.create_index(
+        'ix_messages_embedding_pending', 'messages', ['created_at', 'id'], unique=False,
+        sqlite_where=sa.text('embedded_model IS NULL'),
+        postgresql_where=sa.text('embedded_model IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_embedding_pending', table_name='messages')
+    op.drop_column('messages', 'embedded_model')
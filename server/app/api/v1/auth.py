@@ -9,25 +9,25 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
     user_data: UserCreate,
     session: SessionDep
 ):
     """Register a new user."""
     auth_service = AuthService(session)
-    user = auth_service.register_user(user_data)
+    user = await auth_service.register_user(user_data)
     return user
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     credentials: UserLogin,
     session: SessionDep
 ):
     """Login and get access tokens."""
     auth_service = AuthService(session)
 
-    user = auth_service.authenticate_user(
+    user = await auth_service.authenticate_user(
         credentials.username,
         credentials.password
     )
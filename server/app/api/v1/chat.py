@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
+from typing import Optional
 from uuid import UUID
 from app.core.database import SessionDep
 from app.models.user import User
@@ -7,9 +9,13 @@ from app.schemas.chat import (
     ChatCreate,
     ChatUpdate,
     ChatResponse,
-    ChatListResponse
+    ChatListResponse,
+    ChatBulkDelete,
+    ChatBulkDeleteResponse,
+    ChatImportResponse
 )
 from app.services.chat_service import ChatService
+from app.services.chat_transfer_service import ChatTransferService
 from app.core.dependencies import CurrentUserDep
 import math
 
@@ -26,13 +32,7 @@ def create_chat(
     chat_service = ChatService(session)
     chat = chat_service.create_chat(chat_data, current_user)
 
-    # Add message count
-    message_count = chat_service.get_message_count(chat.id)
-
-    response = ChatResponse.model_validate(chat)
-    response.message_count = message_count
-
-    return response
+    return ChatResponse.model_validate(chat)
 
 
 @router.get("", response_model=ChatListResponse)
@@ -41,27 +41,90 @@ def get_chats(
     current_user: CurrentUserDep,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page; overrides page"),
+    include_total: bool = Query(True),
 ):
-    """Get paginated list of user's chats."""
+    """
+    Get paginated list of user's chats.
+    Follow next_cursor for keyset pagination; page/offset is kept for compatibility.
+    """
     chat_service = ChatService(session)
-    chats, total = chat_service.get_user_chats(current_user, page, page_size)
+    chats, total, next_cursor = chat_service.get_user_chats(
+        current_user, page, page_size, cursor, include_total)
 
-    # Add message counts
-    chat_responses = []
-    for chat in chats:
-        response = ChatResponse.model_validate(chat)
-        response.message_count = chat_service.get_message_count(chat.id)
-        chat_responses.append(response)
+    total_pages = None
+    if total is not None:
+        total_pages = math.ceil(total / page_size) if total > 0 else 0
 
     return ChatListResponse(
-        items=chat_responses,
+        items=[ChatResponse.model_validate(chat) for chat in chats],
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=math.ceil(total / page_size) if total > 0 else 0
+        total_pages=total_pages,
+        next_cursor=next_cursor
+    )
+
+
+@router.delete("", response_model=ChatBulkDeleteResponse)
+def delete_chats(
+    request: ChatBulkDelete,
+    session: SessionDep,
+    current_user: CurrentUserDep,
+):
+    """
+    Delete many chats in one statement.
+    Ids that don't exist or aren't yours are ignored; returns how many went.
+    """
+    chat_service = ChatService(session)
+    deleted = chat_service.delete_chats(request.ids, current_user)
+
+    return ChatBulkDeleteResponse(deleted=deleted)
+
+
+@router.get("/export")
+async def export_chats(
+    session: SessionDep,
+    current_user: CurrentUserDep,
+):
+    """
+    Export all of the user's chats and messages as NDJSON.
+    Streamed from a server-side cursor, so memory use stays flat.
+    """
+    # The export reads through its own session; don't hold this
+    # connection for the whole download
+    session.close()
+    return StreamingResponse(
+        ChatTransferService().export_chats(current_user),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="chats.ndjson"'}
     )
 
 
+@router.post(
+    "/import",
+    response_model=ChatImportResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def import_chats(
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUserDep,
+):
+    """
+    Import chats from an NDJSON export sent as the request body.
+    The upload is parsed as it arrives and inserted in batches; if the
+    import fails part way nothing of it is kept. Chats and messages get
+    new ids.
+    """
+    session.close()
+    chats, messages = await ChatTransferService().import_chats(
+        current_user, request.stream())
+
+    return ChatImportResponse(chats=chats, messages=messages)
+
+
 @router.get("/{chat_id}", response_model=ChatResponse)
 def get_chat(
     chat_id: UUID,
@@ -72,10 +135,7 @@ def get_chat(
     chat_service = ChatService(session)
     chat = chat_service.get_chat(chat_id, current_user)
 
-    response = ChatResponse.model_validate(chat)
-    response.message_count = chat_service.get_message_count(chat.id)
-
-    return response
+    return ChatResponse.model_validate(chat)
 
 
 @router.put("/{chat_id}", response_model=ChatResponse)
@@ -89,10 +149,7 @@ def update_chat(
     chat_service = ChatService(session)
     chat = chat_service.update_chat(chat_id, chat_data, current_user)
 
-    response = ChatResponse.model_validate(chat)
-    response.message_count = chat_service.get_message_count(chat.id)
-
-    return response
+    return ChatResponse.model_validate(chat)
 
 
 @router.delete("/{chat_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,14 +1,79 @@
-from fastapi import APIRouter, Query
-from fastapi.responses import StreamingResponse
+import json
+from fastapi import APIRouter, Query, status
+from typing import Optional
 from uuid import UUID
+from app.core.config import settings
 from app.core.database import SessionDep
-from app.schemas.message import MessageListResponse, MessageResponse, StreamMessageRequest
+from app.schemas.message import (
+    MessageListResponse,
+    MessageResponse,
+    MessageSearchResponse,
+    MessageSearchResult,
+    StreamMessageRequest
+)
+from app.services.generation_registry import generation_registry
 from app.services.message_service import MessageService
-from app.core.dependencies import CurrentUserDep
+from app.core.dependencies import CurrentUserDep, OllamaServiceDep
+from app.utils.exceptions import NotFoundException
+from app.utils.sse import EventStreamResponse, coalesce, encode_event
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
 
+@router.get("/search", response_model=MessageSearchResponse)
+def search_messages(
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page"),
+):
+    """
+    Full-text search over messages in the current user's chats.
+    Results are ranked by relevance; follow next_cursor for more.
+    """
+    message_service = MessageService(session)
+    hits, next_cursor = message_service.search_messages(
+        current_user, q, limit, cursor)
+
+    return MessageSearchResponse(
+        items=[
+            MessageSearchResult(
+                **MessageResponse.model_validate(msg).model_dump(), rank=rank)
+            for msg, rank in hits
+        ],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/semantic-search", response_model=MessageSearchResponse)
+async def semantic_search_messages(
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    ollama_service: OllamaServiceDep,
+    q: str = Query(..., min_length=1, max_length=2000),
+    k: int = Query(10, ge=1, le=50),
+    chat_id: Optional[UUID] = Query(None, description="Only search this chat"),
+):
+    """
+    Find the current user's messages most similar in meaning to `q`.
+    `rank` is the cosine similarity. Requires SEMANTIC_SEARCH_ENABLED.
+    """
+    # Embedding the query awaits Ollama; lookups use their own short sessions
+    session.close()
+    message_service = MessageService(session, ollama_service)
+    hits = await message_service.find_similar_messages(current_user, q, k, chat_id)
+
+    return MessageSearchResponse(
+        items=[
+            MessageSearchResult(
+                **MessageResponse.model_validate(msg).model_dump(), rank=score)
+            for msg, score in hits
+        ]
+    )
+
+
 @router.get("/chat/{chat_id}", response_model=MessageListResponse)
 def get_chat_messages(
     chat_id: UUID,
@@ -16,19 +81,28 @@ def get_chat_messages(
     current_user: CurrentUserDep,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page; overrides page"),
+    include_total: bool = Query(True),
 ):
-    """Get paginated messages for a chat."""
+    """
+    Get paginated messages for a chat.
+    Follow next_cursor for keyset pagination; page/offset is kept for compatibility.
+    """
     message_service = MessageService(session)
-    messages, total = message_service.get_chat_messages(
+    messages, total, next_cursor = message_service.get_chat_messages(
         chat_id,
         current_user,
         page,
-        page_size
+        page_size,
+        cursor,
+        include_total
     )
 
     return MessageListResponse(
         items=[MessageResponse.model_validate(msg) for msg in messages],
-        total=total
+        total=total,
+        next_cursor=next_cursor
     )
 
 
@@ -37,35 +111,79 @@ async def stream_message(
     request: StreamMessageRequest,
     session: SessionDep,
     current_user: CurrentUserDep,
+    ollama_service: OllamaServiceDep,
 ):
     """
     Send a message and stream the AI response.
     Returns Server-Sent Events (SSE) stream.
+    The X-Generation-Id header identifies the generation for cancelling.
+    While waiting for a free slot, `queue` events report the position.
     """
-    message_service = MessageService(session)
+    # Hand the request session's connection back to the pool before
+    # streaming; generation opens its own short sessions as needed.
+    session.close()
+    message_service = MessageService(session, ollama_service)
+
+    # Rejected with 429 here, before the stream starts, when the
+    # model's wait queue is full
+    ticket = await message_service.admit_generation(request.chat_id, current_user)
+    generation = generation_registry.start(current_user.id, request.chat_id)
 
     async def event_generator():
         try:
-            async for chunk in message_service.generate_ai_response(
-                request.chat_id,
-                request.message,
-                current_user
-            ):
-                # Send as SSE format
-                yield f"data: {chunk}\n\n"
+            # Tell the client where it stands while waiting for a slot
+            async for position in generation.until_cancelled(ticket.wait()):
+                yield encode_event(json.dumps({"position": position}), event="queue")
+
+            if not generation.cancel_requested.is_set():
+                # Batch token-sized chunks into fewer, larger frames
+                async for chunk in coalesce(
+                    message_service.generate_ai_response(
+                        request.chat_id,
+                        request.message,
+                        current_user,
+                        generation,
+                        ticket
+                    ),
+                    max_latency=settings.SSE_COALESCE_MS / 1000,
+                    max_size=settings.SSE_MAX_FRAME_CHARS
+                ):
+                    # Send as SSE format
+                    yield encode_event(chunk)
 
             # Send completion signal
-            yield "data: [DONE]\n\n"
+            yield encode_event("[DONE]")
 
         except Exception as e:
-            yield f"data: [ERROR] {str(e)}\n\n"
+            yield encode_event(f"[ERROR] {str(e)}")
 
-    return StreamingResponse(
+    def release():
+        ticket.release()
+        generation_registry.finish(generation)
+
+    return EventStreamResponse(
         event_generator(),
-        media_type="text/event-stream",
+        on_close=release,
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"
+            "X-Accel-Buffering": "no",
+            "X-Generation-Id": str(generation.id)
         }
     )
+
+
+@router.post(
+    "/stream/{generation_id}/cancel",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def cancel_stream(
+    generation_id: UUID,
+    current_user: CurrentUserDep,
+):
+    """
+    Stop an in-progress AI response.
+    The partial reply is saved and marked as truncated.
+    """
+    if not generation_registry.cancel(generation_id, current_user.id):
+        raise NotFoundException("Generation not found")
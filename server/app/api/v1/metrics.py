@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from app.core.dependencies import CurrentSuperuserDep
+from app.core.metrics import collect_metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("")
+def get_metrics(current_user: CurrentSuperuserDep):
+    """In-process cache and generation metrics (superusers only)."""
+    return collect_metrics()
@@ -3,14 +3,15 @@ from typing import List
 from app.schemas.ollama import (
     ModelResponse
 )
-from app.services.ollama_service import OllamaService
+from app.core.dependencies import OllamaServiceDep
+from app.services.model_catalog import model_catalog
 
 router = APIRouter(prefix="/ollama", tags=["Ollama"])
 
 @router.get("/models", response_model=List[ModelResponse])
-async def get_ollama_models():
-    """Get all available ollama models."""
-    ollama_service = OllamaService()
-    models = await ollama_service.list_models()
-    print("Modrlks: ", models)
-    return models
\ No newline at end of file
+async def get_ollama_models(ollama_service: OllamaServiceDep):
+    """
+    Get all available ollama models.
+    Served from the in-process catalog, refreshed in the background.
+    """
+    return await model_catalog.get(ollama_service)
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+Recount chats.message_count and chats.last_message_at from the messages
+table and repair any drift.
+
+Usage:
+    python -m app.commands.repair_chat_counters [--dry-run]
+"""
+import argparse
+
+from app.core.database import session_scope
+from app.repositories.chat_repository import ChatRepository
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Recount chat message counters and repair drift.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report how many chats have drifted."
+    )
+    args = parser.parse_args()
+
+    with session_scope() as session:
+        chat_repo = ChatRepository(session)
+
+        if args.dry_run:
+            drifted = chat_repo.count_counter_drift()
+            print(f"{drifted} chat(s) with drifted message counters")
+            return
+
+        repaired = chat_repo.repair_counter_drift()
+        print(f"Repaired message counters for {repaired} chat(s)")
+
+
+if __name__ == "__main__":
+    main()
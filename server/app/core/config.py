@@ -1,3 +1,4 @@
+from typing import Optional, Union
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,17 +11,137 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    # Use the asyncio engine (asyncpg) for the streaming path; defaults to
+    # DATABASE_URL with an async driver when ASYNC_DATABASE_URL is unset
+    ASYNC_DATABASE: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Cache COUNT(*) results per filter set; 0 disables the cache
+    COUNT_CACHE_TTL_SECONDS: float = 0.0
+    COUNT_CACHE_MAX_ENTRIES: int = 10_000
 
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # In-process caches for authenticated requests; 0 TTL disables them
+    AUTH_USER_CACHE_TTL_SECONDS: float = 30.0
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 10_000
+    AUTH_TOKEN_CACHE_TTL_SECONDS: float = 300.0
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = 10_000
+    # Password hashing runs in its own bounded pool, off the request threadpool;
+    # changing the bcrypt cost rehashes passwords on next login
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 2
 
     # Ollama
     OLLAMA_BASE_URL: str = "http://localhost:11434"
+    # Several backends to route between; overrides OLLAMA_BASE_URL
+    OLLAMA_BASE_URLS: list[str] = []
     DEFAULT_MODEL: str = "llama2"
 
+    # Ollama HTTP client (shared connection pool)
+    OLLAMA_MAX_CONNECTIONS: int = 100
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OLLAMA_KEEPALIVE_EXPIRY: float = 30.0
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_READ_TIMEOUT: float = 120.0
+    OLLAMA_WRITE_TIMEOUT: float = 10.0
+    OLLAMA_POOL_TIMEOUT: float = 10.0
+
+    # Model residency: keep_alive sent with every /api/chat call
+    # (per-model overrides in MODEL_KEEP_ALIVE, e.g. "30m" or -1 for
+    # forever) and models loaded at startup
+    OLLAMA_KEEP_ALIVE: Optional[Union[str, int]] = None
+    MODEL_KEEP_ALIVE: dict[str, Union[str, int]] = {}
+    PRELOAD_MODELS: list[str] = []
+    # Interval of the /api/ps poll, which is also the backend health check
+    LOADED_MODELS_REFRESH_SECONDS: float = 15.0
+
+    # Backend routing: eject after consecutive failures, re-admit after
+    # passing checks; chats stick to a backend unless it is this many
+    # requests busier than the least loaded one
+    OLLAMA_UNHEALTHY_AFTER_FAILURES: int = 2
+    OLLAMA_HEALTHY_AFTER_SUCCESSES: int = 1
+    OLLAMA_AFFINITY_SLACK: int = 2
+    OLLAMA_AFFINITY_TTL_SECONDS: float = 900.0
+    OLLAMA_AFFINITY_MAX_ENTRIES: int = 10000
+
+    # Cached Ollama model list (stale-while-revalidate)
+    MODEL_CATALOG_TTL_SECONDS: float = 60.0
+    MODEL_CATALOG_REFRESH_SECONDS: float = 60.0
+    MODEL_CATALOG_RETRY_AFTER_SECONDS: int = 5
+
+    # Conversation context sent to the model
+    CONTEXT_TOKEN_BUDGET: int = 4096
+    MODEL_CONTEXT_BUDGETS: dict[str, int] = {}
+    CONTEXT_MAX_MESSAGES: int = 200
+    # "heuristic" is a len/4 estimate, not a tokenizer: leave headroom in the budgets
+    TOKEN_ESTIMATOR: str = "heuristic"
+
+    # Rolling conversation summary (built in the background)
+    SUMMARY_ENABLED: bool = True
+    SUMMARY_TRIGGER_TOKENS: int = 2048
+    SUMMARY_KEEP_MESSAGES: int = 8
+    SUMMARY_MODEL: Optional[str] = None
+
+    # Semantic search over past messages (opt-in; needs numpy). Messages
+    # are embedded in the background with EMBEDDING_MODEL; EMBEDDER
+    # "fake" is a deterministic offline embedder for tests and demos
+    SEMANTIC_SEARCH_ENABLED: bool = False
+    EMBEDDER: str = "ollama"
+    EMBEDDING_MODEL: str = "nomic-embed-text"
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_POLL_SECONDS: float = 30.0
+    # A message whose embedding fails this many times is skipped until
+    # restart, so one bad message cannot hold up the queue behind it
+    EMBEDDING_MAX_ATTEMPTS: int = 3
+    # In-process vector index: per-user partitions kept in an LRU; exact
+    # search until a partition reaches VECTOR_INDEX_ANN_THRESHOLD
+    # vectors (0 disables), then an IVF index probing VECTOR_INDEX_NPROBE
+    # clusters
+    VECTOR_INDEX_MAX_USERS: int = 1000
+    VECTOR_INDEX_TTL_SECONDS: float = 3600.0
+    VECTOR_INDEX_ANN_THRESHOLD: int = 20000
+    VECTOR_INDEX_NPROBE: int = 8
+    # Inject up to RETRIEVAL_TOP_K related earlier messages (0 disables)
+    # scoring at least RETRIEVAL_MIN_SCORE into the generation context
+    RETRIEVAL_TOP_K: int = 0
+    RETRIEVAL_MIN_SCORE: float = 0.5
+    RETRIEVAL_MAX_TOKENS: int = 512
+
+    # Rows per server-side cursor fetch (export) and per multi-row
+    # INSERT (import) for NDJSON chat export/import
+    TRANSFER_BATCH_SIZE: int = 1000
+
+    # Exact-match generation cache (opt-in)
+    GENERATION_CACHE_ENABLED: bool = False
+    GENERATION_CACHE_TTL_SECONDS: float = 3600.0
+    GENERATION_CACHE_MAX_ENTRIES: int = 1000
+
+    # Generation scheduling: concurrent generations per model and backend
+    # (overrides in MODEL_CONCURRENCY) and a bounded, per-user fair wait
+    # queue
+    GENERATION_CONCURRENCY_PER_MODEL: int = 4
+    MODEL_CONCURRENCY: dict[str, int] = {}
+    GENERATION_QUEUE_SIZE: int = 64
+    GENERATION_QUEUE_PER_USER: int = 4
+    GENERATION_RETRY_AFTER_SECONDS: int = 5
+    # Concurrent generations for a model Ollama has not loaded yet; the
+    # rest wait for it to become warm instead of piling onto the load
+    COLD_MODEL_CONCURRENCY: int = 1
+
+    # SSE streaming: hold chunks up to this long (0 disables) or until a
+    # frame reaches SSE_MAX_FRAME_CHARS before writing them out
+    SSE_COALESCE_MS: float = 30.0
+    SSE_MAX_FRAME_CHARS: int = 2048
+
+    # JSON backend for API responses and Ollama stream parsing:
+    # "auto" uses orjson when installed, "stdlib" forces the json module
+    JSON_BACKEND: str = "auto"
+
     # CORS
     CORS_ORIGINS: list[str] = [
         "http://localhost:5173", "http://localhost:3000"]
@@ -1,16 +1,48 @@
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import Depends
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine, Session
-from typing import Annotated, Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated, AsyncGenerator, Generator, Optional, Union
 
 from app.core.config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
-)
+SQLITE_BUSY_TIMEOUT_MS = 30_000
+
+
+def _configure_sqlite(engine: Engine) -> None:
+    """
+    SQLite ignores foreign keys (and so ON DELETE CASCADE) unless asked.
+    Writers also queue for its single write lock; the driver's default 5 s
+    wait is too short for a burst of streamed turns finishing together.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+def create_database_engine(url: str, use_async: bool = False) -> Union[Engine, AsyncEngine]:
+    """Pooled engine for `url`, sync or async, configured the same way."""
+    create = create_async_engine if use_async else create_engine
+    db_engine = create(
+        url,
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20
+    )
+    _configure_sqlite(db_engine.sync_engine if use_async else db_engine)
+    return db_engine
+
+
+engine = create_database_engine(settings.DATABASE_URL)
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -19,3 +51,44 @@ def get_session() -> Generator[Session, None, None]:
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
+
+
+@contextmanager
+def session_scope() -> Generator[Session, None, None]:
+    """
+    Short-lived session for work that runs outside the request lifecycle,
+    such as the phases of a streamed response. The pooled connection is
+    returned as soon as the block exits.
+    """
+    with Session(engine) as session:
+        yield session
+
+
+def get_async_database_url() -> str:
+    """Async driver URL, derived from DATABASE_URL unless set explicitly."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+
+    url = settings.DATABASE_URL
+    for prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+async_engine: Optional[AsyncEngine] = (
+    create_database_engine(get_async_database_url(), use_async=True)
+    if settings.ASYNC_DATABASE
+    else None
+)
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncGenerator[AsyncSession, None]:
+    """Async counterpart of `session_scope` for use on the event loop."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
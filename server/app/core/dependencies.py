@@ -3,9 +3,11 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Annotated
 
 from app.core.database import SessionDep
+from app.core.http_client import HttpClientDep
 from app.models.user import User
 from app.services.auth_service import AuthService
-from app.utils.exceptions import AuthenticationException
+from app.services.ollama_service import OllamaService
+from app.utils.exceptions import AuthenticationException, ForbiddenException
 
 security = HTTPBearer()
 
@@ -29,3 +31,21 @@ def get_current_user(
 
 
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
+
+
+def get_current_superuser(current_user: CurrentUserDep) -> User:
+    """Dependency restricting an endpoint to superusers."""
+    if not current_user.is_superuser:
+        raise ForbiddenException("Superuser privileges required")
+    return current_user
+
+
+CurrentSuperuserDep = Annotated[User, Depends(get_current_superuser)]
+
+
+def get_ollama_service(client: HttpClientDep) -> OllamaService:
+    """Dependency to get an Ollama service bound to the shared HTTP client."""
+    return OllamaService(client)
+
+
+OllamaServiceDep = Annotated[OllamaService, Depends(get_ollama_service)]
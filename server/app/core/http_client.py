@@ -0,0 +1,33 @@
+import httpx
+from fastapi import Depends, Request
+from typing import Annotated
+
+from app.core.config import settings
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the app-wide pooled HTTP client used to talk to Ollama.
+    Connections are kept alive between requests so chat turns skip the TCP handshake.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.OLLAMA_CONNECT_TIMEOUT,
+            read=settings.OLLAMA_READ_TIMEOUT,
+            write=settings.OLLAMA_WRITE_TIMEOUT,
+            pool=settings.OLLAMA_POOL_TIMEOUT,
+        ),
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Dependency returning the shared client created in the app lifespan."""
+    return request.app.state.http_client
+
+
+HttpClientDep = Annotated[httpx.AsyncClient, Depends(get_http_client)]
@@ -0,0 +1,14 @@
+from typing import Any, Callable
+
+# name -> zero-argument callable returning a JSON-serializable snapshot
+_providers: dict[str, Callable[[], dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], dict[str, Any]]) -> None:
+    """Register an in-process metrics snapshot under `name`."""
+    _providers[name] = provider
+
+
+def collect_metrics() -> dict[str, dict[str, Any]]:
+    """Snapshot every registered metrics provider."""
+    return {name: provider() for name, provider in _providers.items()}
@@ -1,13 +1,57 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.api.v1 import auth, user, chat, message, ollama
+from app.core.database import async_engine
+from app.core.http_client import create_http_client
+from app.services.message_service import wait_for_pending_saves
+from app.services.model_catalog import model_catalog
+from app.services.model_residency import model_residency
+from app.services.ollama_service import OllamaService
+from app.services.semantic_search import semantic_search
+from app.services.summary_service import cancel_pending_summaries
+from app.utils.fast_json import FastJSONResponse
+from app.utils.security import shutdown_password_executor
+from app.api.v1 import auth, user, chat, message, ollama, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown."""
+    app.state.http_client = create_http_client()
+    ollama_service = OllamaService(app.state.http_client)
+
+    # Model list, residency tracking and PRELOAD_MODELS warm-up run in
+    # the background so startup never waits on Ollama
+    background = [
+        asyncio.create_task(model_catalog.run_refresher(ollama_service)),
+        asyncio.create_task(model_residency.run_refresher(ollama_service)),
+    ]
+    if semantic_search.enabled:
+        background.append(
+            asyncio.create_task(semantic_search.run_indexer(ollama_service)))
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await wait_for_pending_saves()
+        await cancel_pending_summaries()
+        await app.state.http_client.aclose()
+        shutdown_password_executor()
+        if async_engine is not None:
+            await async_engine.dispose()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
     version=settings.PROJECT_VERSION,
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 # CORS Configuration
 app.add_middleware(
@@ -16,6 +60,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Generation-Id"],
 )
 
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
@@ -23,6 +68,7 @@ app.include_router(user.router, prefix=settings.API_V1_PREFIX)
 app.include_router(chat.router, prefix=settings.API_V1_PREFIX)
 app.include_router(message.router, prefix=settings.API_V1_PREFIX)
 app.include_router(ollama.router, prefix=settings.API_V1_PREFIX)
+app.include_router(metrics.router, prefix=settings.API_V1_PREFIX)
 
 
 @app.get("/")
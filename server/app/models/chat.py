@@ -1,7 +1,11 @@
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime, timezone
 from uuid import UUID, uuid4
+from app.core.config import settings
+
+# Sorts after every id: a summary boundary without one covers its whole timestamp
+MAX_UUID = UUID(int=2**128 - 1)
 
 if TYPE_CHECKING:
     from app.models.user import User
@@ -12,21 +16,44 @@ class Chat(SQLModel, table=True):
     """Chat/Conversation model for organizing messages."""
 
     __tablename__ = "chats"
+    __table_args__ = (
+        # Keyset pagination of a user's chats, most recently updated first
+        Index("ix_chats_user_id_updated_at_id", "user_id", "updated_at", "id"),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     title: str = Field(max_length=255)
-    model: str = Field(default="llama3", max_length=100)
+    model: str = Field(default=settings.DEFAULT_MODEL, max_length=100)
     system_prompt: Optional[str] = Field(default=None)
 
+    # Denormalized counters, maintained by MessageRepository
+    message_count: int = Field(default=0)
+    last_message_at: Optional[datetime] = Field(default=None)
+
+    # Rolling summary of messages up to (summarized_until, summarized_until_id),
+    # maintained in the background
+    summary: Optional[str] = Field(default=None)
+    summary_tokens: int = Field(default=0)
+    summarized_until: Optional[datetime] = Field(default=None)
+    summarized_until_id: Optional[UUID] = Field(default=None)
+
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     # Relationships
-    user_id: UUID = Field(foreign_key="users.id", index=True)
+    user_id: UUID = Field(foreign_key="users.id", ondelete="CASCADE")
     user: "User" = Relationship(back_populates="chats")
 
+    # Deleted by the database (ON DELETE CASCADE), never loaded to delete
     messages: list["Message"] = Relationship(
-        back_populates="chat", cascade_delete=True)
+        back_populates="chat", cascade_delete=True, passive_deletes=True)
+
+    @property
+    def summarized_key(self) -> Optional[tuple[datetime, UUID]]:
+        """(created_at, id) keyset position of the last summarized message."""
+        if self.summarized_until is None:
+            return None
+        return self.summarized_until, self.summarized_until_id or MAX_UUID
 
     class Config:
         json_schema_extra = {
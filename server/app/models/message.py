@@ -1,5 +1,6 @@
-from sqlmodel import SQLModel, Field, Relationship
-from typing import TYPE_CHECKING
+from sqlalchemy import text
+from sqlmodel import SQLModel, Field, Relationship, Index
+from typing import Optional, TYPE_CHECKING
 from datetime import datetime, timezone
 from uuid import UUID, uuid4
 from enum import Enum
@@ -19,17 +20,32 @@ class Message(SQLModel, table=True):
     """Message model for storing conversation messages."""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination and recent-context lookups within a chat
+        Index("ix_messages_chat_id_created_at_id", "chat_id", "created_at", "id"),
+        # The semantic indexer's queue: only messages not embedded yet
+        Index(
+            "ix_messages_embedding_pending", "created_at", "id",
+            sqlite_where=text("embedded_model IS NULL"),
+            postgresql_where=text("embedded_model IS NULL"),
+        ),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     role: MessageRole = Field(index=True)
     content: str = Field(nullable=False)
     tokens: int = Field(default=0)
+    # Set when generation was stopped before the model finished
+    truncated: bool = Field(default=False)
+    # Embedding model the semantic indexer stored a vector with; NULL
+    # while the message waits to be embedded
+    embedded_model: Optional[str] = Field(default=None, max_length=100)
 
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc))
 
     # Relationships
-    chat_id: UUID = Field(foreign_key="chats.id", index=True)
+    chat_id: UUID = Field(foreign_key="chats.id", ondelete="CASCADE")
     chat: "Chat" = Relationship(back_populates="messages")
 
     class Config:
@@ -0,0 +1,19 @@
+from sqlmodel import SQLModel, Field, Column, LargeBinary
+from datetime import datetime, timezone
+from uuid import UUID
+
+
+class MessageEmbedding(SQLModel, table=True):
+    """Embedding of a message's content, stored as raw float32 bytes."""
+
+    __tablename__ = "message_embeddings"
+
+    message_id: UUID = Field(
+        foreign_key="messages.id", primary_key=True, ondelete="CASCADE")
+    # One row per embedding model, so switching models re-embeds
+    model: str = Field(primary_key=True, max_length=100)
+    dim: int
+    vector: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc))
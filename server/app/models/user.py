@@ -26,8 +26,9 @@ class User(SQLModel, table=True):
         default_factory=lambda: datetime.now(timezone.utc))
 
     # Relationships
+    # Deleted by the database (ON DELETE CASCADE), never loaded to delete
     chats: list["Chat"] = Relationship(
-        back_populates="user", cascade_delete=True)
+        back_populates="user", cascade_delete=True, passive_deletes=True)
 
     class Config:
         json_schema_extra = {
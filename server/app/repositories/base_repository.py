@@ -1,10 +1,139 @@
+import re
 from typing import Generic, TypeVar, Type, Optional, Any
-from sqlmodel import Session, select
+from sqlalchemy import UniqueConstraint, insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, func, delete, update
 from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
+from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.utils.cache import TTLCache
+from app.utils.exceptions import ConflictException
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 
+# Shared across requests; keyed by (table, filters) and dropped on writes
+count_cache: TTLCache[tuple, int] = TTLCache(
+    maxsize=settings.COUNT_CACHE_MAX_ENTRIES,
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+register_metrics("count_cache", count_cache.stats)
+
+
+def _count_key(model: Type[SQLModel], filters: dict[str, Any]) -> tuple:
+    return (model.__tablename__, tuple(sorted(filters.items())))
+
+
+def _affected_tables(table: str) -> frozenset[str]:
+    """
+    `table` and every table an ON DELETE action reaches from it,
+    following foreign keys transitively (users -> chats -> messages -> ...).
+    """
+    affected = {table}
+    pending = [table]
+    while pending:
+        parent = pending.pop()
+        for child in SQLModel.metadata.tables.values():
+            if child.name in affected:
+                continue
+            if any(fk.ondelete and fk.column.table.name == parent for fk in child.foreign_keys):
+                affected.add(child.name)
+                pending.append(child.name)
+    return frozenset(affected)
+
+
+def invalidate_counts(model: Type[SQLModel]) -> None:
+    """
+    Drop cached counts for a table after it has been written to, and for
+    the tables its deletes cascade into.
+    """
+    tables = _affected_tables(model.__tablename__)
+    count_cache.invalidate_where(lambda key, _: key[0] in tables)
+
+
+def _filtered(statement, model: Type[SQLModel], filters: dict[str, Any]):
+    """`statement` narrowed to `column == value` for each filter naming a column."""
+    for key, value in filters.items():
+        if hasattr(model, key):
+            statement = statement.where(getattr(model, key) == value)
+    return statement
+
+
+def _by_id_statement(model: Type[SQLModel], id: UUID):
+    return select(model).where(model.id == id)
+
+
+def _multi_statement(model: Type[SQLModel], skip: int, limit: int, filters: dict[str, Any]):
+    return _filtered(select(model), model, filters).offset(skip).limit(limit)
+
+
+def _count_statement(model: Type[SQLModel], filters: dict[str, Any]):
+    return _filtered(select(func.count()).select_from(model), model, filters)
+
+
+def _delete_statement(model: Type[SQLModel], id: UUID):
+    return delete(model).where(model.id == id)
+
+
+def _insert_statement(db_obj: SQLModel):
+    """INSERT of every value of a fully built `db_obj`; nothing to read back."""
+    return insert(type(db_obj)).values(db_obj.model_dump())
+
+
+def _update_values(model: Type[SQLModel], obj_in: dict[str, Any]) -> dict[str, Any]:
+    """The fields of `obj_in` that update() sets: known columns, not None."""
+    return {
+        key: value for key, value in obj_in.items()
+        if value is not None and hasattr(model, key)
+    }
+
+
+def _update_statement(model: Type[SQLModel], values: dict[str, Any], filters: dict[str, Any]):
+    """UPDATE ... RETURNING every column of the rows matching `filters`."""
+    # Unknown filter names raise rather than widening the UPDATE
+    criteria = [getattr(model, key) == value for key, value in filters.items()]
+    return (
+        update(model)
+        .where(*criteria)
+        .values(**values)
+        .returning(*model.__table__.columns)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _unique_names(model: Type[SQLModel], column: str) -> set[str]:
+    """Names by which databases report a unique violation on `column`."""
+    table = model.__table__
+    names = {f"{table.name}.{column}", f"{table.name}_{column}_key"}
+    unique = [index for index in table.indexes if index.unique]
+    unique += [c for c in table.constraints if isinstance(c, UniqueConstraint)]
+    for constraint in unique:
+        if constraint.name and [c.name for c in constraint.columns] == [column]:
+            names.add(constraint.name)
+    return names
+
+
+def _conflict(
+    model: Type[SQLModel],
+    error: IntegrityError,
+    conflicts: dict[str, str]
+) -> Optional[ConflictException]:
+    """
+    ConflictException for a unique violation on one of the `conflicts`
+    columns, None for any other integrity error. Postgres names the
+    constraint or index on the first line of its error, SQLite the
+    table.column.
+    """
+    first_line = next(iter(str(error.orig).splitlines()), "")
+    if "unique" not in first_line.lower():
+        return None
+    identifiers = set(re.findall(r"[\w.]+", first_line))
+    for column, detail in conflicts.items():
+        if identifiers & _unique_names(model, column):
+            return ConflictException(detail)
+    return None
+
 
 class BaseRepository(Generic[ModelType]):
     """
@@ -21,13 +150,13 @@ class BaseRepository(Generic[ModelType]):
         db_obj = self.model(**obj_in)
         self.session.add(db_obj)
         self.session.commit()
+        invalidate_counts(self.model)
         self.session.refresh(db_obj)
         return db_obj
 
     def get_by_id(self, id: UUID) -> Optional[ModelType]:
         """Get a record by ID."""
-        statement = select(self.model).where(self.model.id == id)
-        return self.session.exec(statement).first()
+        return self.session.exec(_by_id_statement(self.model, id)).first()
 
     def get_multi(
         self,
@@ -36,46 +165,178 @@ class BaseRepository(Generic[ModelType]):
         **filters
     ) -> list[ModelType]:
         """Get multiple records with pagination."""
-        statement = select(self.model)
-
-        for key, value in filters.items():
-            if hasattr(self.model, key):
-                statement = statement.where(getattr(self.model, key) == value)
-
-        statement = statement.offset(skip).limit(limit)
+        statement = _multi_statement(self.model, skip, limit, filters)
         return list(self.session.exec(statement).all())
 
     def update(self, id: UUID, obj_in: dict[str, Any]) -> Optional[ModelType]:
-        """Update a record."""
-        db_obj = self.get_by_id(id)
-        if not db_obj:
-            return None
+        """
+        Update a record with a single UPDATE ... RETURNING.
+        None values and unknown fields are ignored.
+        """
+        values = _update_values(self.model, obj_in)
+        if not values:
+            return self.get_by_id(id)
 
-        for key, value in obj_in.items():
-            if value is not None and hasattr(db_obj, key):
-                setattr(db_obj, key, value)
+        rows = self.update_where(values, id=id)
+        return rows[0] if rows else None
 
-        self.session.add(db_obj)
+    def update_where(self, values: dict[str, Any], **filters) -> list[ModelType]:
+        """
+        Set `values` on every record matching `filters` (column == value)
+        with one UPDATE ... RETURNING, without loading the records first.
+        Returns the updated records, detached; empty if nothing matched.
+        """
+        result = self.session.exec(_update_statement(self.model, values, filters))
+        rows = [self.model.model_validate(row._mapping) for row in result]
         self.session.commit()
-        self.session.refresh(db_obj)
+        invalidate_counts(self.model)
+        return rows
+
+    def insert_many(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Multi-row INSERT of plain column values; committed by the caller,
+        so several batches can share one transaction.
+        """
+        if rows:
+            self.session.exec(insert(self.model), params=rows)
+            invalidate_counts(self.model)
+
+    def insert_or_conflict(
+        self,
+        obj_in: dict[str, Any],
+        conflicts: dict[str, str]
+    ) -> ModelType:
+        """
+        Insert a record with a single INSERT, relying on unique constraints
+        rather than checking first, so concurrent inserts cannot race.
+        A violation on a column in `conflicts` raises ConflictException
+        with that column's message.
+        """
+        db_obj = self.model(**obj_in)
+        try:
+            # Every value is generated here, so nothing needs reading back
+            self.session.exec(_insert_statement(db_obj))
+            self.session.commit()
+        except IntegrityError as e:
+            self.session.rollback()
+            conflict = _conflict(self.model, e, conflicts)
+            if conflict is None:
+                raise
+            raise conflict from None
+        invalidate_counts(self.model)
         return db_obj
 
     def delete(self, id: UUID) -> bool:
-        """Delete a record."""
-        db_obj = self.get_by_id(id)
-        if not db_obj:
-            return False
-
-        self.session.delete(db_obj)
+        """
+        Delete a record with a single DELETE, without loading it first.
+        Dependent rows are removed by the database (ON DELETE CASCADE).
+        """
+        result = self.session.exec(_delete_statement(self.model, id))
         self.session.commit()
-        return True
+        invalidate_counts(self.model)
+        return result.rowcount > 0
 
     def count(self, **filters) -> int:
-        """Count records matching filters."""
-        statement = select(self.model)
+        """Count records matching filters with a single COUNT(*) query."""
+        cache_key = _count_key(self.model, filters)
+        cached = count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        total = self.session.exec(_count_statement(self.model, filters)).one()
+        count_cache.set(cache_key, total)
+        return total
+
+
+class AsyncBaseRepository(Generic[ModelType]):
+    """
+    Async counterpart of BaseRepository.
+    Awaits the database instead of blocking the event loop.
+    """
+
+    def __init__(self, model: Type[ModelType], session: AsyncSession):
+        self.model = model
+        self.session = session
+
+    async def create(self, obj_in: dict[str, Any]) -> ModelType:
+        """Create a new record."""
+        db_obj = self.model(**obj_in)
+        self.session.add(db_obj)
+        await self.session.commit()
+        invalidate_counts(self.model)
+        await self.session.refresh(db_obj)
+        return db_obj
+
+    async def get_by_id(self, id: UUID) -> Optional[ModelType]:
+        """Get a record by ID."""
+        return (await self.session.exec(_by_id_statement(self.model, id))).first()
+
+    async def get_multi(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        **filters
+    ) -> list[ModelType]:
+        """Get multiple records with pagination."""
+        statement = _multi_statement(self.model, skip, limit, filters)
+        return list((await self.session.exec(statement)).all())
+
+    async def update(self, id: UUID, obj_in: dict[str, Any]) -> Optional[ModelType]:
+        """Update a record with a single UPDATE ... RETURNING (see BaseRepository.update)."""
+        values = _update_values(self.model, obj_in)
+        if not values:
+            return await self.get_by_id(id)
+
+        rows = await self.update_where(values, id=id)
+        return rows[0] if rows else None
+
+    async def update_where(self, values: dict[str, Any], **filters) -> list[ModelType]:
+        """Set `values` on every record matching `filters` (see BaseRepository.update_where)."""
+        result = await self.session.exec(_update_statement(self.model, values, filters))
+        rows = [self.model.model_validate(row._mapping) for row in result]
+        await self.session.commit()
+        invalidate_counts(self.model)
+        return rows
+
+    async def insert_many(self, rows: list[dict[str, Any]]) -> None:
+        """Multi-row INSERT; committed by the caller (see BaseRepository.insert_many)."""
+        if rows:
+            await self.session.exec(insert(self.model), params=rows)
+            invalidate_counts(self.model)
+
+    async def insert_or_conflict(
+        self,
+        obj_in: dict[str, Any],
+        conflicts: dict[str, str]
+    ) -> ModelType:
+        """Insert relying on unique constraints (see BaseRepository.insert_or_conflict)."""
+        db_obj = self.model(**obj_in)
+        try:
+            await self.session.exec(_insert_statement(db_obj))
+            await self.session.commit()
+        except IntegrityError as e:
+            await self.session.rollback()
+            conflict = _conflict(self.model, e, conflicts)
+            if conflict is None:
+                raise
+            raise conflict from None
+        invalidate_counts(self.model)
+        return db_obj
+
+    async def delete(self, id: UUID) -> bool:
+        """Delete a record with a single DELETE (see BaseRepository.delete)."""
+        result = await self.session.exec(_delete_statement(self.model, id))
+        await self.session.commit()
+        invalidate_counts(self.model)
+        return result.rowcount > 0
 
-        for key, value in filters.items():
-            if hasattr(self.model, key):
-                statement = statement.where(getattr(self.model, key) == value)
+    async def count(self, **filters) -> int:
+        """Count records matching filters with a single COUNT(*) query."""
+        cache_key = _count_key(self.model, filters)
+        cached = count_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        return len(list(self.session.exec(statement).all()))
+        total = (await self.session.exec(_count_statement(self.model, filters))).one()
+        count_cache.set(cache_key, total)
+        return total
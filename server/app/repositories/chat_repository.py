@@ -1,11 +1,112 @@
-from typing import Optional
-from sqlmodel import Session, select, func
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+from sqlalchemy import Row, bindparam, tuple_
+from sqlmodel import Session, select, func, update, delete, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.chat import Chat
 from app.models.message import Message
-from app.repositories.base_repository import BaseRepository
+from app.repositories.base_repository import (
+    BaseRepository,
+    AsyncBaseRepository,
+    invalidate_counts
+)
+from app.utils.pagination import KeysetKey
 from uuid import UUID
 
 
+def _user_chats_statement(
+    user_id: UUID,
+    skip: int,
+    limit: int,
+    before: Optional[KeysetKey]
+):
+    statement = select(Chat).where(Chat.user_id == user_id)
+
+    if before is not None:
+        statement = statement.where(
+            tuple_(Chat.updated_at, Chat.id) < tuple_(*before))
+    else:
+        statement = statement.offset(skip)
+
+    return (
+        statement
+        .order_by(Chat.updated_at.desc(), Chat.id.desc())
+        .limit(limit)
+    )
+
+
+def _by_id_and_user_statement(chat_id: UUID, user_id: UUID):
+    return select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
+
+
+def _delete_for_user_statement(chat_ids: list[UUID], user_id: UUID):
+    return (
+        delete(Chat)
+        .where(Chat.id.in_(chat_ids), Chat.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _export_statement(user_id: UUID, batch_size: int):
+    """
+    Every chat of a user followed by its messages in order, as plain
+    rows (no ORM objects), streamed in `batch_size` partitions from a
+    server-side cursor.
+    """
+    return (
+        select(
+            Chat.id,
+            Chat.title,
+            Chat.model,
+            Chat.system_prompt,
+            Chat.created_at,
+            Chat.updated_at,
+            Message.id.label("message_id"),
+            Message.role,
+            Message.content,
+            Message.tokens,
+            Message.truncated,
+            Message.created_at.label("message_created_at"),
+        )
+        .outerjoin(Message, Message.chat_id == Chat.id)
+        .where(Chat.user_id == user_id)
+        .order_by(Chat.created_at, Chat.id, Message.created_at, Message.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+# executemany UPDATE setting the counters of imported chats
+_set_counters = (
+    update(Chat)
+    .where(Chat.id == bindparam("chat_id"))
+    .values(
+        message_count=bindparam("message_count"),
+        last_message_at=bindparam("last_message_at")
+    )
+)
+
+
+def _actual_counters():
+    """Correlated subqueries computing a chat's real message counters."""
+    actual_count = (
+        select(func.count(Message.id))
+        .where(Message.chat_id == Chat.id)
+        .scalar_subquery()
+    )
+    actual_last = (
+        select(func.max(Message.created_at))
+        .where(Message.chat_id == Chat.id)
+        .scalar_subquery()
+    )
+    return actual_count, actual_last
+
+
+def _counters_drifted(actual_count, actual_last):
+    return or_(
+        Chat.message_count != actual_count,
+        Chat.last_message_at.is_distinct_from(actual_last)
+    )
+
+
 class ChatRepository(BaseRepository[Chat]):
     """Repository for Chat model with custom queries."""
 
@@ -16,23 +117,19 @@ class ChatRepository(BaseRepository[Chat]):
         self,
         user_id: UUID,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        before: Optional[KeysetKey] = None
     ) -> list[Chat]:
-        """Get all chats for a specific user."""
-        statement = (
-            select(Chat)
-            .where(Chat.user_id == user_id)
-            .order_by(Chat.updated_at.desc())
-            .offset(skip)
-            .limit(limit)
-        )
+        """
+        Get chats for a specific user, most recently updated first.
+        Pass `before` (an (updated_at, id) key) for keyset pagination.
+        """
+        statement = _user_chats_statement(user_id, skip, limit, before)
         return list(self.session.exec(statement).all())
 
     def count_user_chats(self, user_id: UUID) -> int:
         """Count total chats for a user."""
-        statement = select(func.count()).select_from(
-            Chat).where(Chat.user_id == user_id)
-        return self.session.exec(statement).one()
+        return self.count(user_id=user_id)
 
     def get_chat_with_messages(self, chat_id: UUID) -> Optional[Chat]:
         """Get chat with all its messages."""
@@ -52,8 +149,80 @@ class ChatRepository(BaseRepository[Chat]):
 
     def get_by_id_and_user(self, chat_id: UUID, user_id: UUID) -> Optional[Chat]:
         """Get chat by ID ensuring it belongs to the user."""
-        statement = select(Chat).where(
-            Chat.id == chat_id,
-            Chat.user_id == user_id
+        return self.session.exec(_by_id_and_user_statement(chat_id, user_id)).first()
+
+    def delete_for_user(self, chat_ids: list[UUID], user_id: UUID) -> int:
+        """
+        Delete those of `chat_ids` the user owns in one statement; their
+        messages go with them via ON DELETE CASCADE. Returns the number
+        of chats deleted.
+        """
+        result = self.session.exec(_delete_for_user_statement(chat_ids, user_id))
+        self.session.commit()
+        invalidate_counts(Chat)
+        return result.rowcount
+
+    def count_counter_drift(self) -> int:
+        """Count chats whose message_count/last_message_at disagree with messages."""
+        actual_count, actual_last = _actual_counters()
+        statement = select(func.count()).select_from(Chat).where(
+            _counters_drifted(actual_count, actual_last))
+        return self.session.exec(statement).one()
+
+    def repair_counter_drift(self) -> int:
+        """Recount message_count/last_message_at for drifted chats."""
+        actual_count, actual_last = _actual_counters()
+        statement = (
+            update(Chat)
+            .where(_counters_drifted(actual_count, actual_last))
+            .values(message_count=actual_count, last_message_at=actual_last)
+            .execution_options(synchronize_session=False)
         )
-        return self.session.exec(statement).first()
+        result = self.session.exec(statement)
+        self.session.commit()
+        invalidate_counts(Chat)
+        return result.rowcount
+
+    def iter_export_rows(self, user_id: UUID, batch_size: int) -> Iterator[Sequence[Row]]:
+        """Yield a user's chats and messages in partitions (see _export_statement)."""
+        result = self.session.execute(_export_statement(user_id, batch_size))
+        yield from result.partitions()
+
+    def set_counters(self, rows: list[dict[str, Any]]) -> None:
+        """Set message_count/last_message_at of imported chats in one executemany."""
+        if rows:
+            self.session.connection().execute(_set_counters, rows)
+
+
+class AsyncChatRepository(AsyncBaseRepository[Chat]):
+    """Async repository for Chat model with custom queries."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(Chat, session)
+
+    async def get_by_id_and_user(self, chat_id: UUID, user_id: UUID) -> Optional[Chat]:
+        """Get chat by ID ensuring it belongs to the user."""
+        statement = _by_id_and_user_statement(chat_id, user_id)
+        return (await self.session.exec(statement)).first()
+
+    async def delete_for_user(self, chat_ids: list[UUID], user_id: UUID) -> int:
+        """Delete those of `chat_ids` the user owns (see ChatRepository.delete_for_user)."""
+        result = await self.session.exec(_delete_for_user_statement(chat_ids, user_id))
+        await self.session.commit()
+        invalidate_counts(Chat)
+        return result.rowcount
+
+    async def iter_export_rows(
+        self,
+        user_id: UUID,
+        batch_size: int
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Yield a user's chats and messages in partitions (see _export_statement)."""
+        result = await self.session.stream(_export_statement(user_id, batch_size))
+        async for partition in result.partitions():
+            yield partition
+
+    async def set_counters(self, rows: list[dict[str, Any]]) -> None:
+        """Set message_count/last_message_at of imported chats in one executemany."""
+        if rows:
+            await (await self.session.connection()).execute(_set_counters, rows)
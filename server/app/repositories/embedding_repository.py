@@ -0,0 +1,162 @@
+from typing import Any, Collection
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.chat import Chat
+from app.models.message import Message
+from app.models.message_embedding import MessageEmbedding
+from app.repositories.base_repository import BaseRepository, AsyncBaseRepository
+from uuid import UUID
+
+
+def _pending_statement(limit: int, exclude: Collection[UUID]):
+    """
+    Oldest messages not embedded yet, read off the partial pending index
+    rather than anti-joined against every stored embedding.
+    """
+    statement = (
+        select(Message.id, Message.chat_id, Chat.user_id, Message.content)
+        .join(Chat, Chat.id == Message.chat_id)
+        .where(Message.embedded_model.is_(None))
+    )
+    if exclude:
+        statement = statement.where(Message.id.not_in(exclude))
+    return statement.order_by(Message.created_at, Message.id).limit(limit)
+
+
+def _mark_embedded_statement(model: str, message_ids: list[UUID]):
+    return (
+        update(Message)
+        .where(Message.id.in_(message_ids))
+        .values(embedded_model=model)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _reset_other_models_statement(model: str):
+    """Queue messages embedded with any other model to be embedded again."""
+    return (
+        update(Message)
+        .where(Message.embedded_model.is_not(None), Message.embedded_model != model)
+        .values(embedded_model=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _delete_other_models_statement(model: str):
+    # Otherwise switching back to a model would collide with its old rows
+    return (
+        delete(MessageEmbedding)
+        .where(MessageEmbedding.model != model)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _stored_statement(model: str, message_ids: list[UUID]):
+    return select(MessageEmbedding.message_id).where(
+        MessageEmbedding.model == model, MessageEmbedding.message_id.in_(message_ids))
+
+
+def _new_rows(rows: list[dict[str, Any]], stored: Collection[UUID]) -> list[MessageEmbedding]:
+    return [MessageEmbedding(**row) for row in rows if row["message_id"] not in stored]
+
+
+def _user_embeddings_statement(user_id: UUID, model: str):
+    return (
+        select(MessageEmbedding.message_id, Message.chat_id, MessageEmbedding.vector)
+        .join(Message, Message.id == MessageEmbedding.message_id)
+        .join(Chat, Chat.id == Message.chat_id)
+        .where(Chat.user_id == user_id, MessageEmbedding.model == model)
+    )
+
+
+class EmbeddingRepository(BaseRepository[MessageEmbedding]):
+    """Repository for message embeddings."""
+
+    def __init__(self, session: Session):
+        super().__init__(MessageEmbedding, session)
+
+    def get_pending(
+        self,
+        limit: int,
+        exclude: Collection[UUID] = ()
+    ) -> list[tuple[UUID, UUID, UUID, str]]:
+        """(message_id, chat_id, user_id, content) of messages still to embed."""
+        return [tuple(row) for row in self.session.exec(_pending_statement(limit, exclude))]
+
+    def reset_other_models(self, model: str) -> None:
+        """
+        Mark messages embedded with another model as pending again and
+        drop the other models' embeddings.
+        """
+        self.session.exec(_reset_other_models_statement(model))
+        self.session.exec(_delete_other_models_statement(model))
+        self.session.commit()
+
+    def get_user_embeddings(self, user_id: UUID, model: str) -> list[tuple[UUID, UUID, bytes]]:
+        """(message_id, chat_id, vector) for every embedded message of a user."""
+        statement = _user_embeddings_statement(user_id, model)
+        return [tuple(row) for row in self.session.exec(statement)]
+
+    def add_many(self, rows: list[dict[str, Any]]) -> list[UUID]:
+        """
+        Store a batch of embeddings in one commit, taking the messages off
+        the pending index. Messages that already have an embedding for the
+        model are only taken off. Returns the ids of the messages whose
+        embeddings were inserted; none if another worker got there first.
+        """
+        model, message_ids = rows[0]["model"], [row["message_id"] for row in rows]
+        stored = set(self.session.exec(_stored_statement(model, message_ids)))
+        new = _new_rows(rows, stored)
+        self.session.add_all(new)
+        try:
+            # Flushes the embeddings first, so a duplicate fails here
+            self.session.exec(_mark_embedded_statement(model, message_ids))
+            self.session.commit()
+        except IntegrityError:
+            self.session.rollback()
+            return []
+        return [embedding.message_id for embedding in new]
+
+
+class AsyncEmbeddingRepository(AsyncBaseRepository[MessageEmbedding]):
+    """Async counterpart of EmbeddingRepository."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(MessageEmbedding, session)
+
+    async def get_pending(
+        self,
+        limit: int,
+        exclude: Collection[UUID] = ()
+    ) -> list[tuple[UUID, UUID, UUID, str]]:
+        """(message_id, chat_id, user_id, content) of messages still to embed."""
+        result = await self.session.exec(_pending_statement(limit, exclude))
+        return [tuple(row) for row in result]
+
+    async def reset_other_models(self, model: str) -> None:
+        """Re-queue other models' messages (see EmbeddingRepository.reset_other_models)."""
+        await self.session.exec(_reset_other_models_statement(model))
+        await self.session.exec(_delete_other_models_statement(model))
+        await self.session.commit()
+
+    async def get_user_embeddings(self, user_id: UUID, model: str) -> list[tuple[UUID, UUID, bytes]]:
+        """(message_id, chat_id, vector) for every embedded message of a user."""
+        result = await self.session.exec(_user_embeddings_statement(user_id, model))
+        return [tuple(row) for row in result]
+
+    async def add_many(self, rows: list[dict[str, Any]]) -> list[UUID]:
+        """Store a batch of embeddings in one commit (see EmbeddingRepository.add_many)."""
+        model, message_ids = rows[0]["model"], [row["message_id"] for row in rows]
+        stored = set((await self.session.exec(_stored_statement(model, message_ids))).all())
+        new = _new_rows(rows, stored)
+        self.session.add_all(new)
+        try:
+            # Flushes the embeddings first, so a duplicate fails here
+            await self.session.exec(_mark_embedded_statement(model, message_ids))
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            return []
+        return [embedding.message_id for embedding in new]
@@ -1,8 +1,211 @@
-from sqlmodel import Session, select, func
+from typing import Any, Optional
+from sqlalchemy import Float, cast, column, insert, literal_column, table, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select, func, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.chat import Chat
 from app.models.message import Message
-from app.repositories.base_repository import BaseRepository
+from app.repositories.base_repository import (
+    BaseRepository,
+    AsyncBaseRepository,
+    invalidate_counts
+)
+from app.utils.pagination import KeysetKey, RankKey
 from uuid import UUID
 
+# Text search configuration of the generated messages.search_vector
+# column (Postgres); must match the migration that created it
+SEARCH_CONFIG = "english"
+
+# SQLite fallback: FTS5 table kept in step with messages by triggers
+_messages_fts = table("messages_fts", column("message_id"), column("content"))
+
+
+def _message_added(message: Message, user_id: Optional[UUID] = None):
+    """
+    UPDATE keeping chats.message_count/last_message_at in step with an
+    insert and bumping updated_at. Returns the chat id, so with `user_id`
+    the same statement also checks ownership: no row, no such chat.
+    """
+    statement = update(Chat).where(Chat.id == message.chat_id)
+    if user_id is not None:
+        statement = statement.where(Chat.user_id == user_id)
+    return (
+        statement
+        .values(
+            message_count=Chat.message_count + 1,
+            last_message_at=message.created_at,
+            updated_at=message.created_at
+        )
+        .returning(Chat.id)
+        # Loaded chats are not refreshed; the UPDATE needs no extra SELECT
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _insert_message(message: Message):
+    """INSERT of a fully built message; every value is generated here."""
+    return insert(Message).values(message.model_dump())
+
+
+def _message_removed(chat_id: UUID):
+    """UPDATE keeping chats.message_count/last_message_at in step with a delete."""
+    last_message_at = (
+        select(func.max(Message.created_at))
+        .where(Message.chat_id == chat_id)
+        .scalar_subquery()
+    )
+    return (
+        update(Chat)
+        .where(Chat.id == chat_id)
+        .values(
+            message_count=Chat.message_count - 1,
+            last_message_at=last_message_at
+        )
+    )
+
+
+def _chat_messages_statement(
+    chat_id: UUID,
+    skip: int,
+    limit: int,
+    after: Optional[KeysetKey]
+):
+    statement = select(Message).where(Message.chat_id == chat_id)
+
+    if after is not None:
+        statement = statement.where(
+            tuple_(Message.created_at, Message.id) > tuple_(*after))
+    else:
+        statement = statement.offset(skip)
+
+    return (
+        statement
+        .order_by(Message.created_at, Message.id)
+        .limit(limit)
+    )
+
+
+def _messages_after_statement(chat_id: UUID, after: Optional[KeysetKey]):
+    statement = select(Message).where(Message.chat_id == chat_id)
+    if after is not None:
+        statement = statement.where(
+            tuple_(Message.created_at, Message.id) > tuple_(*after))
+    return statement
+
+
+def _messages_after_ordered_statement(chat_id: UUID, after: Optional[KeysetKey], limit: int):
+    return (
+        _messages_after_statement(chat_id, after)
+        .order_by(Message.created_at, Message.id)
+        .limit(limit)
+    )
+
+
+def _sum_tokens_after_statement(chat_id: UUID, after: Optional[KeysetKey]):
+    messages = _messages_after_statement(chat_id, after).subquery()
+    return select(func.coalesce(func.sum(messages.c.tokens), 0))
+
+
+def _recent_context_statement(chat_id: UUID, limit: int):
+    """The newest `limit` messages, newest first."""
+    return (
+        select(Message)
+        .where(Message.chat_id == chat_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit)
+    )
+
+
+def _many_for_user_statement(ids: list[UUID], user_id: UUID):
+    return (
+        select(Message)
+        .join(Chat, Chat.id == Message.chat_id)
+        .where(Message.id.in_(ids), Chat.user_id == user_id)
+    )
+
+
+def _context_window_statement(
+    chat_id: UUID,
+    max_tokens: int,
+    max_messages: int,
+    per_message_overhead: int,
+    after: Optional[KeysetKey]
+):
+    """
+    Newest messages whose running token total fits in `max_tokens`,
+    returned in chronological order. Uses the stored per-message counts.
+    Messages at or before the (created_at, id) key `after` (already
+    summarized) are skipped.
+    """
+    newest_first = (Message.created_at.desc(), Message.id.desc())
+    recent = (
+        _messages_after_statement(chat_id, after)
+        .order_by(*newest_first)
+        .limit(max_messages)
+        .subquery()
+    )
+    running = select(
+        recent,
+        func.sum(recent.c.tokens + per_message_overhead).over(
+            order_by=(recent.c.created_at.desc(), recent.c.id.desc())
+        ).label("running_tokens")
+    ).subquery()
+    windowed = aliased(Message, running)
+    return (
+        select(windowed)
+        .where(running.c.running_tokens <= max_tokens)
+        .order_by(windowed.created_at, windowed.id)
+    )
+
+
+def _fts5_query(query: str) -> str:
+    """Quote each term so user input is never parsed as FTS5 syntax."""
+    return " ".join(
+        '"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def _search_statement(
+    dialect: str,
+    user_id: UUID,
+    query: str,
+    limit: int,
+    after: Optional[RankKey]
+):
+    """
+    Messages in the user's chats matching `query`, best match first.
+    Postgres uses the GIN-indexed search_vector column; SQLite uses the
+    messages_fts FTS5 table. Both yield (Message, rank) rows where a
+    higher rank is more relevant.
+    """
+    if dialect == "postgresql":
+        search_vector = literal_column("messages.search_vector")
+        ts_query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), query)
+        # float8, so the rank survives the round trip through a cursor
+        rank = cast(func.ts_rank_cd(search_vector, ts_query), Float)
+        statement = select(Message, rank.label("rank")).where(
+            search_vector.op("@@")(ts_query))
+    else:
+        # bm25() is lower-is-better; negate to match ts_rank_cd
+        rank = -func.bm25(literal_column("messages_fts"))
+        statement = (
+            select(Message, rank.label("rank"))
+            .join(_messages_fts, _messages_fts.c.message_id == Message.id)
+            .where(literal_column("messages_fts").op("MATCH")(_fts5_query(query)))
+        )
+
+    statement = (
+        statement
+        .join(Chat, Chat.id == Message.chat_id)
+        .where(Chat.user_id == user_id)
+    )
+    if after is not None:
+        statement = statement.where(tuple_(rank, Message.id) < tuple_(*after))
+
+    return statement.order_by(rank.desc(), Message.id.desc()).limit(limit)
+
 
 class MessageRepository(BaseRepository[Message]):
     """Repository for Message model with custom queries."""
@@ -10,35 +213,189 @@ class MessageRepository(BaseRepository[Message]):
     def __init__(self, session: Session):
         super().__init__(Message, session)
 
+    def create(self, obj_in: dict[str, Any]) -> Message:
+        """Create a message and bump its chat's counters in the same transaction."""
+        message = self.create_for_user(obj_in)
+        if message is None:
+            raise NoResultFound(f"Chat {obj_in['chat_id']} not found")
+        return message
+
+    def create_for_user(
+        self,
+        obj_in: dict[str, Any],
+        user_id: Optional[UUID] = None
+    ) -> Optional[Message]:
+        """
+        Create a message in one transaction of two statements: the chat
+        UPDATE ... RETURNING (counters, updated_at and, given `user_id`,
+        ownership), then the INSERT. All values are generated here, so
+        nothing is read back. Returns None, having written nothing, when
+        the chat doesn't exist or isn't the user's.
+        """
+        message = self.model(**obj_in)
+        if self.session.exec(_message_added(message, user_id)).first() is None:
+            self.session.rollback()
+            return None
+
+        self.session.exec(_insert_message(message))
+        self.session.commit()
+        invalidate_counts(Message)
+        return message
+
+    def delete(self, id: UUID) -> bool:
+        """Delete a message and recompute its chat's counters in the same transaction."""
+        db_obj = self.get_by_id(id)
+        if not db_obj:
+            return False
+
+        self.session.delete(db_obj)
+        self.session.flush()
+        self.session.exec(_message_removed(db_obj.chat_id))
+        self.session.commit()
+        invalidate_counts(Message)
+        return True
+
     def get_chat_messages(
         self,
         chat_id: UUID,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[KeysetKey] = None
     ) -> list[Message]:
-        """Get all messages for a specific chat."""
-        statement = (
-            select(Message)
-            .where(Message.chat_id == chat_id)
-            .order_by(Message.created_at)
-            .offset(skip)
-            .limit(limit)
-        )
+        """
+        Get messages for a specific chat, oldest first.
+        Pass `after` (a (created_at, id) key) for keyset pagination.
+        """
+        statement = _chat_messages_statement(chat_id, skip, limit, after)
         return list(self.session.exec(statement).all())
 
     def count_chat_messages(self, chat_id: UUID) -> int:
         """Count total messages in a chat."""
-        statement = select(func.count()).select_from(
-            Message).where(Message.chat_id == chat_id)
-        return self.session.exec(statement).one()
+        return self.count(chat_id=chat_id)
 
     def get_recent_context(self, chat_id: UUID, limit: int = 10) -> list[Message]:
         """Get recent messages for context (for LLM)."""
-        statement = (
-            select(Message)
-            .where(Message.chat_id == chat_id)
-            .order_by(Message.created_at.desc())
-            .limit(limit)
-        )
-        messages = list(self.session.exec(statement).all())
+        messages = list(self.session.exec(_recent_context_statement(chat_id, limit)).all())
         return list(reversed(messages))  # Return in chronological order
+
+    def get_context_window(
+        self,
+        chat_id: UUID,
+        max_tokens: int,
+        max_messages: int = 200,
+        per_message_overhead: int = 0,
+        after: Optional[KeysetKey] = None
+    ) -> list[Message]:
+        """Get the newest messages that fit a token budget (for LLM)."""
+        statement = _context_window_statement(
+            chat_id, max_tokens, max_messages, per_message_overhead, after)
+        return list(self.session.exec(statement).all())
+
+    def sum_tokens_after(self, chat_id: UUID, after: Optional[KeysetKey]) -> int:
+        """Total stored tokens of messages past the (created_at, id) key `after`."""
+        return self.session.exec(_sum_tokens_after_statement(chat_id, after)).one()
+
+    def get_messages_after(
+        self,
+        chat_id: UUID,
+        after: Optional[KeysetKey],
+        limit: int = 200
+    ) -> list[Message]:
+        """Oldest-first messages past the (created_at, id) key `after`."""
+        statement = _messages_after_ordered_statement(chat_id, after, limit)
+        return list(self.session.exec(statement).all())
+
+    def search(
+        self,
+        user_id: UUID,
+        query: str,
+        limit: int = 20,
+        after: Optional[RankKey] = None
+    ) -> list[tuple[Message, float]]:
+        """
+        Full-text search over the user's messages, most relevant first.
+        Pass `after` (a (rank, id) key) for keyset pagination.
+        """
+        dialect = self.session.get_bind().dialect.name
+        statement = _search_statement(dialect, user_id, query, limit, after)
+        return [tuple(row) for row in self.session.exec(statement).all()]
+
+    def get_many_for_user(self, ids: list[UUID], user_id: UUID) -> list[Message]:
+        """Messages with the given ids that belong to the user's chats."""
+        statement = _many_for_user_statement(ids, user_id)
+        return list(self.session.exec(statement).all())
+
+
+class AsyncMessageRepository(AsyncBaseRepository[Message]):
+    """Async repository for Message model with custom queries."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(Message, session)
+
+    async def create(self, obj_in: dict[str, Any]) -> Message:
+        """Create a message and bump its chat's counters in the same transaction."""
+        message = await self.create_for_user(obj_in)
+        if message is None:
+            raise NoResultFound(f"Chat {obj_in['chat_id']} not found")
+        return message
+
+    async def create_for_user(
+        self,
+        obj_in: dict[str, Any],
+        user_id: Optional[UUID] = None
+    ) -> Optional[Message]:
+        """Create a message in one two-statement transaction (see MessageRepository)."""
+        message = self.model(**obj_in)
+        if (await self.session.exec(_message_added(message, user_id))).first() is None:
+            await self.session.rollback()
+            return None
+
+        await self.session.exec(_insert_message(message))
+        await self.session.commit()
+        invalidate_counts(Message)
+        return message
+
+    async def delete(self, id: UUID) -> bool:
+        """Delete a message and recompute its chat's counters in the same transaction."""
+        db_obj = await self.get_by_id(id)
+        if not db_obj:
+            return False
+
+        await self.session.delete(db_obj)
+        await self.session.flush()
+        await self.session.exec(_message_removed(db_obj.chat_id))
+        await self.session.commit()
+        invalidate_counts(Message)
+        return True
+
+    async def get_context_window(
+        self,
+        chat_id: UUID,
+        max_tokens: int,
+        max_messages: int = 200,
+        per_message_overhead: int = 0,
+        after: Optional[KeysetKey] = None
+    ) -> list[Message]:
+        """Get the newest messages that fit a token budget (for LLM)."""
+        statement = _context_window_statement(
+            chat_id, max_tokens, max_messages, per_message_overhead, after)
+        return list((await self.session.exec(statement)).all())
+
+    async def sum_tokens_after(self, chat_id: UUID, after: Optional[KeysetKey]) -> int:
+        """Total stored tokens of messages past the (created_at, id) key `after`."""
+        return (await self.session.exec(_sum_tokens_after_statement(chat_id, after))).one()
+
+    async def get_messages_after(
+        self,
+        chat_id: UUID,
+        after: Optional[KeysetKey],
+        limit: int = 200
+    ) -> list[Message]:
+        """Oldest-first messages past the (created_at, id) key `after`."""
+        statement = _messages_after_ordered_statement(chat_id, after, limit)
+        return list((await self.session.exec(statement)).all())
+
+    async def get_many_for_user(self, ids: list[UUID], user_id: UUID) -> list[Message]:
+        """Messages with the given ids that belong to the user's chats."""
+        statement = _many_for_user_statement(ids, user_id)
+        return list((await self.session.exec(statement)).all())
@@ -1,7 +1,33 @@
-from typing import Optional
+from typing import Any, Optional
 from sqlmodel import Session, select
+from uuid import UUID
+from app.core.config import settings
+from app.core.metrics import register_metrics
 from app.models.user import User
 from app.repositories.base_repository import BaseRepository
+from app.utils.cache import TTLCache
+from app.utils.security import forget_user_tokens
+
+# Authenticated users by id, so polling clients don't SELECT on every request
+user_cache: TTLCache[UUID, dict] = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS,
+)
+register_metrics("user_cache", user_cache.stats)
+
+
+def _by_email_statement(email: str):
+    return select(User).where(User.email == email)
+
+
+def _by_username_statement(username: str):
+    return select(User).where(User.username == username)
+
+
+def invalidate_user(user_id: UUID) -> None:
+    """Forget a user's cached row and token payloads after it changes."""
+    user_cache.pop(user_id)
+    forget_user_tokens(user_id)
 
 
 class UserRepository(BaseRepository[User]):
@@ -10,20 +36,38 @@ class UserRepository(BaseRepository[User]):
     def __init__(self, session: Session):
         super().__init__(User, session)
 
+    def get_by_id_cached(self, id: UUID) -> Optional[User]:
+        """
+        Get user by ID through the in-process user cache.
+        Returns a detached copy, so callers never share an instance.
+        """
+        data = user_cache.get(id)
+        if data is None:
+            user = self.get_by_id(id)
+            if not user:
+                return None
+            data = user.model_dump()
+            user_cache.set(id, data)
+        return User.model_validate(data)
+
+    def update_where(self, values: dict[str, Any], **filters) -> list[User]:
+        """Update users and drop them from the auth caches."""
+        users = super().update_where(values, **filters)
+        for user in users:
+            invalidate_user(user.id)
+        return users
+
+    def delete(self, id: UUID) -> bool:
+        """Delete a user and drop it from the auth caches."""
+        deleted = super().delete(id)
+        invalidate_user(id)
+        return deleted
+
     def get_by_email(self, email: str) -> Optional[User]:
         """Get user by email."""
-        statement = select(User).where(User.email == email)
-        return self.session.exec(statement).first()
+        return self.session.exec(_by_email_statement(email)).first()
 
     def get_by_username(self, username: str) -> Optional[User]:
         """Get user by username."""
-        statement = select(User).where(User.username == username)
-        return self.session.exec(statement).first()
-
-    def email_exists(self, email: str) -> bool:
-        """Check if email already exists."""
-        return self.get_by_email(email) is not None
+        return self.session.exec(_by_username_statement(username)).first()
 
-    def username_exists(self, username: str) -> bool:
-        """Check if username already exists."""
-        return self.get_by_username(username) is not None
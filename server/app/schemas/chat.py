@@ -2,12 +2,14 @@ from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
+from app.core.config import settings
+from app.models.message import MessageRole
 
 
 class ChatBase(BaseModel):
     """Base chat schema."""
     title: str = Field(max_length=255)
-    model: str = Field(default="llama2", max_length=100)
+    model: str = Field(default=settings.DEFAULT_MODEL, max_length=100)
     system_prompt: Optional[str] = None
 
 
@@ -30,6 +32,7 @@ class ChatResponse(ChatBase):
     created_at: datetime
     updated_at: datetime
     message_count: int = 0
+    last_message_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -37,7 +40,44 @@ class ChatResponse(ChatBase):
 class ChatListResponse(BaseModel):
     """Schema for paginated chat list."""
     items: list[ChatResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class ChatBulkDelete(BaseModel):
+    """Schema for deleting many chats at once."""
+    ids: list[UUID] = Field(min_length=1, max_length=1000)
+
+
+class ChatBulkDeleteResponse(BaseModel):
+    """Schema for bulk delete result."""
+    deleted: int
+
+
+class ChatImport(BaseModel):
+    """A `chat` record of an NDJSON import; `id` links its messages."""
+    id: UUID
+    title: str = Field(max_length=255)
+    model: str = Field(default=settings.DEFAULT_MODEL, max_length=100)
+    system_prompt: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class MessageImport(BaseModel):
+    """A `message` record of an NDJSON import."""
+    chat_id: UUID
+    role: MessageRole
+    content: str = Field(min_length=1)
+    tokens: Optional[int] = Field(None, ge=0)
+    truncated: bool = False
+    created_at: Optional[datetime] = None
+
+
+class ChatImportResponse(BaseModel):
+    """Schema for import result."""
+    chats: int
+    messages: int
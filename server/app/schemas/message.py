@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
 from datetime import datetime
 from uuid import UUID
 from app.models.message import MessageRole
@@ -12,6 +13,7 @@ class MessageBase(BaseModel):
 class MessageCreate(MessageBase):
     """Schema for creating a message."""
     role: MessageRole = MessageRole.USER
+    truncated: bool = False
 
 
 class MessageResponse(MessageBase):
@@ -20,6 +22,7 @@ class MessageResponse(MessageBase):
     chat_id: UUID
     role: MessageRole
     tokens: int
+    truncated: bool = False
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -34,4 +37,16 @@ class StreamMessageRequest(BaseModel):
 class MessageListResponse(BaseModel):
     """Schema for message list response."""
     items: list[MessageResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class MessageSearchResult(MessageResponse):
+    """A search hit; higher rank is more relevant."""
+    rank: float
+
+
+class MessageSearchResponse(BaseModel):
+    """Schema for message search response."""
+    items: list[MessageSearchResult]
+    next_cursor: Optional[str] = None
@@ -1,3 +1,4 @@
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 from typing import Optional
 
@@ -6,17 +7,20 @@ from app.schemas.user import UserCreate
 from app.schemas.auth import Token
 from app.repositories.user_repository import UserRepository
 from app.utils.security import (
-    verify_password,
-    get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
     create_refresh_token,
-    decode_token
-)
-from app.utils.exceptions import (
-    AuthenticationException,
-    ConflictException,
-    NotFoundException
+    decode_token,
+    decode_token_cached
 )
+from app.utils.exceptions import AuthenticationException, NotFoundException
+
+# Unique user columns and the error reported when one is already taken
+REGISTRATION_CONFLICTS = {
+    "email": "Email already registered",
+    "username": "Username already taken",
+}
 
 
 class AuthService:
@@ -26,35 +30,52 @@ class AuthService:
         self.user_repo = UserRepository(session)
         self.session = session
 
-    def register_user(self, user_data: UserCreate) -> User:
-        """Register a new user."""
-        # Check if email exists
-        if self.user_repo.email_exists(user_data.email):
-            raise ConflictException("Email already registered")
-
-        # Check if username exists
-        if self.user_repo.username_exists(user_data.username):
-            raise ConflictException("Username already taken")
-
+    async def register_user(self, user_data: UserCreate) -> User:
+        """
+        Register a new user.
+        Hashing runs on the password executor; DB work on the threadpool.
+        A taken email or username is caught by the unique indexes on the
+        single INSERT, so concurrent registrations cannot both succeed.
+        """
         # Create user with hashed password
         user_dict = user_data.model_dump(exclude={"password"})
-        user_dict["hashed_password"] = get_password_hash(user_data.password)
+        user_dict["hashed_password"] = await get_password_hash_async(
+            user_data.password)
 
-        return self.user_repo.create(user_dict)
+        return await run_in_threadpool(
+            self.user_repo.insert_or_conflict, user_dict, REGISTRATION_CONFLICTS)
 
-    def authenticate_user(self, username: str, password: str) -> Optional[User]:
-        """Authenticate user with username and password."""
-        user = self.user_repo.get_by_username(username)
+    async def authenticate_user(self, username: str, password: str) -> Optional[User]:
+        """
+        Authenticate user with username and password.
+        Transparently rehashes the password if the bcrypt cost has changed.
+        The pooled connection is returned before waiting on the password
+        executor, so a login storm cannot starve other requests of it.
+        """
+        user = await run_in_threadpool(self._find_user, username)
 
         if not user:
             return None
 
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = await verify_password_async(
+            password, user.hashed_password)
+        if not valid:
             return None
 
         if not user.is_active:
             return None
 
+        if new_hash:
+            user = await run_in_threadpool(
+                self.user_repo.update, user.id, {"hashed_password": new_hash})
+
+        return user
+
+    def _find_user(self, username: str) -> Optional[User]:
+        user = self.user_repo.get_by_username(username)
+        if user:
+            self.session.expunge(user)
+        self.session.rollback()
         return user
 
     def create_tokens(self, user: User) -> Token:
@@ -92,8 +113,11 @@ class AuthService:
         return self.create_tokens(user)
 
     def get_current_user(self, token: str) -> User:
-        """Get current user from access token."""
-        payload = decode_token(token)
+        """
+        Get current user from access token.
+        Token payloads and users are served from in-process caches when warm.
+        """
+        payload = decode_token_cached(token)
 
         if not payload or payload.get("type") != "access":
             raise AuthenticationException("Invalid access token")
@@ -103,7 +127,7 @@ class AuthService:
             raise AuthenticationException("Invalid token payload")
 
         from uuid import UUID
-        user = self.user_repo.get_by_id(UUID(user_id))
+        user = self.user_repo.get_by_id_cached(UUID(user_id))
 
         if not user:
             raise NotFoundException("User not found")
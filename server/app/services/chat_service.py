@@ -1,25 +1,34 @@
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
 from app.models.chat import Chat
 from app.models.user import User
 from app.schemas.chat import ChatCreate, ChatUpdate, ChatResponse
-from app.repositories.chat_repository import ChatRepository
-from app.repositories.message_repository import MessageRepository
+from app.repositories.chat_repository import ChatRepository, AsyncChatRepository
+from app.services.model_catalog import model_catalog
+from app.services.unit_of_work import UnitOfWork
 from app.utils.exceptions import NotFoundException, ForbiddenException
+from app.utils.pagination import decode_cursor, split_page
 
 
 class ChatService:
-    """Service for chat operations."""
+    """
+    Service for chat operations.
+    Chats loaded for their owner are kept in `uow`, which services
+    handling the same request share (see UnitOfWork).
+    """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, uow: Optional[UnitOfWork] = None):
         self.chat_repo = ChatRepository(session)
-        self.message_repo = MessageRepository(session)
         self.session = session
+        self.uow = uow or UnitOfWork()
 
     def create_chat(self, chat_data: ChatCreate, user: User) -> Chat:
         """Create a new chat for user."""
+        model_catalog.validate(chat_data.model)
+
         chat_dict = chat_data.model_dump()
         chat_dict["user_id"] = user.id
 
@@ -29,24 +38,43 @@ class ChatService:
         self,
         user: User,
         page: int = 1,
-        page_size: int = 20
-    ) -> tuple[list[Chat], int]:
-        """Get paginated chats for user."""
-        skip = (page - 1) * page_size
-        chats = self.chat_repo.get_user_chats(
-            user.id, skip=skip, limit=page_size)
-        total = self.chat_repo.count_user_chats(user.id)
-
-        return chats, total
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        include_total: bool = True
+    ) -> tuple[list[Chat], Optional[int], Optional[str]]:
+        """
+        Get paginated chats for user.
+        Uses keyset pagination when a cursor is given, page/offset otherwise.
+        Returns the chats, the total (if requested) and the next cursor.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        rows = self.chat_repo.get_user_chats(
+            user.id,
+            skip=(page - 1) * page_size,
+            limit=page_size + 1,
+            before=before
+        )
+        chats, next_cursor = split_page(
+            rows, page_size, key=lambda chat: (chat.updated_at, chat.id))
+        total = self.chat_repo.count_user_chats(user.id) if include_total else None
+
+        return chats, total, next_cursor
 
     def get_chat(self, chat_id: UUID, user: User) -> Chat:
-        """Get specific chat ensuring user ownership."""
+        """
+        Get specific chat ensuring user ownership.
+        Only the first call per request for a chat reaches the database.
+        """
+        chat = self.uow.get_chat(chat_id, user.id)
+        if chat is not None:
+            return chat
+
         chat = self.chat_repo.get_by_id_and_user(chat_id, user.id)
 
         if not chat:
             raise NotFoundException("Chat not found")
 
-        return chat
+        return self.uow.add_chat(chat)
 
     def get_chat_with_messages(self, chat_id: UUID, user: User) -> Chat:
         """Get chat with all its messages."""
@@ -59,28 +87,63 @@ class ChatService:
         chat_data: ChatUpdate,
         user: User
     ) -> Chat:
-        """Update chat details."""
-        chat = self.get_chat(chat_id, user)
-
-        update_dict = chat_data.model_dump(exclude_unset=True)
-        update_dict["updated_at"] = datetime.utcnow()
+        """
+        Update chat details with one UPDATE ... RETURNING; ownership is
+        checked by the UPDATE itself.
+        """
+        if chat_data.model is not None:
+            model_catalog.validate(chat_data.model)
+
+        update_dict = {
+            key: value
+            for key, value in chat_data.model_dump(exclude_unset=True).items()
+            if value is not None
+        }
+        update_dict["updated_at"] = datetime.now(timezone.utc)
+
+        updated = self.chat_repo.update_where(update_dict, id=chat_id, user_id=user.id)
+
+        if not updated:
+            raise NotFoundException("Chat not found")
 
-        updated_chat = self.chat_repo.update(chat_id, update_dict)
+        return self.uow.add_chat(updated[0])
 
-        if not updated_chat:
+    def delete_chat(self, chat_id: UUID, user: User) -> bool:
+        """Delete a chat; ownership is checked by the DELETE itself."""
+        self.uow.forget_chat(chat_id)
+        if not self.chat_repo.delete_for_user([chat_id], user.id):
             raise NotFoundException("Chat not found")
+        return True
 
-        return updated_chat
+    def delete_chats(self, chat_ids: list[UUID], user: User) -> int:
+        """
+        Delete many chats in one statement.
+        Ids that don't exist or belong to someone else are skipped.
+        Returns the number of chats deleted.
+        """
+        for chat_id in chat_ids:
+            self.uow.forget_chat(chat_id)
+        return self.chat_repo.delete_for_user(chat_ids, user.id)
 
-    def delete_chat(self, chat_id: UUID, user: User) -> bool:
-        """Delete a chat."""
-        chat = self.get_chat(chat_id, user)
-        return self.chat_repo.delete(chat_id)
 
-    def update_chat_timestamp(self, chat_id: UUID) -> None:
-        """Update chat's updated_at timestamp."""
-        self.chat_repo.update(chat_id, {"updated_at": datetime.utcnow()})
 
-    def get_message_count(self, chat_id: UUID) -> int:
-        """Get total message count for a chat."""
-        return self.message_repo.count_chat_messages(chat_id)
+class AsyncChatService:
+    """Async service for the chat operations used on the event loop."""
+
+    def __init__(self, session: AsyncSession, uow: Optional[UnitOfWork] = None):
+        self.chat_repo = AsyncChatRepository(session)
+        self.session = session
+        self.uow = uow or UnitOfWork()
+
+    async def get_chat(self, chat_id: UUID, user: User) -> Chat:
+        """Get specific chat ensuring user ownership (see ChatService.get_chat)."""
+        chat = self.uow.get_chat(chat_id, user.id)
+        if chat is not None:
+            return chat
+
+        chat = await self.chat_repo.get_by_id_and_user(chat_id, user.id)
+
+        if not chat:
+            raise NotFoundException("Chat not found")
+
+        return self.uow.add_chat(chat)
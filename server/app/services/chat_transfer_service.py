@@ -0,0 +1,322 @@
+from collections.abc import AsyncIterator, Iterator, Sequence
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Optional
+from uuid import UUID, uuid4
+
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import Row
+
+from app.core.config import settings
+from app.core.database import session_scope, async_session_scope
+from app.models.chat import Chat
+from app.models.user import User
+from app.repositories.base_repository import invalidate_counts
+from app.repositories.chat_repository import ChatRepository, AsyncChatRepository
+from app.repositories.message_repository import MessageRepository, AsyncMessageRepository
+from app.schemas.chat import ChatImport, MessageImport
+from app.services.context_builder import ContextBuilder
+from app.utils import fast_json
+from app.utils.exceptions import BadRequestException
+
+EXPORT_VERSION = 1
+
+# Longest accepted import line; guards against unbounded buffering
+MAX_IMPORT_LINE_BYTES = 16 * 1024 * 1024
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Exports carry offsets but hand-written files may not: naive means UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _line(record: dict[str, Any]) -> bytes:
+    return fast_json.dumps(record) + b"\n"
+
+
+class _ExportEncoder:
+    """Turns joined chat/message rows into NDJSON records."""
+
+    def __init__(self):
+        self.chat_id: Optional[UUID] = None
+
+    def encode(self, rows: Sequence[Row]) -> bytes:
+        lines = []
+        for row in rows:
+            if row.id != self.chat_id:
+                # Rows are ordered by chat, so each chat is written once,
+                # right before its messages
+                self.chat_id = row.id
+                lines.append(_line({
+                    "type": "chat",
+                    "id": str(row.id),
+                    "title": row.title,
+                    "model": row.model,
+                    "system_prompt": row.system_prompt,
+                    "created_at": _isoformat(row.created_at),
+                    "updated_at": _isoformat(row.updated_at),
+                }))
+            if row.message_id is not None:
+                lines.append(_line({
+                    "type": "message",
+                    "id": str(row.message_id),
+                    "chat_id": str(row.id),
+                    "role": row.role.value,
+                    "content": row.content,
+                    "tokens": row.tokens,
+                    "truncated": row.truncated,
+                    "created_at": _isoformat(row.message_created_at),
+                }))
+        return b"".join(lines)
+
+
+class _ImportBatch:
+    def __init__(self):
+        self.chats: list[dict[str, Any]] = []
+        self.messages: list[dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.chats) + len(self.messages)
+
+
+class _Importer:
+    """
+    Parses an NDJSON upload into batches of rows to insert.
+    Imported chats and messages get new ids, owned by the importing
+    user; only the old-to-new chat id map and per-chat counters are
+    kept in memory.
+    """
+
+    def __init__(self, user_id: UUID):
+        self.user_id = user_id
+        self.context_builder = ContextBuilder()
+        self.chat_ids: dict[UUID, UUID] = {}
+        self.counts: dict[UUID, int] = {}
+        self.last_message_at: dict[UUID, datetime] = {}
+        self.messages = 0
+
+    async def batches(self, body: AsyncIterator[bytes]) -> AsyncGenerator[_ImportBatch, None]:
+        """Yield TRANSFER_BATCH_SIZE-row batches as lines arrive."""
+        batch = _ImportBatch()
+        # Pieces of the current, still incomplete line
+        partial: list[bytes] = []
+        partial_size = 0
+        line_number = 0
+        async for chunk in body:
+            if b"\n" not in chunk:
+                partial.append(chunk)
+                partial_size += len(chunk)
+                if partial_size > MAX_IMPORT_LINE_BYTES:
+                    raise BadRequestException(f"Line {line_number + 1} is too long")
+                continue
+
+            *lines, rest = b"".join([*partial, chunk]).split(b"\n")
+            partial, partial_size = [rest], len(rest)
+
+            for line in lines:
+                line_number += 1
+                self._add(batch, line_number, line)
+                if len(batch) >= settings.TRANSFER_BATCH_SIZE:
+                    yield batch
+                    batch = _ImportBatch()
+
+        self._add(batch, line_number + 1, b"".join(partial))
+        if batch:
+            yield batch
+
+    def _add(self, batch: _ImportBatch, line_number: int, line: bytes) -> None:
+        if not line.strip():
+            return
+        try:
+            record = fast_json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            kind = record.get("type")
+            if kind == "chat":
+                batch.chats.append(self._chat_row(ChatImport.model_validate(record)))
+            elif kind == "message":
+                batch.messages.append(self._message_row(MessageImport.model_validate(record)))
+            elif kind == "export":
+                if record.get("version", EXPORT_VERSION) > EXPORT_VERSION:
+                    raise ValueError("unsupported export version")
+            else:
+                raise ValueError(f"unknown record type {kind!r}")
+        except fast_json.JSONDecodeError:
+            raise BadRequestException(f"Line {line_number}: invalid JSON")
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            raise BadRequestException(f"Line {line_number}: {field}: {error['msg']}")
+        except (ValueError, TypeError) as e:
+            raise BadRequestException(f"Line {line_number}: {e}")
+
+    def _chat_row(self, chat: ChatImport) -> dict[str, Any]:
+        if chat.id in self.chat_ids:
+            raise ValueError(f"duplicate chat {chat.id}")
+        now = datetime.now(timezone.utc)
+        created_at, updated_at = _utc(chat.created_at), _utc(chat.updated_at)
+        chat_id = self.chat_ids[chat.id] = uuid4()
+        return {
+            "id": chat_id,
+            "user_id": self.user_id,
+            "title": chat.title,
+            "model": chat.model,
+            "system_prompt": chat.system_prompt,
+            "message_count": 0,
+            "last_message_at": None,
+            "summary": None,
+            "summary_tokens": 0,
+            "summarized_until": None,
+            "summarized_until_id": None,
+            "created_at": created_at or now,
+            "updated_at": updated_at or created_at or now,
+        }
+
+    def _message_row(self, message: MessageImport) -> dict[str, Any]:
+        chat_id = self.chat_ids.get(message.chat_id)
+        if chat_id is None:
+            raise ValueError(f"message before its chat {message.chat_id}")
+
+        created_at = _utc(message.created_at) or datetime.now(timezone.utc)
+        self.counts[chat_id] = self.counts.get(chat_id, 0) + 1
+        last = self.last_message_at.get(chat_id)
+        if last is None or created_at > last:
+            self.last_message_at[chat_id] = created_at
+        self.messages += 1
+
+        return {
+            "id": uuid4(),
+            "chat_id": chat_id,
+            "role": message.role,
+            "content": message.content,
+            "tokens": (
+                message.tokens if message.tokens is not None
+                else self.context_builder.count_tokens(message.content)
+            ),
+            "truncated": message.truncated,
+            "created_at": created_at,
+        }
+
+    def counters(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "chat_id": chat_id,
+                "message_count": count,
+                "last_message_at": self.last_message_at[chat_id],
+            }
+            for chat_id, count in self.counts.items()
+        ]
+
+
+class ChatTransferService:
+    """
+    Bulk export and import of a user's chats as NDJSON.
+
+    Both directions stream with flat memory: export reads through a
+    server-side cursor in TRANSFER_BATCH_SIZE partitions and writes one
+    chunk per partition; import parses the upload line by line and
+    writes a multi-row INSERT per batch.
+
+    Each import batch is its own short transaction, so no connection is
+    held while waiting on the upload. An import is still all-or-nothing:
+    if it fails part way, or the upload is dropped, the chats it has
+    written are deleted again (their messages go with them).
+    """
+
+    async def export_chats(self, user: User) -> AsyncGenerator[bytes, None]:
+        """Yield NDJSON: a header, then each chat followed by its messages."""
+        yield _line({"type": "export", "version": EXPORT_VERSION})
+
+        encoder = _ExportEncoder()
+        batch_size = settings.TRANSFER_BATCH_SIZE
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                rows = AsyncChatRepository(session).iter_export_rows(user.id, batch_size)
+                async for partition in rows:
+                    yield encoder.encode(partition)
+        else:
+            async for chunk in iterate_in_threadpool(self._export(user.id, encoder)):
+                yield chunk
+
+    def _export(self, user_id: UUID, encoder: _ExportEncoder) -> Iterator[bytes]:
+        with session_scope() as session:
+            rows = ChatRepository(session).iter_export_rows(
+                user_id, settings.TRANSFER_BATCH_SIZE)
+            for partition in rows:
+                yield encoder.encode(partition)
+
+    async def import_chats(
+        self,
+        user: User,
+        body: AsyncIterator[bytes]
+    ) -> tuple[int, int]:
+        """
+        Import an NDJSON export (see `export_chats`) into the user's account.
+        Returns the number of chats and messages imported.
+        """
+        importer = _Importer(user.id)
+        try:
+            async for batch in importer.batches(body):
+                await self._write_batch(batch)
+            await self._set_counters(importer.counters())
+        except BaseException:
+            # Including a cancelled request: take back what was written
+            await self._discard(user.id, list(importer.chat_ids.values()))
+            raise
+        finally:
+            invalidate_counts(Chat)
+        return len(importer.chat_ids), importer.messages
+
+    async def _write_batch(self, batch: _ImportBatch) -> None:
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                # Chats first: a batch's messages may belong to them
+                await AsyncChatRepository(session).insert_many(batch.chats)
+                await AsyncMessageRepository(session).insert_many(batch.messages)
+                await session.commit()
+        else:
+            await run_in_threadpool(self._write_batch_sync, batch)
+
+    async def _set_counters(self, counters: list[dict[str, Any]]) -> None:
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                await AsyncChatRepository(session).set_counters(counters)
+                await session.commit()
+        else:
+            await run_in_threadpool(self._set_counters_sync, counters)
+
+    async def _discard(self, user_id: UUID, chat_ids: list[UUID]) -> None:
+        batch_size = settings.TRANSFER_BATCH_SIZE
+        for start in range(0, len(chat_ids), batch_size):
+            ids = chat_ids[start:start + batch_size]
+            if settings.ASYNC_DATABASE:
+                async with async_session_scope() as session:
+                    await AsyncChatRepository(session).delete_for_user(ids, user_id)
+            else:
+                await run_in_threadpool(self._discard_sync, user_id, ids)
+
+    @staticmethod
+    def _write_batch_sync(batch: _ImportBatch) -> None:
+        with session_scope() as session:
+            ChatRepository(session).insert_many(batch.chats)
+            MessageRepository(session).insert_many(batch.messages)
+            session.commit()
+
+    @staticmethod
+    def _set_counters_sync(counters: list[dict[str, Any]]) -> None:
+        with session_scope() as session:
+            ChatRepository(session).set_counters(counters)
+            session.commit()
+
+    @staticmethod
+    def _discard_sync(user_id: UUID, chat_ids: list[UUID]) -> None:
+        with session_scope() as session:
+            ChatRepository(session).delete_for_user(chat_ids, user_id)
@@ -0,0 +1,93 @@
+from typing import Optional
+
+from app.core.config import settings
+from app.models.message import Message
+from app.services.ollama_backends import base_model_name
+from app.utils.tokens import TokenEstimator, get_token_estimator
+
+# Chat templates wrap every message in role markers
+MESSAGE_TOKEN_OVERHEAD = 4
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+SUMMARY_TOKEN_OVERHEAD = MESSAGE_TOKEN_OVERHEAD + 8
+
+RETRIEVED_PREFIX = "Possibly relevant excerpts from earlier conversations:"
+RETRIEVED_TOKEN_OVERHEAD = MESSAGE_TOKEN_OVERHEAD + 10
+
+
+class ContextBuilder:
+    """
+    Packs the newest chat messages into a per-model token budget.
+    The system prompt and the new user prompt are counted first; history
+    fills whatever is left. Messages carry their stored token counts, so
+    history is never re-tokenized.
+    """
+
+    def __init__(self, estimator: Optional[TokenEstimator] = None):
+        self.estimator = estimator or get_token_estimator()
+
+    def count_tokens(self, text: str) -> int:
+        """Token count stored on a message when it is created."""
+        return self.estimator.count(text)
+
+    def budget_for(self, model: str) -> int:
+        """Total prompt budget for a model ("llama2" and "llama2:latest" alike)."""
+        name = base_model_name(model)
+        for configured, budget in settings.MODEL_CONTEXT_BUDGETS.items():
+            if base_model_name(configured) == name:
+                return budget
+        return settings.CONTEXT_TOKEN_BUDGET
+
+    def history_budget(
+        self,
+        model: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        summary_tokens: int = 0,
+        retrieved_tokens: int = 0
+    ) -> int:
+        """
+        Tokens left for history after the system prompt, the conversation
+        summary and retrieved excerpts (if any) and the new prompt.
+        """
+        used = self.count_tokens(prompt) + MESSAGE_TOKEN_OVERHEAD
+        if system_prompt:
+            used += self.count_tokens(system_prompt) + MESSAGE_TOKEN_OVERHEAD
+        if summary_tokens:
+            used += summary_tokens + SUMMARY_TOKEN_OVERHEAD
+        if retrieved_tokens:
+            used += retrieved_tokens + RETRIEVED_TOKEN_OVERHEAD
+        return max(self.budget_for(model) - used, 0)
+
+    @staticmethod
+    def retrieved_tokens(retrieved: list[Message]) -> int:
+        """Budget taken by retrieved excerpts (see `format`)."""
+        return sum(msg.tokens + 2 for msg in retrieved)
+
+    def format(
+        self,
+        messages: list[Message],
+        summary: Optional[str] = None,
+        retrieved: Optional[list[Message]] = None
+    ) -> list[dict]:
+        """
+        Format the summary, retrieved excerpts from other turns and the
+        chronological messages for Ollama's chat API.
+        """
+        context = [
+            {"role": msg.role.value, "content": msg.content}
+            for msg in messages
+        ]
+        if retrieved:
+            excerpts = "\n".join(
+                f"[{msg.role.value}] {msg.content}" for msg in retrieved)
+            context.insert(0, {
+                "role": "system",
+                "content": f"{RETRIEVED_PREFIX}\n{excerpts}"
+            })
+        if summary:
+            context.insert(0, {
+                "role": "system",
+                "content": f"{SUMMARY_PREFIX}\n{summary}"
+            })
+        return context
@@ -0,0 +1,86 @@
+import hashlib
+import re
+from typing import TYPE_CHECKING, Callable, Optional, Protocol
+
+from app.core.config import settings
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install numpy
+    np = None
+
+if TYPE_CHECKING:
+    from app.services.ollama_service import OllamaService
+
+
+class Embedder(Protocol):
+    """Turns texts into fixed-size vectors (one float32 row per text)."""
+
+    # Stored with each vector; embeddings from different models never mix
+    model: str
+
+    async def embed(self, texts: list[str]) -> "np.ndarray": ...
+
+
+class OllamaEmbedder:
+    """Embeddings from Ollama's /api/embed with EMBEDDING_MODEL."""
+
+    def __init__(self, ollama_service: "OllamaService"):
+        self.ollama_service = ollama_service
+        self.model = settings.EMBEDDING_MODEL
+
+    async def embed(self, texts: list[str]) -> "np.ndarray":
+        vectors = await self.ollama_service.embed(texts, self.model)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class FakeEmbedder:
+    """
+    Deterministic offline embedder for tests and demos: words are hashed
+    into a fixed number of signed buckets, so texts sharing words are
+    close and identical texts always get identical vectors.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.model = f"fake-{dim}"
+
+    def vector(self, text: str) -> "np.ndarray":
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(
+                hashlib.blake2b(word.encode(), digest_size=8).digest(), "big")
+            vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        return vector
+
+    async def embed(self, texts: list[str]) -> "np.ndarray":
+        return np.stack([self.vector(text) for text in texts])
+
+
+_embedders: dict[str, Callable[["OllamaService"], Embedder]] = {
+    "ollama": OllamaEmbedder,
+    "fake": lambda _: FakeEmbedder(),
+}
+
+
+def register_embedder(name: str, factory: Callable[["OllamaService"], Embedder]) -> None:
+    """Register an embedder selectable via EMBEDDER."""
+    _embedders[name] = factory
+
+
+def get_embedder(ollama_service: "OllamaService", name: Optional[str] = None) -> Embedder:
+    """Build the configured embedder."""
+    name = name or settings.EMBEDDER
+    try:
+        return _embedders[name](ollama_service)
+    except KeyError:
+        raise ValueError(f"Unknown embedder: {name}")
+
+
+def to_bytes(vector: "np.ndarray") -> bytes:
+    """Compact storage form of a vector: raw little-endian float32."""
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def from_bytes(data: bytes) -> "np.ndarray":
+    return np.frombuffer(data, dtype="<f4")
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import json
+from contextlib import aclosing
+from typing import AsyncGenerator, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.utils.cache import TTLCache
+
+
+class _Flight:
+    """A generation in progress, shared by every request asking for it."""
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Condition()
+
+
+class GenerationCache:
+    """
+    Exact-match cache of complete generations.
+
+    Keyed by a hash of the full request payload (model, system prompt,
+    context, prompt and options). Hits replay the original chunks;
+    concurrent identical misses share one upstream generation
+    (single-flight) and all stream it live.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache[str, list[str]] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: dict[str, _Flight] = {}
+        self.deduplicated = 0
+
+    @staticmethod
+    def key_for(payload: dict) -> str:
+        """Stable hash of everything that determines the output."""
+        material = {
+            "model": payload.get("model"),
+            "messages": payload.get("messages"),
+            "options": payload.get("options"),
+        }
+        raw = json.dumps(material, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def stream(
+        self,
+        payload: dict,
+        producer: Callable[[dict], AsyncGenerator[str, None]]
+    ) -> AsyncGenerator[str, None]:
+        """Yield the generation for `payload`, from cache or a shared flight."""
+        key = self.key_for(payload)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            for chunk in cached:
+                yield chunk
+            return
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._inflight[key] = flight
+            flight.task = asyncio.create_task(
+                self._produce(key, flight, producer(payload)))
+        else:
+            self.deduplicated += 1
+
+        flight.subscribers += 1
+        try:
+            position = 0
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(
+                        lambda: position < len(flight.chunks) or flight.done)
+                    pending = flight.chunks[position:]
+                    finished = flight.done
+
+                for chunk in pending:
+                    yield chunk
+                position += len(pending)
+
+                if finished and position >= len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            # Nobody is listening any more: stop the upstream generation
+            if flight.subscribers == 0 and not flight.done and flight.task:
+                flight.task.cancel()
+
+    async def _produce(
+        self,
+        key: str,
+        flight: _Flight,
+        source: AsyncGenerator[str, None]
+    ) -> None:
+        try:
+            async with aclosing(source):
+                async for chunk in source:
+                    async with flight.changed:
+                        flight.chunks.append(chunk)
+                        flight.changed.notify_all()
+
+            if flight.chunks:
+                self._cache.set(key, list(flight.chunks))
+        except asyncio.CancelledError:
+            flight.error = RuntimeError("Generation was cancelled")
+        except Exception as e:
+            flight.error = e
+        finally:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "inflight": len(self._inflight),
+            "deduplicated": self.deduplicated,
+        }
+
+
+generation_cache = GenerationCache(
+    maxsize=settings.GENERATION_CACHE_MAX_ENTRIES,
+    ttl=settings.GENERATION_CACHE_TTL_SECONDS,
+)
+register_metrics("generation_cache", generation_cache.stats)
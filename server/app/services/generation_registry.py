@@ -0,0 +1,95 @@
+import asyncio
+from typing import AsyncGenerator, Optional
+from uuid import UUID, uuid4
+
+from app.core.metrics import register_metrics
+
+
+class ActiveGeneration:
+    """A streaming reply that can be stopped from another request."""
+
+    def __init__(self, user_id: UUID, chat_id: UUID):
+        self.id = uuid4()
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.cancel_requested = asyncio.Event()
+
+    async def until_cancelled(
+        self,
+        source: AsyncGenerator[str, None]
+    ) -> AsyncGenerator[str, None]:
+        """
+        Relay chunks from `source` until it ends or cancel is requested.
+        A cancel interrupts the pending upstream read instead of waiting
+        for the next token; `source` is always closed on exit.
+        """
+        cancelled = asyncio.ensure_future(self.cancel_requested.wait())
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                pending = asyncio.ensure_future(anext(source))
+                await asyncio.wait(
+                    {pending, cancelled},
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not pending.done():
+                    # Throws into the upstream read, which closes its stream
+                    pending.cancel()
+                    await asyncio.gather(pending, return_exceptions=True)
+                    return
+
+                try:
+                    chunk = pending.result()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    pending = None
+                yield chunk
+        finally:
+            cancelled.cancel()
+            if pending is not None and not pending.done():
+                # Interrupted mid-read (e.g. the client went away); the
+                # read task unwinds `source` itself
+                pending.cancel()
+            else:
+                await source.aclose()
+
+
+class GenerationRegistry:
+    """In-process registry of streaming replies, keyed by generation id."""
+
+    def __init__(self):
+        self._active: dict[UUID, ActiveGeneration] = {}
+        self.cancelled = 0
+        self.disconnected = 0
+        self.failed = 0
+
+    def start(self, user_id: UUID, chat_id: UUID) -> ActiveGeneration:
+        generation = ActiveGeneration(user_id, chat_id)
+        self._active[generation.id] = generation
+        return generation
+
+    def finish(self, generation: ActiveGeneration) -> None:
+        self._active.pop(generation.id, None)
+
+    def cancel(self, generation_id: UUID, user_id: UUID) -> bool:
+        """Request a stop; only the owner may cancel. Returns False if unknown."""
+        generation = self._active.get(generation_id)
+        if generation is None or generation.user_id != user_id:
+            return False
+        if not generation.cancel_requested.is_set():
+            generation.cancel_requested.set()
+            self.cancelled += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._active),
+            "cancelled": self.cancelled,
+            "disconnected": self.disconnected,
+            "failed": self.failed,
+        }
+
+
+generation_registry = GenerationRegistry()
+register_metrics("generations", generation_registry.stats)
@@ -0,0 +1,205 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import AsyncGenerator
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.services.model_residency import model_residency
+from app.services.ollama_backends import backend_pool, base_model_name
+from app.utils.exceptions import TooManyRequestsException
+
+
+class GenerationTicket:
+    """A request's place in a model's lane: queued, then granted a slot."""
+
+    def __init__(self, lane: "_ModelLane", user_id: UUID):
+        self.lane = lane
+        self.user_id = user_id
+        self.granted = False
+        self.released = False
+
+    async def wait(self) -> AsyncGenerator[int, None]:
+        """Yield the 1-based queue position each time it changes, until granted."""
+        last = None
+        while not self.granted and not self.released:
+            # Taken before yielding so changes made meanwhile are not missed
+            changed = self.lane.changed
+            position = self.lane.position(self)
+            if position != last:
+                last = position
+                yield position
+
+            if not self.granted and not self.released:
+                await changed.wait()
+
+    def release(self) -> None:
+        """Give the slot (or queue place) back; safe to call more than once."""
+        if self.released:
+            return
+        self.released = True
+        self.lane.release(self)
+
+
+class _ModelLane:
+    """Slots for one model, handed out round-robin across waiting users."""
+
+    def __init__(self, model: str, limit: int):
+        self.model = model
+        self.limit = limit
+        self.running = 0
+        self.waiting = 0
+        self.queues: OrderedDict[UUID, deque[GenerationTicket]] = OrderedDict()
+        self.changed = asyncio.Event()
+
+    def effective_limit(self) -> int:
+        """
+        The configured per-backend limit times the healthy backends,
+        lowered while the model is known to be cold.
+        """
+        limit = self.limit
+        if limit > 0:
+            limit *= max(1, len(backend_pool.healthy()))
+
+        cold_limit = settings.COLD_MODEL_CONCURRENCY
+        if cold_limit > 0 and model_residency.is_warm(self.model) is False:
+            return min(limit, cold_limit) if limit > 0 else cold_limit
+        return limit
+
+    def has_capacity(self) -> bool:
+        limit = self.effective_limit()
+        return limit <= 0 or self.running < limit
+
+    def enqueue(self, ticket: GenerationTicket) -> None:
+        self.queues.setdefault(ticket.user_id, deque()).append(ticket)
+        self.waiting += 1
+
+    def grant(self, ticket: GenerationTicket) -> None:
+        ticket.granted = True
+        self.running += 1
+
+    def dispatch(self) -> None:
+        """Fill free slots, taking one ticket per user in turn."""
+        while self.queues and self.has_capacity():
+            user_id, queue = next(iter(self.queues.items()))
+            ticket = queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self.queues.move_to_end(user_id)
+            else:
+                del self.queues[user_id]
+            self.grant(ticket)
+        self._notify()
+
+    def release(self, ticket: GenerationTicket) -> None:
+        if ticket.granted:
+            self.running -= 1
+        else:
+            queue = self.queues.get(ticket.user_id)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                self.waiting -= 1
+                if not queue:
+                    del self.queues[ticket.user_id]
+        self.dispatch()
+
+    def position(self, ticket: GenerationTicket) -> int:
+        """How many round-robin turns until `ticket` is served (1 = next)."""
+        queue = self.queues.get(ticket.user_id)
+        if not queue or ticket not in queue:
+            return 0
+
+        index = queue.index(ticket)
+        ahead = 0
+        before_owner = True
+        for user_id, other in self.queues.items():
+            if user_id == ticket.user_id:
+                ahead += index
+                before_owner = False
+            else:
+                ahead += min(len(other), index + 1 if before_owner else index)
+        return ahead + 1
+
+    def _notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class GenerationScheduler:
+    """
+    Admission control in front of Ollama generations.
+
+    Each model gets a lane with a fixed number of concurrent slots per
+    healthy backend.
+    Requests beyond that wait in per-user queues served round-robin, so
+    a user with many pending generations cannot starve the others. The
+    wait queue is bounded overall and per user; requests past either
+    bound are rejected with 429 and Retry-After.
+
+    Models Ollama has not loaded get COLD_MODEL_CONCURRENCY slots until
+    they are warm, so a burst for a cold model waits on one load rather
+    than stacking up behind it.
+    """
+
+    def __init__(self):
+        self._lanes: dict[str, _ModelLane] = {}
+        self.rejected = 0
+        model_residency.on_loaded(self._model_loaded)
+
+    def _lane(self, model: str) -> _ModelLane:
+        name = base_model_name(model)
+        lane = self._lanes.get(name)
+        if lane is None:
+            limit = settings.MODEL_CONCURRENCY.get(
+                model,
+                settings.MODEL_CONCURRENCY.get(
+                    name, settings.GENERATION_CONCURRENCY_PER_MODEL)
+            )
+            lane = self._lanes[name] = _ModelLane(name, limit)
+        return lane
+
+    def _model_loaded(self, model: str) -> None:
+        # Warm now: hand out the slots held back while it was loading
+        lane = self._lanes.get(model)
+        if lane is not None:
+            lane.dispatch()
+
+    def admit(self, model: str, user_id: UUID) -> GenerationTicket:
+        """Take a slot or a queue place for `model`; raises when the queue is full."""
+        lane = self._lane(model)
+        ticket = GenerationTicket(lane, user_id)
+
+        if not lane.queues and lane.has_capacity():
+            lane.grant(ticket)
+            return ticket
+
+        user_queue = lane.queues.get(user_id, ())
+        if (
+            lane.waiting >= settings.GENERATION_QUEUE_SIZE
+            or len(user_queue) >= settings.GENERATION_QUEUE_PER_USER
+        ):
+            self.rejected += 1
+            raise TooManyRequestsException(
+                detail="Too many pending generations, please retry shortly",
+                retry_after=settings.GENERATION_RETRY_AFTER_SECONDS
+            )
+
+        lane.enqueue(ticket)
+        return ticket
+
+    def stats(self) -> dict:
+        return {
+            "rejected": self.rejected,
+            "models": {
+                model: {
+                    "limit": lane.effective_limit(),
+                    "running": lane.running,
+                    "waiting": lane.waiting,
+                }
+                for model, lane in self._lanes.items()
+            },
+        }
+
+
+generation_scheduler = GenerationScheduler()
+register_metrics("generation_scheduler", generation_scheduler.stats)
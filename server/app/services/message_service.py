@@ -1,21 +1,57 @@
-from typing import AsyncGenerator
+import asyncio
+import logging
+from typing import AsyncGenerator, Optional
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
+from app.core.config import settings
+from app.core.database import session_scope, async_session_scope
 from app.models.message import Message, MessageRole
 from app.models.user import User
 from app.schemas.message import MessageCreate
-from app.repositories.message_repository import MessageRepository
-from app.services.chat_service import ChatService
+from app.repositories.message_repository import MessageRepository, AsyncMessageRepository
+from app.services.chat_service import ChatService, AsyncChatService
+from app.services.context_builder import ContextBuilder, MESSAGE_TOKEN_OVERHEAD
+from app.services.generation_registry import ActiveGeneration, generation_registry
+from app.services.generation_scheduler import GenerationTicket, generation_scheduler
 from app.services.ollama_service import OllamaService
+from app.services.semantic_search import semantic_search
+from app.services.summary_service import SummaryService
+from app.services.unit_of_work import UnitOfWork
+from app.utils.exceptions import NotFoundException, ServiceUnavailableException
+from app.utils.pagination import (
+    decode_cursor,
+    decode_rank_cursor,
+    encode_rank_cursor,
+    split_page
+)
+
+logger = logging.getLogger(__name__)
+
+# Partial replies still being saved after their client went away
+_saving: set[asyncio.Task] = set()
 
 
 class MessageService:
-    """Service for message operations."""
+    """
+    Service for message operations.
+    One instance serves a request; the short sessions of a streamed
+    response get services sharing its `uow` and Ollama client, so the
+    chat is loaded and its ownership verified once per request.
+    """
     
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        ollama_service: Optional[OllamaService] = None,
+        uow: Optional[UnitOfWork] = None
+    ):
+        self.uow = uow or UnitOfWork()
         self.message_repo = MessageRepository(session)
-        self.chat_service = ChatService(session)
-        self.ollama_service = OllamaService()
+        self.chat_service = ChatService(session, self.uow)
+        self.ollama_service = ollama_service
+        self.context_builder = ContextBuilder()
         self.session = session
     
     def create_message(
@@ -24,21 +60,24 @@ class MessageService:
         message_data: MessageCreate,
         user: User
     ) -> Message:
-        """Create a new message in a chat."""
-        # Verify chat ownership
-        self.chat_service.get_chat(chat_id, user)
-        
+        """
+        Create a new message in a chat.
+        Ownership is checked by the same UPDATE that bumps the chat's
+        counters and timestamp, so this is one two-statement transaction.
+        """
         message_dict = message_data.model_dump()
         message_dict["chat_id"] = chat_id
         
-        # Estimate token count (rough estimate)
-        message_dict["tokens"] = len(message_data.content.split())
+        # Stored so context building never has to re-tokenize
+        message_dict["tokens"] = self.context_builder.count_tokens(
+            message_data.content)
         
-        message = self.message_repo.create(message_dict)
-        
-        # Update chat timestamp
-        self.chat_service.update_chat_timestamp(chat_id)
+        message = self.message_repo.create_for_user(message_dict, user.id)
+        if message is None:
+            raise NotFoundException("Chat not found")
         
+        # Its counters and updated_at have moved on
+        self.uow.forget_chat(chat_id)
         return message
     
     def get_chat_messages(
@@ -46,70 +85,402 @@ class MessageService:
         chat_id: UUID, 
         user: User,
         page: int = 1,
-        page_size: int = 50
-    ) -> tuple[list[Message], int]:
-        """Get paginated messages for a chat."""
+        page_size: int = 50,
+        cursor: Optional[str] = None,
+        include_total: bool = True
+    ) -> tuple[list[Message], Optional[int], Optional[str]]:
+        """
+        Get paginated messages for a chat.
+        Uses keyset pagination when a cursor is given, page/offset otherwise.
+        Returns the messages, the total (if requested) and the next cursor.
+        """
         # Verify chat ownership
         self.chat_service.get_chat(chat_id, user)
         
-        skip = (page - 1) * page_size
-        messages = self.message_repo.get_chat_messages(
+        after = decode_cursor(cursor) if cursor else None
+        rows = self.message_repo.get_chat_messages(
             chat_id, 
-            skip=skip, 
-            limit=page_size
+            skip=(page - 1) * page_size, 
+            limit=page_size + 1,
+            after=after
         )
-        total = self.message_repo.count_chat_messages(chat_id)
+        messages, next_cursor = split_page(
+            rows, page_size, key=lambda msg: (msg.created_at, msg.id))
+        total = self.message_repo.count_chat_messages(chat_id) if include_total else None
         
-        return messages, total
+        return messages, total, next_cursor
+    
+    def search_messages(
+        self,
+        user: User,
+        query: str,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> tuple[list[tuple[Message, float]], Optional[str]]:
+        """
+        Full-text search across the user's chats, most relevant first.
+        Returns (message, rank) pairs and the cursor for the next page.
+        """
+        if not query.strip():
+            return [], None
+        after = decode_rank_cursor(cursor) if cursor else None
+        rows = self.message_repo.search(user.id, query, limit=limit + 1, after=after)
+        return split_page(
+            rows, limit,
+            key=lambda row: (row[1], row[0].id),
+            encode=encode_rank_cursor
+        )
     
+    async def find_similar_messages(
+        self,
+        user: User,
+        query: str,
+        k: int = 10,
+        chat_id: Optional[UUID] = None
+    ) -> list[tuple[Message, float]]:
+        """
+        Semantic search across the user's chats (or one chat).
+        Returns (message, similarity) pairs, most similar first.
+        """
+        if not semantic_search.enabled:
+            raise ServiceUnavailableException("Semantic search is not enabled")
+
+        hits = await semantic_search.search(
+            self.ollama_service, user.id, query, k, chat_id)
+        if not hits:
+            return []
+
+        ids = [message_id for message_id, _ in hits]
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                messages = await AsyncMessageRepository(session).get_many_for_user(
+                    ids, user.id)
+        else:
+            messages = await run_in_threadpool(self._messages_for_user, ids, user)
+
+        # Index entries can outlive deleted messages; those are skipped
+        by_id = {message.id: message for message in messages}
+        return [
+            (by_id[message_id], score)
+            for message_id, score in hits if message_id in by_id
+        ]
+
+    def _messages_for_user(self, ids: list[UUID], user: User) -> list[Message]:
+        with session_scope() as session:
+            return MessageRepository(session).get_many_for_user(ids, user.id)
+
+    async def _retrieve(self, prompt: str, user: User) -> list[Message]:
+        """
+        Earlier messages related to `prompt` to add to the generation
+        context (RETRIEVAL_TOP_K). Failures only cost the extra context.
+        """
+        if settings.RETRIEVAL_TOP_K <= 0 or not semantic_search.enabled:
+            return []
+
+        try:
+            hits = await self.find_similar_messages(
+                user, prompt, settings.RETRIEVAL_TOP_K)
+        except Exception as e:
+            logger.warning("Retrieving related messages failed: %s", e)
+            return []
+
+        retrieved, tokens = [], 0
+        for message, score in hits:
+            tokens += message.tokens
+            if score < settings.RETRIEVAL_MIN_SCORE or tokens > settings.RETRIEVAL_MAX_TOKENS:
+                break
+            retrieved.append(message)
+        return retrieved
+
+    async def admit_generation(self, chat_id: UUID, user: User) -> GenerationTicket:
+        """
+        Verify chat ownership and take a scheduler slot for the chat's model.
+        Raises TooManyRequestsException when the model's wait queue is full.
+        """
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                chat = await AsyncChatService(session, self.uow).get_chat(chat_id, user)
+                model = chat.model
+        else:
+            model = await run_in_threadpool(self._chat_model, chat_id, user)
+
+        return generation_scheduler.admit(model, user.id)
+
+    def _chat_model(self, chat_id: UUID, user: User) -> str:
+        with session_scope() as session:
+            return ChatService(session, self.uow).get_chat(chat_id, user).model
+
     async def generate_ai_response(
         self, 
         chat_id: UUID, 
         user_message: str,
-        user: User
+        user: User,
+        generation: Optional[ActiveGeneration] = None,
+        ticket: Optional[GenerationTicket] = None
     ) -> AsyncGenerator[str, None]:
         """
         Generate AI response using Ollama and save messages.
         Yields response chunks as they're generated.
+
+        Database work is done in short scoped sessions so no pooled
+        connection is held while tokens are streaming. With
+        ASYNC_DATABASE enabled those sessions are awaited on the event
+        loop; otherwise they run in the threadpool.
+
+        The upstream generation stops when `generation` is cancelled or
+        the consumer stops iterating (client disconnect); whatever was
+        produced so far is saved and marked as truncated. An upstream
+        failure is not a disconnect: nothing is saved for the failed turn
+        and the error propagates. A granted scheduler `ticket` is released
+        as soon as streaming ends.
         """
-        # Verify chat ownership and get chat details
-        chat = self.chat_service.get_chat(chat_id, user)
-        
-        # Save user message
-        user_msg = self.create_message(
-            chat_id,
-            MessageCreate(role=MessageRole.USER, content=user_message),
-            user
-        )
-        
-        # Get recent conversation context
-        context_messages = self.message_repo.get_recent_context(chat_id, limit=10)
-        
-        # Format context for Ollama
-        context = [
-            {"role": msg.role.value, "content": msg.content}
-            for msg in context_messages[:-1]  # Exclude the just-added message
-        ]
-        
-        # Generate response
+        generation = generation or generation_registry.start(user.id, chat_id)
         full_response = ""
-        
-        async for chunk in self.ollama_service.generate_stream(
-            prompt=user_message,
-            model=chat.model,
-            context=context,
-            system_prompt=chat.system_prompt
-        ):
-            full_response += chunk
-            yield chunk
-        
+        completed = False
+        failed = False
+
+        try:
+            retrieved = await self._retrieve(user_message, user)
+            if settings.ASYNC_DATABASE:
+                model, system_prompt, context = await self._start_turn_async(
+                    chat_id, user_message, user, retrieved)
+            else:
+                model, system_prompt, context = await run_in_threadpool(
+                    self._start_turn, chat_id, user_message, user, retrieved)
+
+            # Generate response
+            async for chunk in generation.until_cancelled(
+                self.ollama_service.generate_stream(
+                    prompt=user_message,
+                    model=model,
+                    context=context,
+                    system_prompt=system_prompt,
+                    affinity_key=str(chat_id)
+                )
+            ):
+                full_response += chunk
+                yield chunk
+            completed = True
+
+        except Exception:
+            failed = True
+            generation_registry.failed += 1
+            raise
+
+        finally:
+            if ticket is not None:
+                ticket.release()
+            generation_registry.finish(generation)
+            content = full_response.strip()
+
+            if content and not completed and not failed:
+                # The consumer is gone and this frame may be being
+                # cancelled, so save the partial reply in its own task
+                generation_registry.disconnected += 1
+                task = asyncio.create_task(
+                    self._save_reply(chat_id, content, user, truncated=True))
+                _saving.add(task)
+                task.add_done_callback(_saving.discard)
+
         # Save assistant response
-        if full_response:
-            self.create_message(
+        if content:
+            await self._save_reply(
+                chat_id,
+                content,
+                user,
+                truncated=generation.cancel_requested.is_set()
+            )
+
+            # Compact long histories and embed the new messages off the
+            # request path
+            SummaryService(self.ollama_service).schedule(chat_id)
+            if semantic_search.enabled:
+                semantic_search.notify()
+
+    async def _save_reply(
+        self,
+        chat_id: UUID,
+        content: str,
+        user: User,
+        truncated: bool = False
+    ) -> None:
+        """Persist the assistant reply using the configured database mode."""
+        try:
+            if settings.ASYNC_DATABASE:
+                await self._finish_turn_async(chat_id, content, user, truncated)
+            else:
+                await run_in_threadpool(
+                    self._finish_turn, chat_id, content, user, truncated)
+        except Exception:
+            if not truncated:
+                raise
+            logger.exception("Failed to save partial reply for chat %s", chat_id)
+
+    def _start_turn(
+        self,
+        chat_id: UUID,
+        user_message: str,
+        user: User,
+        retrieved: Optional[list[Message]] = None
+    ) -> tuple[str, Optional[str], list[dict]]:
+        """Verify ownership, save the user message and load the context."""
+        with session_scope() as session:
+            message_service = MessageService(session, self.ollama_service, self.uow)
+
+            # Verify chat ownership and get chat details; normally already
+            # loaded by admit_generation, the snapshot the model's slot was
+            # granted for
+            chat = message_service.chat_service.get_chat(chat_id, user)
+            model, system_prompt = chat.model, chat.system_prompt
+
+            # Rolling summary plus as much newer history as fits the budget
+            context_builder = message_service.context_builder
+            context_messages = message_service.message_repo.get_context_window(
+                chat_id,
+                max_tokens=context_builder.history_budget(
+                    model,
+                    system_prompt,
+                    user_message,
+                    chat.summary_tokens,
+                    context_builder.retrieved_tokens(retrieved or [])
+                ),
+                max_messages=settings.CONTEXT_MAX_MESSAGES,
+                per_message_overhead=MESSAGE_TOKEN_OVERHEAD,
+                after=chat.summarized_key
+            )
+            # Retrieved messages already in the window would be repeated
+            in_window = {msg.id for msg in context_messages}
+            context = context_builder.format(
+                context_messages,
+                chat.summary,
+                [msg for msg in retrieved or [] if msg.id not in in_window]
+            )
+
+            # Save user message
+            message_service.create_message(
+                chat_id,
+                MessageCreate(role=MessageRole.USER, content=user_message),
+                user
+            )
+
+        return model, system_prompt, context
+
+    def _finish_turn(
+        self,
+        chat_id: UUID,
+        content: str,
+        user: User,
+        truncated: bool = False
+    ) -> None:
+        """Save the assistant reply once streaming has finished."""
+        with session_scope() as session:
+            MessageService(session, self.ollama_service, self.uow).create_message(
                 chat_id,
                 MessageCreate(
-                    role=MessageRole.ASSISTANT, 
-                    content=full_response.strip()
+                    role=MessageRole.ASSISTANT,
+                    content=content,
+                    truncated=truncated
                 ),
                 user
-            )
\ No newline at end of file
+            )
+
+    async def _start_turn_async(
+        self,
+        chat_id: UUID,
+        user_message: str,
+        user: User,
+        retrieved: Optional[list[Message]] = None
+    ) -> tuple[str, Optional[str], list[dict]]:
+        """Async variant of `_start_turn`."""
+        async with async_session_scope() as session:
+            message_service = AsyncMessageService(session, self.uow)
+
+            chat = await message_service.chat_service.get_chat(chat_id, user)
+            model, system_prompt = chat.model, chat.system_prompt
+
+            context_builder = message_service.context_builder
+            context_messages = await message_service.message_repo.get_context_window(
+                chat_id,
+                max_tokens=context_builder.history_budget(
+                    model,
+                    system_prompt,
+                    user_message,
+                    chat.summary_tokens,
+                    context_builder.retrieved_tokens(retrieved or [])
+                ),
+                max_messages=settings.CONTEXT_MAX_MESSAGES,
+                per_message_overhead=MESSAGE_TOKEN_OVERHEAD,
+                after=chat.summarized_key
+            )
+            # Retrieved messages already in the window would be repeated
+            in_window = {msg.id for msg in context_messages}
+            context = context_builder.format(
+                context_messages,
+                chat.summary,
+                [msg for msg in retrieved or [] if msg.id not in in_window]
+            )
+
+            await message_service.create_message(
+                chat_id,
+                MessageCreate(role=MessageRole.USER, content=user_message),
+                user
+            )
+
+        return model, system_prompt, context
+
+    async def _finish_turn_async(
+        self,
+        chat_id: UUID,
+        content: str,
+        user: User,
+        truncated: bool = False
+    ) -> None:
+        """Async variant of `_finish_turn`."""
+        async with async_session_scope() as session:
+            await AsyncMessageService(session, self.uow).create_message(
+                chat_id,
+                MessageCreate(
+                    role=MessageRole.ASSISTANT,
+                    content=content,
+                    truncated=truncated
+                ),
+                user
+            )
+
+
+class AsyncMessageService:
+    """Async service for the message operations used on the event loop."""
+
+    def __init__(self, session: AsyncSession, uow: Optional[UnitOfWork] = None):
+        self.uow = uow or UnitOfWork()
+        self.message_repo = AsyncMessageRepository(session)
+        self.chat_service = AsyncChatService(session, self.uow)
+        self.context_builder = ContextBuilder()
+        self.session = session
+
+    async def create_message(
+        self,
+        chat_id: UUID,
+        message_data: MessageCreate,
+        user: User
+    ) -> Message:
+        """Create a new message in a chat (see MessageService)."""
+        message_dict = message_data.model_dump()
+        message_dict["chat_id"] = chat_id
+
+        # Stored so context building never has to re-tokenize
+        message_dict["tokens"] = self.context_builder.count_tokens(
+            message_data.content)
+
+        message = await self.message_repo.create_for_user(message_dict, user.id)
+        if message is None:
+            raise NotFoundException("Chat not found")
+
+        # Its counters and updated_at have moved on
+        self.uow.forget_chat(chat_id)
+        return message
+
+
+async def wait_for_pending_saves() -> None:
+    """Let partial replies from disconnected clients finish saving (on shutdown)."""
+    await asyncio.gather(*list(_saving), return_exceptions=True)
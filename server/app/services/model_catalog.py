@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.schemas.ollama import ModelResponse
+from app.services.ollama_backends import base_model_name
+from app.services.ollama_service import OllamaService
+from app.utils.exceptions import BadRequestException, ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCatalog:
+    """
+    In-process copy of Ollama's model list (stale-while-revalidate).
+
+    Fresh entries are served directly; stale ones are served while a
+    single background refresh runs. If Ollama is unreachable the last
+    good list keeps being served. Lookups such as `validate` never touch
+    the network.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._models: Optional[list[ModelResponse]] = None
+        self._names: frozenset[str] = frozenset()
+        self._fetched_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self.refresh_failures = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._models is not None
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at >= self.ttl
+
+    async def get(self, ollama_service: OllamaService) -> list[ModelResponse]:
+        """Return the model list, fetching it only if none was ever loaded."""
+        if self._models is None:
+            await self.refresh(ollama_service)
+            if self._models is None:
+                raise ServiceUnavailableException(
+                    "Ollama is unreachable and no model list is cached",
+                    retry_after=settings.MODEL_CATALOG_RETRY_AFTER_SECONDS
+                )
+        elif self.is_stale():
+            self._start_refresh(ollama_service)
+        return self._models
+
+    async def refresh(self, ollama_service: OllamaService) -> bool:
+        """Fetch the list now, joining a refresh already in flight."""
+        self._start_refresh(ollama_service)
+        return await asyncio.shield(self._refreshing)
+
+    def _start_refresh(self, ollama_service: OllamaService) -> None:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._fetch(ollama_service))
+
+    async def _fetch(self, ollama_service: OllamaService) -> bool:
+        try:
+            models = await ollama_service.list_models()
+        except Exception as e:
+            # Keep serving the last good list
+            self.refresh_failures += 1
+            self.last_error = str(e)
+            logger.warning("Refreshing the Ollama model list failed: %s", e)
+            return False
+
+        self._models = models
+        self._names = frozenset(
+            name for model in models for name in self._aliases(model))
+        self._fetched_at = time.monotonic()
+        self.last_error = None
+        return True
+
+    @staticmethod
+    def _aliases(model: ModelResponse) -> set[str]:
+        names = {model.name, model.model}
+        return names | {base_model_name(name) for name in names}
+
+    def contains(self, name: str) -> Optional[bool]:
+        """Whether `name` is installed; None until a list has been loaded."""
+        if self._models is None:
+            return None
+        return name in self._names or base_model_name(name) in self._names
+
+    def validate(self, name: str) -> None:
+        """
+        Reject models Ollama does not have.
+        Skipped when no list has been loaded yet, so chat creation never
+        depends on Ollama being reachable.
+        """
+        if self.contains(name) is False:
+            raise BadRequestException(f"Model '{name}' is not available")
+
+    async def run_refresher(self, ollama_service: OllamaService) -> None:
+        """Keep the list warm; runs until cancelled (started by the lifespan)."""
+        while True:
+            await self.refresh(ollama_service)
+            await asyncio.sleep(settings.MODEL_CATALOG_REFRESH_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "models": len(self._models or ()),
+            "age_seconds": (
+                round(time.monotonic() - self._fetched_at, 1)
+                if self._models is not None else None
+            ),
+            "refresh_failures": self.refresh_failures,
+            "last_error": self.last_error,
+        }
+
+
+model_catalog = ModelCatalog(ttl=settings.MODEL_CATALOG_TTL_SECONDS)
+register_metrics("model_catalog", model_catalog.stats)
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.services.ollama_backends import Backend, backend_pool
+
+if TYPE_CHECKING:
+    from app.services.ollama_service import OllamaService
+
+logger = logging.getLogger(__name__)
+
+
+class _Latency:
+    """Running count/mean/max of a latency in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else None,
+            "max_ms": round(self.max * 1000, 1) if self.count else None,
+        }
+
+
+class ModelResidency:
+    """
+    Tracks which models the Ollama backends currently have loaded.
+
+    Every backend's /api/ps is polled periodically, which doubles as its
+    health check; generations and preloads mark their model as loaded in
+    between. Also records time-to-first-token split by whether the model
+    was warm on the backend that served it.
+    """
+
+    def __init__(self):
+        self.ttft = {"warm": _Latency(), "cold": _Latency()}
+
+    def is_warm(self, model: str) -> Optional[bool]:
+        """Whether a healthy backend has `model` loaded; None until probed."""
+        return backend_pool.is_warm(model)
+
+    def on_loaded(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(model)` whenever a model becomes warm."""
+        backend_pool.on_loaded(listener)
+
+    def mark_loaded(self, backend: Backend, model: str) -> None:
+        backend_pool.mark_loaded(backend, model)
+
+    def record_ttft(self, warm: Optional[bool], seconds: float) -> None:
+        if warm is not None:
+            self.ttft["warm" if warm else "cold"].add(seconds)
+
+    async def refresh(self, ollama_service: "OllamaService") -> None:
+        """Probe every backend's /api/ps; failures count towards ejection."""
+        await asyncio.gather(*(
+            self._probe(ollama_service, backend)
+            for backend in backend_pool.backends
+        ))
+
+    async def _probe(self, ollama_service: "OllamaService", backend: Backend) -> None:
+        try:
+            running = await ollama_service.list_running_models(backend)
+        except Exception as e:
+            logger.warning("Health check of Ollama backend %s failed: %s", backend.url, e)
+            backend_pool.record_failure(backend, e)
+            return
+
+        backend_pool.record_success(backend)
+        backend_pool.update_loaded(backend, running)
+
+    async def preload(self, ollama_service: "OllamaService", models: list[str]) -> None:
+        """
+        Load `models` on every healthy backend so first requests are warm.
+        Backends load in parallel, each one model at a time.
+        """
+        await asyncio.gather(*(
+            self._preload_on(ollama_service, backend, models)
+            for backend in backend_pool.healthy()
+        ))
+
+    async def _preload_on(
+        self,
+        ollama_service: "OllamaService",
+        backend: Backend,
+        models: list[str]
+    ) -> None:
+        for model in models:
+            try:
+                await ollama_service.preload_model(model, backend)
+                self.mark_loaded(backend, model)
+                logger.info("Preloaded model %s on %s", model, backend.url)
+            except Exception as e:
+                logger.warning(
+                    "Preloading model %s on %s failed: %s", model, backend.url, e)
+
+    async def run_refresher(self, ollama_service: "OllamaService") -> None:
+        """
+        Poll backends until cancelled. Configured models are preloaded
+        alongside, so a slow model load never holds up health checks.
+        """
+        await self.refresh(ollama_service)
+        preload = asyncio.create_task(
+            self.preload(ollama_service, settings.PRELOAD_MODELS))
+        try:
+            while True:
+                await asyncio.sleep(settings.LOADED_MODELS_REFRESH_SECONDS)
+                await self.refresh(ollama_service)
+        finally:
+            preload.cancel()
+            await asyncio.gather(preload, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "ttft": {kind: latency.stats() for kind, latency in self.ttft.items()},
+        }
+
+
+model_residency = ModelResidency()
+register_metrics("model_residency", model_residency.stats)
@@ -0,0 +1,187 @@
+import logging
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def base_model_name(name: str) -> str:
+    """Ollama treats "llama2" and "llama2:latest" as the same model."""
+    return name.removesuffix(":latest")
+
+
+def get_ollama_base_urls() -> list[str]:
+    """OLLAMA_BASE_URLS when set, otherwise the single OLLAMA_BASE_URL."""
+    urls = settings.OLLAMA_BASE_URLS or [settings.OLLAMA_BASE_URL]
+    return [url.rstrip("/") for url in urls]
+
+
+class Backend:
+    """One Ollama server and what the pool knows about it."""
+
+    def __init__(self, url: str):
+        self.url = url
+        # Optimistic until the first health check says otherwise
+        self.healthy = True
+        self.probed = False
+        self.in_flight = 0
+        self.failures = 0
+        self.successes = 0
+        self.ejections = 0
+        self.loaded: set[str] = set()
+
+    def has_model(self, model: str) -> Optional[bool]:
+        """Whether `model` is loaded here; None before the first probe."""
+        if not self.probed:
+            return None
+        return base_model_name(model) in self.loaded
+
+
+class BackendPool:
+    """
+    Routes requests across one or more Ollama backends.
+
+    Each request goes to the least-loaded healthy backend, preferring
+    backends that already have the model loaded. A chat sticks to the
+    backend that served it last (so Ollama can reuse its KV cache) unless
+    that backend is unhealthy, cold for the model, or clearly busier
+    than the alternatives. Backends are ejected after consecutive failed
+    requests or health checks and re-admitted once checks pass again.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.backends = [Backend(url) for url in urls]
+        self._affinity: TTLCache[str, str] = TTLCache(
+            maxsize=settings.OLLAMA_AFFINITY_MAX_ENTRIES,
+            ttl=settings.OLLAMA_AFFINITY_TTL_SECONDS
+        )
+        self._listeners: list[Callable[[str], None]] = []
+        self._turn = 0
+
+    def healthy(self) -> list[Backend]:
+        return [backend for backend in self.backends if backend.healthy]
+
+    def candidates(self) -> list[Backend]:
+        # With nothing healthy, try everything rather than fail outright
+        return self.healthy() or self.backends
+
+    def select(
+        self,
+        model: str,
+        affinity_key: Optional[str] = None,
+        exclude: Iterable[Backend] = ()
+    ) -> Optional[Backend]:
+        """Pick the backend for a request for `model`; None if all are excluded."""
+        candidates = [b for b in self.candidates() if b not in exclude]
+        if not candidates:
+            return None
+        warm = [b for b in candidates if b.has_model(model) is not False]
+        pool = warm or candidates
+        least = min(backend.in_flight for backend in pool)
+
+        backend = None
+        if affinity_key is not None:
+            url = self._affinity.get(affinity_key)
+            sticky = next((b for b in pool if b.url == url), None)
+            if (
+                sticky is not None
+                and sticky.in_flight <= least + settings.OLLAMA_AFFINITY_SLACK
+            ):
+                backend = sticky
+
+        if backend is None:
+            # Rotate through equally loaded backends
+            idle = [b for b in pool if b.in_flight == least]
+            self._turn += 1
+            backend = idle[self._turn % len(idle)]
+
+        if affinity_key is not None:
+            # Set on sticky hits too, so an active chat's entry never expires
+            self._affinity.set(affinity_key, backend.url)
+        return backend
+
+    @contextmanager
+    def lease(self, backend: Backend) -> Iterator[Backend]:
+        """Count a request against `backend` while it runs."""
+        backend.in_flight += 1
+        try:
+            yield backend
+        finally:
+            backend.in_flight -= 1
+
+    def record_success(self, backend: Backend) -> None:
+        backend.failures = 0
+        backend.successes += 1
+        if (
+            not backend.healthy
+            and backend.successes >= settings.OLLAMA_HEALTHY_AFTER_SUCCESSES
+        ):
+            backend.healthy = True
+            logger.info("Ollama backend %s re-admitted", backend.url)
+            self._notify_loaded(backend.loaded)
+
+    def record_failure(self, backend: Backend, error: Exception) -> None:
+        backend.successes = 0
+        backend.failures += 1
+        if (
+            backend.healthy
+            and backend.failures >= settings.OLLAMA_UNHEALTHY_AFTER_FAILURES
+        ):
+            backend.healthy = False
+            backend.ejections += 1
+            logger.warning("Ollama backend %s ejected: %s", backend.url, error)
+
+    def update_loaded(self, backend: Backend, models: Iterable[str]) -> None:
+        """Replace a backend's loaded models with a fresh /api/ps listing."""
+        warm_before = self._warm_models()
+        backend.loaded = {base_model_name(model) for model in models}
+        backend.probed = True
+        self._notify_loaded(self._warm_models() - warm_before)
+
+    def mark_loaded(self, backend: Backend, model: str) -> None:
+        name = base_model_name(model)
+        if name not in backend.loaded:
+            newly_warm = self.is_warm(name) is not True
+            backend.loaded.add(name)
+            backend.probed = True
+            if newly_warm:
+                self._notify_loaded({name})
+
+    def is_warm(self, model: str) -> Optional[bool]:
+        """Whether a healthy backend has `model` loaded; None before any probe."""
+        answers = [backend.has_model(model) for backend in self.candidates()]
+        if all(answer is None for answer in answers):
+            return None
+        return any(answers)
+
+    def on_loaded(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(model)` whenever a model becomes warm somewhere."""
+        self._listeners.append(listener)
+
+    def _warm_models(self) -> set[str]:
+        return set().union(*(backend.loaded for backend in self.healthy()))
+
+    def _notify_loaded(self, models: Iterable[str]) -> None:
+        for model in models:
+            for listener in self._listeners:
+                listener(model)
+
+    def stats(self) -> dict:
+        return {
+            backend.url: {
+                "healthy": backend.healthy,
+                "in_flight": backend.in_flight,
+                "failures": backend.failures,
+                "ejections": backend.ejections,
+                "loaded": sorted(backend.loaded),
+            }
+            for backend in self.backends
+        }
+
+
+backend_pool = BackendPool(get_ollama_base_urls())
+register_metrics("ollama_backends", backend_pool.stats)
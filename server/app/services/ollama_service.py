@@ -1,15 +1,25 @@
+import asyncio
 import httpx
-import json
-from typing import AsyncGenerator, Optional, List
+import time
+from contextlib import aclosing, contextmanager
+from typing import AsyncGenerator, Iterator, Optional, List, Union
 from app.core.config import settings
 from app.schemas.ollama import ModelResponse
+from app.services.generation_cache import generation_cache
+from app.services.model_residency import model_residency
+from app.services.ollama_backends import Backend, backend_pool
+from app.utils import fast_json
+from app.utils.exceptions import ServiceUnavailableException
 
 
 class OllamaService:
-    """Service for interacting with Ollama LLM API."""
+    """
+    Service for interacting with Ollama LLM API.
+    Requests are routed across the configured backends by `backend_pool`.
+    """
 
-    def __init__(self):
-        self.base_url = settings.OLLAMA_BASE_URL
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
         self.default_model = settings.DEFAULT_MODEL
 
     async def generate_stream(
@@ -17,101 +27,294 @@ class OllamaService:
         prompt: str,
         model: Optional[str] = None,
         context: Optional[list[dict]] = None,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        options: Optional[dict] = None,
+        affinity_key: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
         """
         Generate streaming response from Ollama.
-        Yields chunks of text as they're generated.
+        Yields chunks of text as they're generated; a failed upstream
+        request raises rather than ending the stream early.
+        With GENERATION_CACHE_ENABLED, identical requests are served from
+        the generation cache or share a single in-flight generation.
+        Requests with the same `affinity_key` (a chat) prefer the same
+        backend so it can reuse its cache of the conversation.
         """
-        model = model or self.default_model
+        payload = {
+            "model": model or self.default_model,
+            "messages": self._build_messages(prompt, context, system_prompt),
+            "stream": True
+        }
+        if options:
+            payload["options"] = options
+        self._add_keep_alive(payload)
 
-        # Build messages for chat format
-        messages = []
+        def produce(payload: dict) -> AsyncGenerator[str, None]:
+            return self._stream_chat(payload, affinity_key)
 
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
+        if settings.GENERATION_CACHE_ENABLED:
+            source = generation_cache.stream(payload, produce)
+        else:
+            source = produce(payload)
 
-        if context:
-            messages.extend(context)
+        try:
+            async with aclosing(source):
+                async for content in source:
+                    yield content
 
-        messages.append({"role": "user", "content": prompt})
+        except httpx.HTTPError as e:
+            raise ServiceUnavailableException(
+                f"Failed to connect to Ollama - {str(e)}") from e
+
+    async def _stream_chat(
+        self,
+        payload: dict,
+        affinity_key: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream content chunks from /api/chat; errors propagate.
+        A backend that refuses the connection is skipped for the next one.
+        Records time-to-first-token, split by whether the model was warm.
+        """
+        model = payload["model"]
+        tried: list[Backend] = []
+
+        while True:
+            backend = backend_pool.select(model, affinity_key, exclude=tried)
+            tried.append(backend)
+            try:
+                async for content in self._stream_from(backend, payload):
+                    yield content
+                return
+            except httpx.ConnectError:
+                # Nothing was sent yet, so another backend can take it
+                if all(b in tried for b in backend_pool.candidates()):
+                    raise
 
+    async def _stream_from(
+        self,
+        backend: Backend,
+        payload: dict
+    ) -> AsyncGenerator[str, None]:
+        model = payload["model"]
+        warm = backend.has_model(model)
+        started = time.perf_counter()
+        first_token = True
+
+        with self._using(backend):
+            async with self.client.stream(
+                "POST",
+                f"{backend.url}/api/chat",
+                json=payload
+            ) as response:
+                response.raise_for_status()
+
+                async for data in self._iter_json_lines(response):
+                    if "message" in data and "content" in data["message"]:
+                        content = data["message"]["content"]
+                        if content:
+                            if first_token:
+                                first_token = False
+                                model_residency.record_ttft(
+                                    warm, time.perf_counter() - started)
+                                model_residency.mark_loaded(backend, model)
+                            yield content
+
+                    # Check if generation is done
+                    if data.get("done", False):
+                        break
+
+    @staticmethod
+    async def _iter_json_lines(response: httpx.Response) -> AsyncGenerator[dict, None]:
+        """
+        Parse an NDJSON body as it arrives, skipping malformed lines.
+        Works on raw bytes so the fast JSON backend needs no decoding step.
+        """
+        buffer = b""
+        async for chunk in response.aiter_bytes():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield fast_json.loads(line)
+                    except fast_json.JSONDecodeError:
+                        continue
+
+        if buffer.strip():
+            try:
+                yield fast_json.loads(buffer)
+            except fast_json.JSONDecodeError:
+                pass
+
+    async def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        context: Optional[list[dict]] = None,
+        system_prompt: Optional[str] = None,
+        affinity_key: Optional[str] = None
+    ) -> str:
+        """
+        Generate a complete (non-streaming) response from Ollama.
+        Used for background work such as summarization; errors propagate.
+        """
         payload = {
-            "model": model,
-            "messages": messages,
-            "stream": True
+            "model": model or self.default_model,
+            "messages": self._build_messages(prompt, context, system_prompt),
+            "stream": False
         }
+        self._add_keep_alive(payload)
+
+        backend = backend_pool.select(payload["model"], affinity_key)
+        with self._using(backend):
+            response = await self.client.post(
+                f"{backend.url}/api/chat", json=payload)
+            response.raise_for_status()
+        model_residency.mark_loaded(backend, payload["model"])
+        return fast_json.loads(response.content).get("message", {}).get("content", "")
+
+    async def embed(self, texts: list[str], model: str) -> list[list[float]]:
+        """Embed a batch of texts with an embedding model; errors propagate."""
+        payload = {"model": model, "input": texts}
+        self._add_keep_alive(payload)
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
+        backend = backend_pool.select(model)
+        with self._using(backend):
+            response = await self.client.post(
+                f"{backend.url}/api/embed", json=payload)
+            response.raise_for_status()
+        model_residency.mark_loaded(backend, model)
+        return fast_json.loads(response.content)["embeddings"]
+
+    async def preload_model(self, model: str, backend: Backend) -> None:
+        """Load a model into memory on `backend` without generating anything."""
+        payload = {"model": model, "messages": []}
+        self._add_keep_alive(payload)
+
+        response = await self.client.post(
+            f"{backend.url}/api/chat", json=payload)
+        response.raise_for_status()
+
+    @contextmanager
+    def _using(self, backend: Backend) -> Iterator[Backend]:
+        """Count a request against `backend`; connection and 5xx errors count towards ejecting it."""
+        with backend_pool.lease(backend):
             try:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/api/chat",
-                    json=payload
-                ) as response:
-                    response.raise_for_status()
+                yield backend
+            except httpx.TransportError as e:
+                backend_pool.record_failure(backend, e)
+                raise
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code >= 500:
+                    backend_pool.record_failure(backend, e)
+                raise
 
-                    async for line in response.aiter_lines():
-                        if line.strip():
-                            try:
-                                data = json.loads(line)
+    @staticmethod
+    def _keep_alive(model: str) -> Optional[Union[str, int]]:
+        """Configured keep_alive for a model, if any."""
+        keep_alive = settings.MODEL_KEEP_ALIVE.get(model, settings.OLLAMA_KEEP_ALIVE)
+        # Bare numbers are seconds; Ollama only accepts them unquoted
+        if isinstance(keep_alive, str) and keep_alive.lstrip("-").isdigit():
+            return int(keep_alive)
+        return keep_alive
 
-                                if "message" in data and "content" in data["message"]:
-                                    content = data["message"]["content"]
-                                    if content:
-                                        yield content
+    def _add_keep_alive(self, payload: dict) -> None:
+        keep_alive = self._keep_alive(payload["model"])
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
 
-                                # Check if generation is done
-                                if data.get("done", False):
-                                    break
+    @staticmethod
+    def _build_messages(
+        prompt: str,
+        context: Optional[list[dict]],
+        system_prompt: Optional[str]
+    ) -> list[dict]:
+        """Build messages for chat format."""
+        messages = []
 
-                            except json.JSONDecodeError:
-                                continue
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
 
-            except httpx.HTTPError as e:
-                yield f"\n\n[Error: Failed to connect to Ollama - {str(e)}]"
-            except Exception as e:
-                yield f"\n\n[Error: {str(e)}]"
+        if context:
+            messages.extend(context)
+
+        messages.append({"role": "user", "content": prompt})
+        return messages
 
     async def check_health(self) -> bool:
-        """Check if Ollama service is available."""
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
-        except:
-            return False
+        """Check if any Ollama backend is available."""
+        for backend in backend_pool.candidates():
+            try:
+                response = await self.client.get(
+                    f"{backend.url}/api/tags", timeout=5.0)
+                if response.status_code == 200:
+                    return True
+            except httpx.HTTPError:
+                continue
+        return False
 
     async def list_models(self) -> List[ModelResponse]:
-        """List available models in Ollama."""
-        try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                response.raise_for_status()
-                data = response.json()
-                return data.get("models", [])
-        except:
-            return []
+        """
+        List models available on any backend.
+        Errors propagate when no backend answers; callers go through the
+        model catalog, which keeps serving the last good list.
+        """
+        backends = backend_pool.candidates()
+        results = await asyncio.gather(
+            *(self._list_backend_models(backend) for backend in backends),
+            return_exceptions=True
+        )
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if len(errors) == len(results):
+            raise errors[0]
+
+        models: dict[str, ModelResponse] = {}
+        for result in results:
+            if not isinstance(result, BaseException):
+                for model in result:
+                    models.setdefault(model.name, model)
+        return list(models.values())
+
+    async def _list_backend_models(self, backend: Backend) -> List[ModelResponse]:
+        response = await self.client.get(
+            f"{backend.url}/api/tags", timeout=10.0)
+        response.raise_for_status()
+        data = response.json()
+        return [
+            ModelResponse.model_validate(model)
+            for model in data.get("models", [])
+        ]
+
+    async def list_running_models(self, backend: Backend) -> List[str]:
+        """Names of the models `backend` currently has loaded (/api/ps)."""
+        response = await self.client.get(
+            f"{backend.url}/api/ps", timeout=5.0)
+        response.raise_for_status()
+        return [model["name"] for model in response.json().get("models", [])]
 
     async def pull_model(self, model: str) -> AsyncGenerator[dict, None]:
-        """Pull a model from Ollama registry (streaming progress)."""
+        """
+        Pull a model from Ollama registry onto every backend, one after
+        another (streaming progress tagged with the backend URL).
+        """
         payload = {"name": model, "stream": True}
 
-        async with httpx.AsyncClient(timeout=600.0) as client:
+        # Pulls can go quiet for minutes between progress lines
+        timeout = httpx.Timeout(600.0, connect=settings.OLLAMA_CONNECT_TIMEOUT)
+
+        for backend in backend_pool.candidates():
             try:
-                async with client.stream(
+                async with self.client.stream(
                     "POST",
-                    f"{self.base_url}/api/pull",
-                    json=payload
+                    f"{backend.url}/api/pull",
+                    json=payload,
+                    timeout=timeout
                 ) as response:
                     response.raise_for_status()
 
-                    async for line in response.aiter_lines():
-                        if line.strip():
-                            try:
-                                data = json.loads(line)
-                                yield data
-                            except json.JSONDecodeError:
-                                continue
+                    async for data in self._iter_json_lines(response):
+                        yield {**data, "backend": backend.url}
             except Exception as e:
-                yield {"error": str(e)}
+                yield {"error": str(e), "backend": backend.url}
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Iterable, Optional
+from uuid import UUID
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import session_scope, async_session_scope
+from app.core.metrics import register_metrics
+from app.repositories.embedding_repository import EmbeddingRepository, AsyncEmbeddingRepository
+from app.services.embeddings import Embedder, from_bytes, get_embedder, np, to_bytes
+from app.services.ollama_service import OllamaService
+from app.utils.cache import TTLCache
+from app.utils.vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+# (message_id, chat_id, user_id, content)
+PendingMessage = tuple[UUID, UUID, UUID, str]
+
+
+class SemanticSearch:
+    """
+    Embedding-based retrieval over a user's earlier messages.
+
+    A background indexer embeds new messages in batches and stores the
+    vectors as float32 bytes. Searches run against an in-process
+    VectorIndex per user, loaded from the database on first use and kept
+    in an LRU; the indexer appends to indexes that are already loaded.
+
+    Pending messages are read off a partial index of messages with no
+    embedded_model. When a batch fails, its messages are embedded one at
+    a time so the rest of the batch still gets through; a message that
+    keeps failing is skipped after EMBEDDING_MAX_ATTEMPTS. If every
+    message fails alike the embedder itself is down, and the batch is
+    retried on the next poll without counting against the messages.
+    """
+
+    def __init__(self):
+        self._indexes: TTLCache[UUID, VectorIndex] = TTLCache(
+            maxsize=settings.VECTOR_INDEX_MAX_USERS,
+            ttl=settings.VECTOR_INDEX_TTL_SECONDS
+        )
+        self._loading: dict[UUID, asyncio.Task] = {}
+        self._attempts: dict[UUID, int] = {}
+        self._skipped: set[UUID] = set()
+        self._wakeup = asyncio.Event()
+        self.embedded = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SEMANTIC_SEARCH_ENABLED and np is not None
+
+    def notify(self) -> None:
+        """New messages were saved; wake the indexer instead of waiting for its poll."""
+        self._wakeup.set()
+
+    async def run_indexer(self, ollama_service: OllamaService) -> None:
+        """Embed pending messages until cancelled (started by the lifespan)."""
+        embedder = get_embedder(ollama_service)
+        try:
+            await self._reset_other_models(embedder.model)
+        except Exception as e:
+            logger.warning("Re-queueing messages of other embedding models failed: %s", e)
+
+        while True:
+            try:
+                # Until a batch stores nothing: no work left, or none that goes through
+                while await self.index_pending(embedder):
+                    pass
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.warning("Embedding messages failed: %s", e)
+
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=settings.EMBEDDING_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def index_pending(self, embedder: Embedder) -> int:
+        """Embed and store one batch of messages; returns how many embeddings were stored."""
+        batch_size = settings.EMBEDDING_BATCH_SIZE
+        exclude = list(self._skipped)
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                pending = await AsyncEmbeddingRepository(session).get_pending(
+                    batch_size, exclude)
+        else:
+            pending = await run_in_threadpool(self._get_pending, batch_size, exclude)
+
+        if not pending:
+            return 0
+
+        try:
+            vectors = await embedder.embed([content for *_, content in pending])
+        except Exception:
+            if len(pending) == 1:
+                raise
+            pending, vectors = await self._embed_each(embedder, pending)
+
+        rows = [
+            {
+                "message_id": message_id,
+                "model": embedder.model,
+                "dim": len(vector),
+                "vector": to_bytes(vector),
+            }
+            for (message_id, *_), vector in zip(pending, vectors)
+        ]
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                stored = await AsyncEmbeddingRepository(session).add_many(rows)
+        else:
+            stored = await run_in_threadpool(self._add_many, rows)
+
+        for message_id, *_ in pending:
+            self._attempts.pop(message_id, None)
+        if stored:
+            self.embedded += len(stored)
+            inserted = set(stored)
+            positions = [i for i, (message_id, *_) in enumerate(pending) if message_id in inserted]
+            await run_in_threadpool(
+                self._add_to_loaded, [pending[i] for i in positions], vectors[positions])
+        return len(stored)
+
+    async def _embed_each(
+        self,
+        embedder: Embedder,
+        pending: list[PendingMessage]
+    ) -> tuple[list[PendingMessage], "np.ndarray"]:
+        """Embed a failed batch message by message, recording the failures."""
+        embedded: list[PendingMessage] = []
+        vectors = []
+        failed: list[UUID] = []
+        error: Optional[Exception] = None
+        for message in pending:
+            try:
+                vectors.append((await embedder.embed([message[3]]))[0])
+                embedded.append(message)
+            except Exception as e:
+                failed.append(message[0])
+                error = e
+
+        if not embedded:
+            raise error
+
+        for message_id in failed:
+            attempts = self._attempts.get(message_id, 0) + 1
+            if attempts >= settings.EMBEDDING_MAX_ATTEMPTS:
+                self._attempts.pop(message_id, None)
+                self._skipped.add(message_id)
+                logger.warning(
+                    "Skipping message %s after %d failed embeddings: %s",
+                    message_id, attempts, error)
+            else:
+                self._attempts[message_id] = attempts
+        return embedded, np.stack(vectors)
+
+    async def _reset_other_models(self, model: str) -> None:
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                await AsyncEmbeddingRepository(session).reset_other_models(model)
+        else:
+            await run_in_threadpool(self._reset_other_models_sync, model)
+
+    async def search(
+        self,
+        ollama_service: OllamaService,
+        user_id: UUID,
+        query: str,
+        k: int,
+        chat_id: Optional[UUID] = None,
+        exclude: Iterable[UUID] = ()
+    ) -> list[tuple[UUID, float]]:
+        """(message_id, similarity) of the user's messages closest to `query`."""
+        embedder = get_embedder(ollama_service)
+        vector = (await embedder.embed([query]))[0]
+        index = await self._index_for(user_id, embedder.model, len(vector))
+        return await run_in_threadpool(index.search, vector, k, chat_id, exclude)
+
+    async def _index_for(self, user_id: UUID, model: str, dim: int) -> VectorIndex:
+        """The user's loaded index; concurrent misses share a single load."""
+        index = self._indexes.get(user_id)
+        if index is not None and index.dim == dim:
+            return index
+
+        loading = self._loading.get(user_id)
+        if loading is None:
+            loading = asyncio.create_task(self._load_index(user_id, model, dim))
+            self._loading[user_id] = loading
+            loading.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load_index(self, user_id: UUID, model: str, dim: int) -> VectorIndex:
+        if settings.ASYNC_DATABASE:
+            async with async_session_scope() as session:
+                rows = await AsyncEmbeddingRepository(session).get_user_embeddings(
+                    user_id, model)
+        else:
+            rows = await run_in_threadpool(self._get_user_embeddings, user_id, model)
+
+        index = await run_in_threadpool(self._build_index, rows, dim)
+        self._indexes.set(user_id, index)
+        return index
+
+    @staticmethod
+    def _build_index(rows: list[tuple[UUID, UUID, bytes]], dim: int) -> VectorIndex:
+        index = VectorIndex(
+            dim,
+            ann_threshold=settings.VECTOR_INDEX_ANN_THRESHOLD,
+            nprobe=settings.VECTOR_INDEX_NPROBE
+        )
+        # Vectors from before a change of embedding dimension are skipped
+        rows = [row for row in rows if len(row[2]) == dim * 4]
+        if rows:
+            index.add(
+                [message_id for message_id, _, _ in rows],
+                [chat_id for _, chat_id, _ in rows],
+                np.stack([from_bytes(vector) for _, _, vector in rows])
+            )
+        return index
+
+    def _add_to_loaded(self, pending: list[PendingMessage], vectors: "np.ndarray") -> None:
+        by_user: dict[UUID, list[int]] = defaultdict(list)
+        for i, (_, _, user_id, _) in enumerate(pending):
+            by_user[user_id].append(i)
+
+        for user_id, positions in by_user.items():
+            index = self._indexes.get(user_id)
+            if index is None or index.dim != vectors.shape[1]:
+                continue
+            index.add(
+                [pending[i][0] for i in positions],
+                [pending[i][1] for i in positions],
+                vectors[positions]
+            )
+
+    def _get_pending(self, limit: int, exclude: list[UUID]) -> list[PendingMessage]:
+        with session_scope() as session:
+            return EmbeddingRepository(session).get_pending(limit, exclude)
+
+    def _reset_other_models_sync(self, model: str) -> None:
+        with session_scope() as session:
+            EmbeddingRepository(session).reset_other_models(model)
+
+    def _get_user_embeddings(self, user_id: UUID, model: str) -> list[tuple[UUID, UUID, bytes]]:
+        with session_scope() as session:
+            return EmbeddingRepository(session).get_user_embeddings(user_id, model)
+
+    def _add_many(self, rows: list[dict]) -> list[UUID]:
+        with session_scope() as session:
+            return EmbeddingRepository(session).add_many(rows)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "embedded": self.embedded,
+            "failures": self.failures,
+            "skipped": len(self._skipped),
+            "last_error": self.last_error,
+            "indexes": self._indexes.stats(),
+        }
+
+
+semantic_search = SemanticSearch()
+register_metrics("semantic_search", semantic_search.stats)
+
+if settings.SEMANTIC_SEARCH_ENABLED and np is None:
+    logger.warning("SEMANTIC_SEARCH_ENABLED but numpy is not installed; semantic search is off")
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import session_scope, async_session_scope
+from app.models.message import Message
+from app.repositories.chat_repository import ChatRepository, AsyncChatRepository
+from app.repositories.message_repository import MessageRepository, AsyncMessageRepository
+from app.services.context_builder import MESSAGE_TOKEN_OVERHEAD, ContextBuilder
+from app.services.ollama_service import OllamaService
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a concise running summary of a conversation between a user "
+    "and an AI assistant. Keep facts, decisions, names, preferences and open "
+    "questions; drop pleasantries. Reply with the updated summary only."
+)
+
+# Background summaries in flight, one per chat
+_pending: dict[UUID, asyncio.Task] = {}
+
+
+@dataclass
+class _SummaryWork:
+    """Snapshot of what needs folding into a chat's summary."""
+    model: str
+    summary: Optional[str]
+    messages: list[Message]
+
+
+class SummaryService:
+    """
+    Maintains a rolling per-chat summary of older messages.
+    Summaries are only ever built in background tasks, never inline on a
+    user's request, and only once enough unsummarized tokens have piled up.
+    """
+
+    def __init__(self, ollama_service: OllamaService):
+        self.ollama_service = ollama_service
+        self.context_builder = ContextBuilder()
+
+    def schedule(self, chat_id: UUID) -> None:
+        """Start a background refresh for a chat unless one is already running."""
+        if not settings.SUMMARY_ENABLED or chat_id in _pending:
+            return
+
+        task = asyncio.create_task(self.refresh(chat_id))
+        _pending[chat_id] = task
+        task.add_done_callback(lambda _: _pending.pop(chat_id, None))
+
+    async def refresh(self, chat_id: UUID) -> bool:
+        """
+        Fold older messages into the chat's summary if the threshold is met.
+        Returns True when a new summary was stored.
+        """
+        try:
+            if settings.ASYNC_DATABASE:
+                work = await self._load_work_async(chat_id)
+            else:
+                work = await run_in_threadpool(self._load_work, chat_id)
+
+            if work is None:
+                return False
+
+            summary = await self.ollama_service.generate(
+                prompt=self._build_prompt(work),
+                model=settings.SUMMARY_MODEL or work.model,
+                system_prompt=SUMMARY_SYSTEM_PROMPT,
+                affinity_key=str(chat_id)
+            )
+            summary = summary.strip()
+            if not summary:
+                return False
+
+            # Keyset position, so messages sharing the last one's timestamp
+            # are neither skipped nor folded twice
+            last = work.messages[-1]
+            update = {
+                "summary": summary,
+                "summary_tokens": self.context_builder.count_tokens(summary),
+                "summarized_until": last.created_at,
+                "summarized_until_id": last.id,
+            }
+            if settings.ASYNC_DATABASE:
+                await self._store_async(chat_id, update)
+            else:
+                await run_in_threadpool(self._store, chat_id, update)
+            return True
+
+        except Exception:
+            logger.exception("Failed to refresh summary for chat %s", chat_id)
+            return False
+
+    def _select_work(
+        self,
+        model: str,
+        summary: Optional[str],
+        messages: list[Message]
+    ) -> Optional[_SummaryWork]:
+        """
+        Keep the newest messages verbatim; fold the rest if they are big
+        enough. The summary prompt gets the same budget as a chat turn, so
+        only the oldest messages that fit are folded now; the others are
+        still unsummarized and go into a later refresh.
+        """
+        keep = settings.SUMMARY_KEEP_MESSAGES
+        foldable = messages[:-keep] if keep else messages
+        if sum(msg.tokens for msg in foldable) < settings.SUMMARY_TRIGGER_TOKENS:
+            return None
+
+        budget = self.context_builder.budget_for(settings.SUMMARY_MODEL or model)
+        used = (
+            self.context_builder.count_tokens(SUMMARY_SYSTEM_PROMPT)
+            + self.context_builder.count_tokens(self._build_prompt(
+                _SummaryWork(model=model, summary=summary, messages=[])))
+            + 2 * MESSAGE_TOKEN_OVERHEAD
+        )
+        folded = 0
+        for msg in foldable:
+            used += msg.tokens + MESSAGE_TOKEN_OVERHEAD
+            # Always fold at least one message, or the chat would never move on
+            if used > budget and folded:
+                break
+            folded += 1
+        return _SummaryWork(model=model, summary=summary, messages=foldable[:folded])
+
+    def _load_work(self, chat_id: UUID) -> Optional[_SummaryWork]:
+        with session_scope() as session:
+            chat = ChatRepository(session).get_by_id(chat_id)
+            if not chat:
+                return None
+
+            message_repo = MessageRepository(session)
+            after = chat.summarized_key
+            if message_repo.sum_tokens_after(chat_id, after) < settings.SUMMARY_TRIGGER_TOKENS:
+                return None
+
+            messages = message_repo.get_messages_after(
+                chat_id, after, limit=settings.CONTEXT_MAX_MESSAGES)
+            return self._select_work(chat.model, chat.summary, messages)
+
+    async def _load_work_async(self, chat_id: UUID) -> Optional[_SummaryWork]:
+        async with async_session_scope() as session:
+            chat = await AsyncChatRepository(session).get_by_id(chat_id)
+            if not chat:
+                return None
+
+            message_repo = AsyncMessageRepository(session)
+            after = chat.summarized_key
+            if await message_repo.sum_tokens_after(chat_id, after) < settings.SUMMARY_TRIGGER_TOKENS:
+                return None
+
+            messages = await message_repo.get_messages_after(
+                chat_id, after, limit=settings.CONTEXT_MAX_MESSAGES)
+            return self._select_work(chat.model, chat.summary, messages)
+
+    def _store(self, chat_id: UUID, update: dict) -> None:
+        with session_scope() as session:
+            ChatRepository(session).update(chat_id, update)
+
+    async def _store_async(self, chat_id: UUID, update: dict) -> None:
+        async with async_session_scope() as session:
+            await AsyncChatRepository(session).update(chat_id, update)
+
+    @staticmethod
+    def _build_prompt(work: _SummaryWork) -> str:
+        transcript = "\n".join(
+            f"{msg.role.value}: {msg.content}" for msg in work.messages
+        )
+        return (
+            f"Current summary:\n{work.summary or '(none yet)'}\n\n"
+            f"New messages:\n{transcript}\n\n"
+            "Write the updated summary."
+        )
+
+
+async def cancel_pending_summaries() -> None:
+    """Cancel in-flight summary tasks (called on shutdown)."""
+    tasks = list(_pending.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
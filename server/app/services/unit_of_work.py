@@ -0,0 +1,33 @@
+from typing import Optional
+from uuid import UUID
+
+from app.models.chat import Chat
+
+
+class UnitOfWork:
+    """
+    Request-scoped identity map shared by the services of one request.
+
+    Chats are remembered once loaded for their owner, so ownership is
+    verified with a single SELECT per request however many services ask
+    for the chat. A streamed response spans several short sessions; the
+    cached chats are plain snapshots that stay readable after the session
+    that loaded them has closed. Writes made through ChatService keep the
+    entries current; anything else that changes a chat should forget it.
+    """
+
+    def __init__(self):
+        self._chats: dict[tuple[UUID, UUID], Chat] = {}
+
+    def get_chat(self, chat_id: UUID, user_id: UUID) -> Optional[Chat]:
+        """The chat if it was already loaded for `user_id` in this request."""
+        return self._chats.get((chat_id, user_id))
+
+    def add_chat(self, chat: Chat) -> Chat:
+        """Remember a chat, verified to belong to its user_id."""
+        self._chats[(chat.id, chat.user_id)] = chat
+        return chat
+
+    def forget_chat(self, chat_id: UUID) -> None:
+        for key in [key for key in self._chats if key[0] == chat_id]:
+            del self._chats[key]
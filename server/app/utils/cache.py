@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Small thread-safe LRU cache whose entries expire after `ttl` seconds.
+    A `ttl` of 0 disables the cache entirely.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Return a live entry, or `default` on a miss."""
+        if not self.enabled:
+            return default
+
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= time.monotonic():
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """Drop a single entry."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[K, V], bool]) -> None:
+        """Drop every entry for which `predicate(key, value)` is true."""
+        with self._lock:
+            stale = [
+                key for key, (_, value) in self._data.items()
+                if predicate(key, value)
+            ]
+            for key in stale:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+        }
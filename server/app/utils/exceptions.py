@@ -50,3 +50,25 @@ class ForbiddenException(HTTPException):
             status_code=status.HTTP_403_FORBIDDEN,
             detail=detail,
         )
+
+
+class ServiceUnavailableException(HTTPException):
+    """Exception for temporary overload; tells clients when to retry."""
+
+    def __init__(self, detail: str = "Service temporarily unavailable", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class TooManyRequestsException(HTTPException):
+    """Exception for requests shed under load; tells clients when to retry."""
+
+    def __init__(self, detail: str = "Too many requests", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -0,0 +1,58 @@
+import json
+import logging
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# orjson's decode error subclasses this, so one except clause fits both
+JSONDecodeError = json.JSONDecodeError
+
+
+def _select_backend() -> str:
+    wanted = settings.JSON_BACKEND
+    if wanted == "stdlib":
+        return "stdlib"
+    if orjson is None:
+        if wanted == "orjson":
+            logger.warning("JSON_BACKEND=orjson but orjson is not installed; using stdlib json")
+        return "stdlib"
+    return "orjson"
+
+
+backend = _select_backend()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON from str or bytes with the configured backend."""
+    if backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, matching Starlette's JSONResponse output."""
+    if backend == "orjson":
+        return orjson.dumps(obj)
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast backend when it is available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence, TypeVar
+from uuid import UUID
+
+from app.utils.exceptions import BadRequestException
+
+T = TypeVar("T")
+
+KeysetKey = tuple[datetime, UUID]
+
+# (relevance, id) position in ranked search results
+RankKey = tuple[float, UUID]
+
+
+def encode_cursor(key: KeysetKey) -> str:
+    """Encode a (timestamp, id) keyset position as an opaque cursor."""
+    timestamp, id = key
+    raw = json.dumps([timestamp.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> KeysetKey:
+    """Decode a cursor produced by `encode_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), UUID(id)
+    except (ValueError, TypeError):
+        raise BadRequestException("Invalid cursor")
+
+
+def encode_rank_cursor(key: RankKey) -> str:
+    """Encode a (rank, id) search position as an opaque cursor."""
+    rank, id = key
+    raw = json.dumps([rank, str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> RankKey:
+    """Decode a cursor produced by `encode_rank_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(rank), UUID(id)
+    except (ValueError, TypeError):
+        raise BadRequestException("Invalid cursor")
+
+
+def split_page(
+    rows: Sequence[T],
+    page_size: int,
+    key: Callable[[T], Any],
+    encode: Callable[[Any], str] = encode_cursor
+) -> tuple[list[T], Optional[str]]:
+    """
+    Trim a `page_size + 1` fetch down to one page.
+    Returns the page and the cursor for the next one, if there is more.
+    """
+    page = list(rows[:page_size])
+    if len(rows) <= page_size or not page:
+        return page, None
+    return page, encode(key(page[-1]))
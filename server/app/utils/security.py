@@ -1,11 +1,39 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from uuid import UUID
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Callable, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import register_metrics
+from app.utils.cache import TTLCache
+from app.utils.exceptions import ServiceUnavailableException
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
+
+# bcrypt is deliberately slow; keep it off the shared request threadpool
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_password_capacity = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+_password_inflight = 0
+_password_lock = Lock()
+
+# Verified token payloads keyed by token hash
+token_cache: TTLCache[str, dict] = TTLCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+)
+register_metrics("token_cache", token_cache.stats)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,6 +46,60 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_task(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run password work on the dedicated executor.
+    Rejects with 503 + Retry-After once running and queued work hits capacity.
+    """
+    global _password_inflight
+
+    with _password_lock:
+        if _password_inflight >= _password_capacity:
+            raise ServiceUnavailableException(
+                "Too many authentication requests, please retry shortly",
+                retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS
+            )
+        _password_inflight += 1
+
+    def release(_=None) -> None:
+        global _password_inflight
+        with _password_lock:
+            _password_inflight -= 1
+
+    try:
+        future = _password_executor.submit(func, *args)
+    except RuntimeError:
+        release()
+        raise
+    # Tied to the executor's own future, not the awaiting task: a cancelled
+    # request stops waiting at once, but the slot is only freed when the
+    # hash finishes (or is dropped from the queue before starting)
+    future.add_done_callback(release)
+    return await asyncio.wrap_future(future)
+
+
+async def verify_password_async(
+    plain_password: str,
+    hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """
+    Verify a password on the password executor.
+    Returns (valid, new_hash); new_hash is set when the stored hash uses
+    an outdated cost factor and should be replaced.
+    """
+    return await _run_password_task(
+        pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password executor."""
+    return await _run_password_task(pwd_context.hash, password)
+
+
+def shutdown_password_executor() -> None:
+    _password_executor.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)) -> str:
     """Create JWT access token with 1 hour as expiry."""
     to_encode = data.copy()
@@ -51,3 +133,22 @@ def decode_token(token: str) -> dict:
         return payload
     except JWTError:
         return None
+
+
+def decode_token_cached(token: str) -> Optional[dict]:
+    """Decode a JWT, reusing the verified payload until the token expires."""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    payload = token_cache.get(key)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+
+    payload = decode_token(token)
+    if payload:
+        token_cache.set(key, payload)
+    return payload
+
+
+def forget_user_tokens(user_id: UUID) -> None:
+    """Drop cached token payloads belonging to a user."""
+    sub = str(user_id)
+    token_cache.invalidate_where(lambda _, payload: payload.get("sub") == sub)
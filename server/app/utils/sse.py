@@ -0,0 +1,116 @@
+import asyncio
+import re
+from typing import Any, AsyncGenerator, Callable, Optional
+
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# SSE accepts all three line endings
+_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+
+def encode_event(data: str, event: Optional[str] = None) -> str:
+    """
+    Encode one SSE frame. Every line of `data` gets its own `data:`
+    field, so clients reassemble embedded newlines exactly.
+    """
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in _LINE_BREAK.split(data))
+    return "\n".join(lines) + "\n\n"
+
+
+async def coalesce(
+    source: AsyncGenerator[str, None],
+    max_latency: float,
+    max_size: int
+) -> AsyncGenerator[str, None]:
+    """
+    Merge small chunks from `source` into larger ones.
+
+    A merged chunk is emitted once `max_latency` seconds have passed
+    since its first piece arrived, once it reaches `max_size`
+    characters, or when `source` ends, whichever comes first. With
+    `max_latency` <= 0 chunks pass through unchanged.
+    """
+    if max_latency <= 0:
+        async for chunk in source:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    buffer: list[str] = []
+    size = 0
+    deadline = 0.0
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(source))
+
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Latency budget spent; keep waiting on the same read
+                yield "".join(buffer)
+                buffer, size = [], 0
+                continue
+
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if not buffer:
+                deadline = loop.time() + max_latency
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= max_size:
+                yield "".join(buffer)
+                buffer, size = [], 0
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None and not pending.done():
+            # The read task unwinds `source` itself; wait for it so the
+            # upstream is closed before this generator finishes closing
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        else:
+            await source.aclose()
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    StreamingResponse for Server-Sent Events.
+
+    Closes the body iterator as soon as the response ends, including when
+    the client disconnects, so generators upstream release their
+    resources right away instead of whenever they are garbage collected.
+    `on_close` runs last, even if the body was never started.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        content: Any,
+        on_close: Optional[Callable[[], None]] = None,
+        **kwargs: Any
+    ):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                aclose = getattr(self.body_iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            finally:
+                if self.on_close is not None:
+                    self.on_close()
@@ -0,0 +1,53 @@
+import math
+from typing import Callable, Optional, Protocol
+
+from app.core.config import settings
+
+
+class TokenEstimator(Protocol):
+    """Anything that can count the tokens in a piece of text."""
+
+    def count(self, text: str) -> int: ...
+
+
+class HeuristicTokenEstimator:
+    """
+    Model-agnostic estimate: len(text) / 4, i.e. roughly four characters
+    per token for English prose, but never fewer tokens than
+    whitespace-separated words. This is not a tokenizer: code, non-Latin
+    scripts and unusual vocabularies can take noticeably more tokens than
+    estimated, so keep context budgets below the model's real window or
+    register a tokenizer-backed estimator (`register_token_estimator`).
+    """
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return max(math.ceil(len(text) / 4), len(text.split()))
+
+
+class WhitespaceTokenEstimator:
+    """Counts whitespace-separated words (the original rough estimate)."""
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+_estimators: dict[str, Callable[[], TokenEstimator]] = {
+    "heuristic": HeuristicTokenEstimator,
+    "whitespace": WhitespaceTokenEstimator,
+}
+
+
+def register_token_estimator(name: str, factory: Callable[[], TokenEstimator]) -> None:
+    """Register an estimator (e.g. a real tokenizer) selectable via TOKEN_ESTIMATOR."""
+    _estimators[name] = factory
+
+
+def get_token_estimator(name: Optional[str] = None) -> TokenEstimator:
+    """Build the configured token estimator."""
+    name = name or settings.TOKEN_ESTIMATOR
+    try:
+        return _estimators[name]()
+    except KeyError:
+        raise ValueError(f"Unknown token estimator: {name}")
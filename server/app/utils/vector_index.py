@@ -0,0 +1,191 @@
+import math
+from threading import Lock
+from typing import Iterable, Optional
+from uuid import UUID
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install numpy
+    np = None
+
+# Rows scored per matrix product while assigning vectors to clusters
+_CHUNK_ROWS = 8192
+_KMEANS_ITERATIONS = 10
+# k-means is trained on at most this many sampled vectors per cluster
+_TRAIN_PER_CLUSTER = 64
+
+
+def _normalize(vectors: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorIndex:
+    """
+    In-memory cosine-similarity index over float32 vectors keyed by id.
+
+    Small indexes are searched exactly with one matrix-vector product.
+    Once `ann_threshold` vectors are stored (0 disables this) an IVF
+    index is built: vectors are clustered with k-means and a query only
+    scores the `nprobe` clusters nearest to it, plus anything added
+    since the last build. The clustering is rebuilt each time the index
+    doubles in size. Thread-safe, so searches can run off the event loop.
+    """
+
+    def __init__(self, dim: int, ann_threshold: int = 0, nprobe: int = 8):
+        self.dim = dim
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.ids: list[UUID] = []
+        self._rows: dict[UUID, int] = {}
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._groups = np.empty(0, dtype=np.int32)
+        self._group_codes: dict[UUID, int] = {}
+        # IVF state: rows [0, _clustered) are assigned to clusters;
+        # cluster i holds _order[_offsets[i]:_offsets[i + 1]]
+        self._centroids: Optional["np.ndarray"] = None
+        self._order = np.empty(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._clustered = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def approximate(self) -> bool:
+        return self._centroids is not None
+
+    def add(
+        self,
+        ids: list[UUID],
+        groups: list[UUID],
+        vectors: "np.ndarray"
+    ) -> None:
+        """
+        Add vectors, each tagged with a group (its chat) for filtering.
+        Ids already present are skipped.
+        """
+        with self._lock:
+            new = [i for i, id in enumerate(ids) if id not in self._rows]
+            if not new:
+                return
+
+            vectors = _normalize(np.asarray(vectors, dtype=np.float32)[new])
+            size = len(self.ids)
+            self._reserve(size + len(new))
+            self._vectors[size:size + len(new)] = vectors
+
+            for offset, i in enumerate(new):
+                self._rows[ids[i]] = size + offset
+                self.ids.append(ids[i])
+                self._groups[size + offset] = self._group_codes.setdefault(
+                    groups[i], len(self._group_codes))
+
+            size = len(self.ids)
+            if (
+                self.ann_threshold > 0
+                and size >= self.ann_threshold
+                and size >= 2 * self._clustered
+            ):
+                self._build_clusters()
+
+    def search(
+        self,
+        query: "np.ndarray",
+        k: int,
+        group: Optional[UUID] = None,
+        exclude: Iterable[UUID] = ()
+    ) -> list[tuple[UUID, float]]:
+        """Up to `k` (id, cosine similarity) pairs, most similar first."""
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            size = len(self.ids)
+            if size == 0 or k <= 0:
+                return []
+
+            rows = self._candidates(query, size)
+            vectors = self._vectors[:size] if rows is None else self._vectors[rows]
+            scores = vectors @ query
+            if rows is None:
+                rows = np.arange(size)
+
+            if group is not None:
+                code = self._group_codes.get(group)
+                if code is None:
+                    return []
+                scores[self._groups[rows] != code] = -np.inf
+
+            excluded = [self._rows[id] for id in exclude if id in self._rows]
+            if excluded:
+                scores[np.isin(rows, excluded)] = -np.inf
+
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                (self.ids[rows[i]], float(scores[i]))
+                for i in top if scores[i] != -np.inf
+            ]
+
+    def _reserve(self, size: int) -> None:
+        """Grow the backing arrays geometrically so appends stay amortized O(1)."""
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 64)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:len(self.ids)] = self._vectors[:len(self.ids)]
+        groups = np.empty(capacity, dtype=np.int32)
+        groups[:len(self.ids)] = self._groups[:len(self.ids)]
+        self._vectors, self._groups = vectors, groups
+
+    def _candidates(self, query: "np.ndarray", size: int) -> Optional["np.ndarray"]:
+        """Rows to score for `query`; None means all of them (exact search)."""
+        if self._centroids is None:
+            return None
+
+        nlist = len(self._centroids)
+        nprobe = min(self.nprobe, nlist)
+        nearest = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        parts = [
+            self._order[self._offsets[i]:self._offsets[i + 1]] for i in nearest
+        ]
+        # Vectors added since the last build are not clustered yet
+        parts.append(np.arange(self._clustered, size))
+        return np.concatenate(parts)
+
+    def _build_clusters(self) -> None:
+        """Spherical k-means over a sample, then assign every vector."""
+        size = len(self.ids)
+        vectors = self._vectors[:size]
+        nlist = max(1, int(math.sqrt(size)))
+        rng = np.random.default_rng(0)
+
+        sample = vectors[rng.choice(
+            size, min(size, nlist * _TRAIN_PER_CLUSTER), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            filled = np.bincount(assign, minlength=nlist) > 0
+            # Empty clusters keep their previous centroid
+            centroids[filled] = _normalize(sums[filled])
+
+        assign = np.concatenate([
+            np.argmax(vectors[start:start + _CHUNK_ROWS] @ centroids.T, axis=1)
+            for start in range(0, size, _CHUNK_ROWS)
+        ])
+        self._order = np.argsort(assign, kind="stable")
+        self._offsets = np.searchsorted(
+            assign[self._order], np.arange(nlist + 1), side="left")
+        self._centroids = centroids
+        self._clustered = size
+
+    def stats(self) -> dict:
+        return {
+            "vectors": len(self.ids),
+            "approximate": self.approximate,
+            "clusters": 0 if self._centroids is None else len(self._centroids),
+        }
@@ -0,0 +1,81 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run benchmarks from the server directory, e.g.
+`python -m benchmarks.json_backends`. Each one points the app at a
+throwaway SQLite database unless DATABASE_URL is already set, so import
+this module before anything from `app`.
+"""
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from tests.support import OllamaStub, ServerThread, migrate_database
+
+_workdir = tempfile.mkdtemp(prefix="chatseek-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_workdir}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (0 < pct <= 100)."""
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: list[float]) -> str:
+    """p50/p99/max of latencies in seconds, formatted in milliseconds."""
+    return (
+        f"p50 {statistics.median(values) * 1000:7.2f} ms  "
+        f"p99 {percentile(values, 99) * 1000:7.2f} ms  "
+        f"max {max(values) * 1000:7.2f} ms  (n={len(values)})"
+    )
+
+
+def best_of(repeat: int, func, *args) -> float:
+    """Fastest of `repeat` timed calls, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def start_app(wrap=None, **env: str) -> tuple[ServerThread, OllamaStub]:
+    """
+    Serve the app on a real socket against a stub Ollama. `env` overrides
+    settings; call before anything imports `app`. `wrap` can put ASGI
+    middleware around the app.
+    """
+    stub = OllamaStub().start()
+    os.environ.update({
+        "OLLAMA_BASE_URL": stub.url,
+        "OLLAMA_BASE_URLS": "[]",
+        "PRELOAD_MODELS": "[]",
+        "DEFAULT_MODEL": "llama2",
+        "SUMMARY_ENABLED": "false",
+        "SEMANTIC_SEARCH_ENABLED": "false",
+        "GENERATION_CACHE_ENABLED": "false",
+        **env,
+    })
+    migrate_database()
+    from app.main import app
+
+    return ServerThread(wrap(app) if wrap else app, lifespan="on").start(), stub
+
+
+def register(api: httpx.Client, password: str = "password123") -> tuple[str, dict[str, str]]:
+    """Register and log in a fresh user; returns its username and auth headers."""
+    name = f"bench{uuid.uuid4().hex[:12]}"
+    response = api.post("/auth/register", json={
+        "email": f"{name}@example.com", "username": name, "password": password})
+    response.raise_for_status()
+    response = api.post("/auth/login", json={"username": name, "password": password})
+    response.raise_for_status()
+    return name, {"Authorization": f"Bearer {response.json()['access_token']}"}
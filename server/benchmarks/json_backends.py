@@ -0,0 +1,128 @@
+"""
+stdlib json vs orjson on the two hot JSON paths (JSON_BACKEND):
+
+- rendering a 100-item ChatListResponse the way FastAPI does (pydantic
+  validation and JSON-mode dump, then the response class's render);
+- parsing a 10k-line Ollama NDJSON stream through
+  OllamaService._iter_json_lines, fed in 4 KiB network-sized chunks.
+
+    python -m benchmarks.json_backends [--repeat N]
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from benchmarks import _support
+
+from fastapi.responses import JSONResponse
+
+from app.schemas.chat import ChatListResponse
+from app.services.ollama_service import OllamaService
+from app.utils import fast_json
+from app.utils.fast_json import FastJSONResponse
+
+CHUNK_BYTES = 4096
+
+
+def chat_page(items: int) -> dict:
+    now = datetime.now(timezone.utc)
+    user_id = uuid4()
+    return {
+        "items": [
+            {
+                "id": uuid4(),
+                "user_id": user_id,
+                "title": f"Conversation {i} about something",
+                "model": "llama3",
+                "system_prompt": "You are a helpful assistant." if i % 3 == 0 else None,
+                "created_at": now,
+                "updated_at": now,
+                "message_count": i * 7,
+                "last_message_at": now,
+            }
+            for i in range(items)
+        ],
+        "total": 1234,
+        "page": 1,
+        "page_size": items,
+        "total_pages": 13,
+        "next_cursor": "eyJrIjogWyIyMDI2LTEwLTE4In19",
+    }
+
+
+def ndjson_stream(lines: int) -> list[bytes]:
+    body = b"".join(
+        json.dumps({
+            "model": "llama3",
+            "created_at": "2026-10-18T12:00:00.000000Z",
+            "message": {"role": "assistant", "content": f" token{i}"},
+            "done": False,
+        }).encode() + b"\n"
+        for i in range(lines)
+    )
+    return [body[i:i + CHUNK_BYTES] for i in range(0, len(body), CHUNK_BYTES)]
+
+
+class _Body:
+    """Just enough of httpx.Response for _iter_json_lines."""
+
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    async def aiter_bytes(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def build_content(page: dict) -> dict:
+    return ChatListResponse.model_validate(page).model_dump(mode="json")
+
+
+def render(content: dict, response_class) -> bytes:
+    return response_class(content).body
+
+
+def render_page(page: dict, response_class) -> bytes:
+    return render(build_content(page), response_class)
+
+
+def parse_stream(chunks: list[bytes]) -> int:
+    async def consume() -> int:
+        count = 0
+        async for _ in OllamaService._iter_json_lines(_Body(chunks)):
+            count += 1
+        return count
+    return asyncio.run(consume())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    page = chat_page(100)
+    content = build_content(page)
+    chunks = ndjson_stream(10_000)
+    assert parse_stream(chunks) == 10_000
+
+    backends = ["stdlib"] + (["orjson"] if fast_json.orjson is not None else [])
+    if len(backends) == 1:
+        print("orjson is not installed (pip install .[fast]); stdlib only")
+
+    for backend in backends:
+        fast_json.backend = backend
+        response_class = JSONResponse if backend == "stdlib" else FastJSONResponse
+        serialize = _support.best_of(args.repeat, render, content, response_class)
+        end_to_end = _support.best_of(args.repeat, render_page, page, response_class)
+        parse = _support.best_of(args.repeat, parse_stream, chunks)
+        print(
+            f"{backend:7}  100-chat list: render {serialize * 1e6:6.0f} us,"
+            f" with validation {end_to_end * 1e6:6.0f} us"
+            f"   10k-line stream: {parse * 1e3:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+CRUD latency while a login storm runs (PASSWORD_HASH_WORKERS).
+
+A few clients list chats back to back while many more log in as fast
+as they can. Password hashing either runs on its dedicated bounded
+executor (the default) or, with `--shared`, on the same threadpool as
+the sync CRUD routes, as it did before the executor existed. Reports
+CRUD p50/p99 with and without the storm, and how logins fared.
+
+    python -m benchmarks.login_storm [--seconds S] [--logins N] [--rounds R] [--shared]
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+from benchmarks import _support
+
+import httpx
+
+
+async def crud_client(client: httpx.AsyncClient, headers: dict, until: float, latencies: list) -> None:
+    while time.monotonic() < until:
+        started = time.perf_counter()
+        response = await client.get("/chats", headers=headers)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+
+
+async def login_client(client: httpx.AsyncClient, username: str, until: float, outcomes: Counter) -> None:
+    while time.monotonic() < until:
+        response = await client.post(
+            "/auth/login", json={"username": username, "password": "password123"})
+        outcomes[response.status_code] += 1
+        if response.status_code == 503:
+            await asyncio.sleep(0.05)
+
+
+async def measure(base_url: str, headers: dict, username: str, args, logins: int) -> tuple[list, Counter]:
+    latencies: list[float] = []
+    outcomes: Counter = Counter()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        until = time.monotonic() + args.seconds
+        await asyncio.gather(
+            *(crud_client(client, headers, until, latencies) for _ in range(args.crud)),
+            *(login_client(client, username, until, outcomes) for _ in range(logins)),
+        )
+    return latencies, outcomes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--crud", type=int, default=4, help="concurrent CRUD clients")
+    parser.add_argument("--logins", type=int, default=64, help="concurrent login clients")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt rounds")
+    parser.add_argument("--shared", action="store_true",
+                        help="hash on the shared threadpool instead of the password executor")
+    args = parser.parse_args()
+
+    server, stub = _support.start_app(PASSWORD_BCRYPT_ROUNDS=str(args.rounds))
+    if args.shared:
+        from fastapi.concurrency import run_in_threadpool
+
+        from app.utils import security
+
+        security._run_password_task = run_in_threadpool
+
+    base_url = f"{server.url}/api/v1"
+    with httpx.Client(base_url=base_url, timeout=60) as api:
+        username, headers = _support.register(api)
+        for i in range(20):
+            api.post("/chats", json={"title": f"Chat {i}", "model": "llama2"},
+                     headers=headers).raise_for_status()
+
+    mode = "shared threadpool" if args.shared else "password executor"
+    print(f"bcrypt rounds {args.rounds}, {mode}, {args.crud} CRUD clients,"
+          f" {os.cpu_count()} CPUs")
+    for label, logins in (("idle", 0), (f"{args.logins} logins", args.logins)):
+        latencies, outcomes = asyncio.run(measure(base_url, headers, username, args, logins))
+        logged_in = outcomes[200] / args.seconds
+        print(f"{label:>12}  GET /chats {_support.summarize(latencies)}"
+              + (f"  logins {logged_in:.1f}/s, {outcomes[503]} shed" if logins else ""))
+
+    server.stop()
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
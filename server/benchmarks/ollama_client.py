@@ -0,0 +1,85 @@
+"""
+Per-turn latency with the shared Ollama client vs a client per turn.
+
+Runs `--turns` chat turns of `--tokens` tokens through
+OllamaService.generate_stream against a local stub Ollama, either
+reusing the app-wide pooled client (create_http_client, as the lifespan
+does) or opening and closing a fresh client each turn, as OllamaService
+did before the shared client. Reports time to first token and to the
+end of the turn. On loopback this is mostly the TCP handshake and
+client setup; a remote Ollama adds a round trip per saved connect.
+
+    python -m benchmarks.ollama_client [--turns N] [--tokens T]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks import _support
+
+from tests.support import OllamaStub
+
+stub = OllamaStub().start()
+os.environ.update({
+    "OLLAMA_BASE_URL": stub.url,
+    "OLLAMA_BASE_URLS": "[]",
+    "GENERATION_CACHE_ENABLED": "false",
+})
+
+from app.core.http_client import create_http_client  # noqa: E402
+from app.services.ollama_service import OllamaService  # noqa: E402
+
+
+async def turn(service: OllamaService, started: float) -> tuple[float, float]:
+    first_token = None
+    async for _ in service.generate_stream("hi", model="llama2"):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+    return first_token, time.perf_counter() - started
+
+
+async def shared(turns: int) -> tuple[list, list]:
+    ttft, total = [], []
+    async with create_http_client() as client:
+        service = OllamaService(client)
+        for _ in range(turns):
+            first, whole = await turn(service, time.perf_counter())
+            ttft.append(first)
+            total.append(whole)
+    return ttft, total
+
+
+async def per_turn(turns: int) -> tuple[list, list]:
+    ttft, total = [], []
+    for _ in range(turns):
+        # Client setup and teardown count: they were part of every turn
+        started = time.perf_counter()
+        async with create_http_client() as client:
+            first, _ = await turn(OllamaService(client), started)
+        ttft.append(first)
+        total.append(time.perf_counter() - started)
+    return ttft, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--tokens", type=int, default=20)
+    args = parser.parse_args()
+
+    stub.reset(reply_tokens=args.tokens)
+    # Warm up imports, the stub and the backend pool
+    asyncio.run(shared(20))
+
+    print(f"{args.turns} turns of {args.tokens} tokens against {stub.url}")
+    for label, run in (("shared client", shared), ("client per turn", per_turn)):
+        ttft, total = asyncio.run(run(args.turns))
+        print(f"{label:>16}  first token {_support.summarize(ttft)}")
+        print(f"{'':>16}  whole turn  {_support.summarize(total)}")
+
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+SSE frames and socket writes per streamed response (SSE_COALESCE_MS).
+
+Streams one reply of `--tokens` tokens arriving `--token-ms` apart from
+a stub Ollama, once per coalescing window, and counts what reaches the
+wire: SSE frames, ASGI body messages (each one a transport write, i.e.
+one send() syscall) and bytes, plus the slowest gap between frames as
+the latency the window adds.
+
+    python -m benchmarks.sse_frames [--tokens N] [--token-ms MS] [--windows 0,10,30,60]
+"""
+import argparse
+import time
+
+from benchmarks import _support
+
+import httpx
+
+
+class WriteCounter:
+    """ASGI middleware counting response body writes on /messages/stream."""
+
+    def __init__(self, app):
+        self.app = app
+        self.writes = 0
+        self.bytes = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].endswith("/messages/stream"):
+            return await self.app(scope, receive, send)
+
+        async def counting_send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                self.writes += 1
+                self.bytes += len(message["body"])
+            await send(message)
+
+        await self.app(scope, receive, counting_send)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    parser.add_argument("--windows", default="0,10,30,60", help="SSE_COALESCE_MS values")
+    args = parser.parse_args()
+
+    counters = []
+
+    def wrap(app):
+        counters.append(WriteCounter(app))
+        return counters[0]
+
+    server, stub = _support.start_app(wrap=wrap)
+    from app.core.config import settings
+
+    counter = counters[0]
+    print(f"{args.tokens} tokens, {args.token_ms:g} ms apart")
+    with httpx.Client(base_url=f"{server.url}/api/v1", timeout=120) as api:
+        _, headers = _support.register(api)
+        chat_id = api.post("/chats", json={"title": "Frames", "model": "llama2"},
+                           headers=headers).json()["id"]
+
+        for window in (float(ms) for ms in args.windows.split(",")):
+            settings.SSE_COALESCE_MS = window
+            stub.reset(reply_tokens=args.tokens, token_delay=args.token_ms / 1000)
+            counter.writes = counter.bytes = 0
+            frames, gaps = 0, []
+            started = last = time.perf_counter()
+            with api.stream("POST", "/messages/stream", json={"chat_id": chat_id, "message": "hi"},
+                            headers=headers) as response:
+                for line in response.iter_lines():
+                    if line.startswith("data: "):
+                        now = time.perf_counter()
+                        frames += 1
+                        gaps.append(now - last)
+                        last = now
+            elapsed = time.perf_counter() - started
+            print(
+                f"window {window:4g} ms  frames {frames:4d}  writes {counter.writes:4d}"
+                f"  ({counter.writes / args.tokens:.2f}/token)  bytes {counter.bytes:6d}"
+                f"  max gap {max(gaps) * 1000:6.1f} ms  wall {elapsed:5.2f} s"
+            )
+
+    server.stop()
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Chat import/export throughput and memory (TRANSFER_BATCH_SIZE).
+
+Uploads a generated NDJSON export of `--chats` chats with `--messages`
+messages each to POST /chats/import, streamed so the upload is never
+in memory in one piece, then downloads it again from GET /chats/export.
+Reports rows/s for each direction and the process's peak RSS after
+each, which should stay flat as `--chats` grows.
+
+    python -m benchmarks.transfer [--chats N] [--messages M] [--batch-size B] [--async-db]
+"""
+import argparse
+import json
+import resource
+import time
+import uuid
+from typing import Iterator
+
+from benchmarks import _support
+
+import httpx
+
+CONTENT = "lorem ipsum dolor sit amet " * 8
+
+
+def export_lines(chats: int, messages: int) -> Iterator[bytes]:
+    for c in range(chats):
+        chat_id = str(uuid.uuid4())
+        lines = [json.dumps({"type": "chat", "id": chat_id, "title": f"Chat {c}", "model": "llama2"})]
+        for m in range(messages):
+            lines.append(json.dumps({
+                "type": "message",
+                "chat_id": chat_id,
+                "role": "user" if m % 2 == 0 else "assistant",
+                "content": CONTENT,
+                "created_at": f"2025-01-01T{m // 3600 % 24:02d}:{m // 60 % 60:02d}:{m % 60:02d}Z",
+            }))
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=250, help="messages per chat")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--async-db", action="store_true", help="run with ASYNC_DATABASE on")
+    args = parser.parse_args()
+
+    server, stub = _support.start_app(
+        TRANSFER_BATCH_SIZE=str(args.batch_size),
+        ASYNC_DATABASE="true" if args.async_db else "false",
+    )
+    rows = args.chats * (args.messages + 1)
+    print(f"{args.chats} chats x {args.messages} messages, batch size {args.batch_size},"
+          f" {'async' if args.async_db else 'sync'} database,"
+          f" peak RSS at start {peak_rss_mib():.0f} MiB")
+
+    with httpx.Client(base_url=f"{server.url}/api/v1", timeout=None) as api:
+        _, headers = _support.register(api)
+
+        started = time.perf_counter()
+        response = api.post("/chats/import", content=export_lines(args.chats, args.messages),
+                            headers={**headers, "Content-Type": "application/x-ndjson"})
+        response.raise_for_status()
+        elapsed = time.perf_counter() - started
+        print(f"  import  {rows / elapsed:9,.0f} rows/s  ({elapsed:.2f} s)"
+              f"  peak RSS {peak_rss_mib():.0f} MiB")
+
+        started = time.perf_counter()
+        exported = 0
+        with api.stream("GET", "/chats/export", headers=headers) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                exported += chunk.count(b"\n")
+        elapsed = time.perf_counter() - started
+        print(f"  export  {exported / elapsed:9,.0f} rows/s  ({elapsed:.2f} s)"
+              f"  peak RSS {peak_rss_mib():.0f} MiB")
+
+    server.stop()
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Tests run the real app on a real socket against a migrated SQLite
+database and a stub Ollama (tests/support.py). Settings are read at
+import time, so the environment is set up before anything from `app`.
+"""
+import asyncio
+import os
+import tempfile
+import uuid
+
+import httpx
+import pytest
+
+from tests.support import OllamaStub, ServerThread, migrate_database
+
+# "tinyllama" is the model of the concurrency tests: no per-model limit to speak of
+ollama_stub = OllamaStub(models=("llama2", "tinyllama")).start()
+_workdir = tempfile.mkdtemp(prefix="chatseek-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_workdir}/test.db",
+    "ASYNC_DATABASE": "false",
+    "SECRET_KEY": "test-secret",
+    "OLLAMA_BASE_URL": ollama_stub.url,
+    "OLLAMA_BASE_URLS": "[]",
+    "PRELOAD_MODELS": "[]",
+    "DEFAULT_MODEL": "llama2",
+    "MODEL_CONCURRENCY": '{"tinyllama": 1000}',
+    "OLLAMA_MAX_CONNECTIONS": "1000",
+    "PASSWORD_BCRYPT_ROUNDS": "4",
+    "SUMMARY_ENABLED": "false",
+    "SEMANTIC_SEARCH_ENABLED": "false",
+    "GENERATION_CACHE_ENABLED": "false",
+})
+
+
+@pytest.fixture(scope="session")
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def stub() -> OllamaStub:
+    return ollama_stub
+
+
+@pytest.fixture(autouse=True)
+def _reset_stub():
+    ollama_stub.reset()
+    yield
+    ollama_stub.reset()
+
+
+@pytest.fixture(scope="session")
+def app_server() -> ServerThread:
+    migrate_database()
+    from app.main import app
+
+    server = ServerThread(app, lifespan="on").start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def app_url(app_server) -> str:
+    return app_server.url
+
+
+@pytest.fixture(scope="session")
+def async_engine():
+    """The engine ASYNC_DATABASE would create, for tests of that mode."""
+    from app.core import database
+
+    engine = database.create_database_engine(database.get_async_database_url(), use_async=True)
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture(params=["sync", "async"])
+def db_mode(request, monkeypatch) -> str:
+    """Run a test once per database mode (ASYNC_DATABASE off and on)."""
+    from app.core import database
+    from app.core.config import settings
+
+    if request.param == "async":
+        monkeypatch.setattr(database, "async_engine", request.getfixturevalue("async_engine"))
+    monkeypatch.setattr(settings, "ASYNC_DATABASE", request.param == "async")
+    return request.param
+
+
+@pytest.fixture
+def db_engine(db_mode):
+    """The (sync view of the) engine the app uses in the current mode."""
+    from app.core import database
+
+    return database.async_engine.sync_engine if db_mode == "async" else database.engine
+
+
+@pytest.fixture
+def api(app_url):
+    with httpx.Client(base_url=f"{app_url}/api/v1", timeout=30) as client:
+        yield client
+
+
+def register(api: httpx.Client) -> dict[str, str]:
+    """Register and log in a fresh user; returns the auth headers."""
+    name = f"user{uuid.uuid4().hex[:12]}"
+    password = "password123"
+    response = api.post("/auth/register", json={
+        "email": f"{name}@example.com", "username": name, "password": password})
+    assert response.status_code == 201, response.text
+    response = api.post("/auth/login", json={"username": name, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(api) -> dict[str, str]:
+    return register(api)
+
+
+@pytest.fixture
+def chat_id(api, auth_headers) -> str:
+    response = api.post("/chats", json={"title": "Test chat", "model": "llama2"}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
@@ -0,0 +1,230 @@
+"""
+Servers on real sockets for tests and benchmarks: a stub Ollama and
+the app itself, each run by uvicorn on its own thread and event loop.
+"""
+import asyncio
+import concurrent.futures
+import json
+import socket
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import uvicorn
+from sqlalchemy import Engine, event
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+
+
+def migrate_database() -> None:
+    """Upgrade the database at DATABASE_URL to the latest revision."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(SERVER_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(SERVER_DIR / "app" / "alembic"))
+    command.upgrade(config, "head")
+
+
+class QueryCounter:
+    """Statements (by leading keyword) and commits seen on an engine."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+        self.commits = 0
+
+    @property
+    def by_kind(self) -> Counter:
+        return Counter(statement.split(None, 1)[0].upper() for statement in self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+
+    def _on_commit(self, conn) -> None:
+        self.commits += 1
+
+    @contextmanager
+    def watch(self, engine: Engine) -> Iterator["QueryCounter"]:
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+        try:
+            yield self
+        finally:
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+            event.remove(engine, "commit", self._on_commit)
+
+
+class ServerThread:
+    """Serve an ASGI app with uvicorn on 127.0.0.1 and an ephemeral port."""
+
+    def __init__(self, app, lifespan: str = "off"):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(("127.0.0.1", 0))
+        self.url = "http://127.0.0.1:%d" % self.socket.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(
+            app,
+            lifespan=lifespan,
+            log_level="warning",
+            # Lots of concurrent streams in the concurrency tests
+            backlog=2048,
+            timeout_graceful_shutdown=1,
+        ))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        async def serve():
+            self.loop = asyncio.get_running_loop()
+            await self.server.serve(sockets=[self.socket])
+
+        # The same event loop implementation uvicorn.run would pick
+        with asyncio.Runner(loop_factory=self.server.config.get_loop_factory()) as runner:
+            runner.run(serve())
+
+    def start(self) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("server did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+    def submit(self, coroutine) -> "concurrent.futures.Future":
+        """Run a coroutine on the server's event loop."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+class OllamaStub:
+    """
+    Just enough of the Ollama HTTP API for the app: model listing,
+    streamed and non-streamed chat (preloads included) and embeddings.
+    Replies are `reply_tokens` tokens `token_delay` seconds apart, or
+    endless when `reply_tokens` is None; `fail_status` makes /api/chat
+    fail instead and `fail_after` breaks the stream after that many
+    tokens. While `released` is clear, streams are held open before
+    their first token. With `healthy` off, /api/ps (the health check)
+    fails. Counters record what the upstream actually produced, and
+    `chat_bodies` the /api/chat requests it got.
+    """
+
+    def __init__(self, models: tuple[str, ...] = ("llama2",)):
+        self.models = list(models)
+        self.reply_tokens: Optional[int] = 5
+        self.token_delay = 0.0
+        self.fail_status: Optional[int] = None
+        self.fail_after: Optional[int] = None
+        self.released = threading.Event()
+        self.released.set()
+        self.healthy = True
+        self.tokens_produced = 0
+        self.last_token_at = 0.0
+        self.active_streams = 0
+        self.max_active_streams = 0
+        self.chat_requests = 0
+        self.chat_bodies: list[dict] = []
+        self._server = ServerThread(Starlette(routes=[
+            Route("/api/tags", self._tags),
+            Route("/api/ps", self._ps),
+            Route("/api/chat", self._chat, methods=["POST"]),
+            Route("/api/embed", self._embed, methods=["POST"]),
+        ]))
+        self.url = self._server.url
+
+    def start(self) -> "OllamaStub":
+        self._server.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.stop()
+
+    def reset(
+        self,
+        reply_tokens: Optional[int] = 5,
+        token_delay: float = 0.0,
+        fail_status: Optional[int] = None,
+        fail_after: Optional[int] = None
+    ) -> None:
+        self.reply_tokens = reply_tokens
+        self.token_delay = token_delay
+        self.fail_status = fail_status
+        self.fail_after = fail_after
+        self.released.set()
+        self.healthy = True
+        self.tokens_produced = 0
+        self.last_token_at = 0.0
+        self.max_active_streams = self.active_streams
+        self.chat_requests = 0
+        self.chat_bodies = []
+
+    async def _tags(self, request: Request) -> Response:
+        return JSONResponse({"models": [
+            {"name": name, "model": name, "size": 1} for name in self.models
+        ]})
+
+    async def _ps(self, request: Request) -> Response:
+        if not self.healthy:
+            return JSONResponse({"error": "stub down"}, status_code=503)
+        return JSONResponse({"models": [
+            {"name": name, "model": name} for name in self.models
+        ]})
+
+    async def _embed(self, request: Request) -> Response:
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return JSONResponse({"embeddings": [
+            [float(len(text) % 7), 1.0, float(i)] for i, text in enumerate(texts)
+        ]})
+
+    async def _chat(self, request: Request) -> Response:
+        self.chat_requests += 1
+        body = await request.json()
+        self.chat_bodies.append(body)
+        if self.fail_status is not None:
+            return JSONResponse({"error": "stub failure"}, status_code=self.fail_status)
+        if body.get("stream") is False:
+            return JSONResponse({
+                "message": {"role": "assistant", "content": "A summary."},
+                "done": True,
+            })
+        return StreamingResponse(self._tokens(), media_type="application/x-ndjson")
+
+    async def _tokens(self):
+        self.active_streams += 1
+        self.max_active_streams = max(self.max_active_streams, self.active_streams)
+        try:
+            while not self.released.is_set():
+                await asyncio.sleep(0.01)
+            i = 0
+            while self.reply_tokens is None or i < self.reply_tokens:
+                if self.fail_after is not None and i >= self.fail_after:
+                    raise RuntimeError("stub stream broke")
+                if self.token_delay:
+                    await asyncio.sleep(self.token_delay)
+                self.tokens_produced += 1
+                self.last_token_at = time.monotonic()
+                yield (json.dumps({
+                    "message": {"role": "assistant", "content": f"tok{i} "},
+                    "done": False,
+                }) + "\n").encode()
+                i += 1
+            yield (json.dumps({
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "prompt_eval_count": 5,
+                "eval_count": i,
+            }) + "\n").encode()
+        finally:
+            self.active_streams -= 1
@@ -0,0 +1,53 @@
+"""
+Chat import: each batch is its own transaction, yet a failed import
+leaves nothing behind, and timestamps with and without offsets mix.
+"""
+import json
+import uuid
+
+import pytest
+
+
+def ndjson(*records: dict) -> bytes:
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+def chat_records(messages: int, created_at: str = "2025-01-01T00:00:00") -> list[dict]:
+    chat_id = str(uuid.uuid4())
+    return [{"type": "chat", "id": chat_id, "title": "Imported", "model": "llama2"}] + [
+        {"type": "message", "chat_id": chat_id, "role": "user", "content": f"m{i}",
+         "created_at": created_at}
+        for i in range(messages)
+    ]
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "TRANSFER_BATCH_SIZE", 3)
+
+
+def test_failed_import_keeps_nothing(api, db_mode, small_batches, auth_headers):
+    # Several batches are written before the bad line is reached
+    body = ndjson(*chat_records(4), *chat_records(4), {"type": "bogus"})
+
+    response = api.post("/chats/import", content=body, headers=auth_headers)
+
+    assert response.status_code == 400, response.text
+    assert api.get("/chats", headers=auth_headers).json()["total"] == 0
+
+
+def test_naive_and_aware_timestamps_mix(api, db_mode, small_batches, auth_headers):
+    records = chat_records(2, created_at="2025-01-01T12:00:00")
+    records += [
+        {**records[1], "created_at": "2025-01-01T13:30:00+02:00"},
+        {**records[1], "created_at": "2025-01-01T11:45:00Z"},
+    ]
+
+    response = api.post("/chats/import", content=ndjson(*records), headers=auth_headers)
+
+    assert response.status_code == 201, response.text
+    assert response.json() == {"chats": 1, "messages": 4}
+    chat = api.get("/chats", headers=auth_headers).json()["items"][0]
+    assert chat["message_count"] == 4
@@ -0,0 +1,82 @@
+"""
+The event loop stays responsive under mixed streaming and CRUD load:
+database work, sync or async, never blocks it for long.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+PROBE_INTERVAL = 0.005
+LOAD_SECONDS = 2.0
+STREAMS = 20
+CRUD_CLIENTS = 4
+
+
+async def measure_lag(until: float) -> list[float]:
+    """How late each short sleep on the server's loop woke up, in seconds."""
+    lags = []
+    loop = asyncio.get_running_loop()
+    while loop.time() < until:
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(loop.time() - expected)
+    return lags
+
+
+async def test_event_loop_lag_under_load(app_server, db_mode, stub, api, auth_headers):
+    response = api.post(
+        "/chats", json={"title": "Streaming", "model": "tinyllama"}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    chat_id = response.json()["id"]
+    stub.reset(reply_tokens=None, token_delay=0.005)
+    deadline = time.monotonic() + LOAD_SECONDS
+
+    async def streamer(client: httpx.AsyncClient) -> int:
+        turns = 0
+        while time.monotonic() < deadline:
+            async with client.stream(
+                "POST", "/messages/stream", json={"chat_id": chat_id, "message": "hi"},
+                headers=auth_headers
+            ) as response:
+                assert response.status_code == 200
+                async for _ in response.aiter_lines():
+                    if time.monotonic() >= deadline:
+                        break
+            turns += 1
+        return turns
+
+    async def crud(client: httpx.AsyncClient) -> int:
+        requests = 0
+        while time.monotonic() < deadline:
+            created = await client.post(
+                "/chats", json={"title": "Load", "model": "llama2"}, headers=auth_headers)
+            assert created.status_code == 201, created.text
+            listed = await client.get("/chats", headers=auth_headers)
+            assert listed.status_code == 200
+            renamed = await client.put(
+                f"/chats/{created.json()['id']}", json={"title": "Renamed"}, headers=auth_headers)
+            assert renamed.status_code == 200
+            requests += 3
+        return requests
+
+    probe = app_server.submit(measure_lag(app_server.loop.time() + LOAD_SECONDS))
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(
+        base_url=f"{app_server.url}/api/v1", timeout=30, limits=limits
+    ) as client:
+        results = await asyncio.gather(
+            *(streamer(client) for _ in range(STREAMS)),
+            *(crud(client) for _ in range(CRUD_CLIENTS)),
+        )
+    lags = sorted(await asyncio.wrap_future(probe))
+
+    assert all(results), "every client got work done"
+    # Generous for a loaded single-CPU runner; a blocking call such as a
+    # bcrypt hash or a synchronous query on the loop blows well past these
+    p99 = lags[int(len(lags) * 0.99)]
+    assert p99 < 0.1, f"loop lag p99 {p99 * 1000:.1f} ms"
+    assert lags[-1] < 0.5, f"loop lag max {lags[-1] * 1000:.1f} ms"
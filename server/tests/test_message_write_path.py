@@ -0,0 +1,87 @@
+"""
+Round trips of the message write path: one owner-scoped
+UPDATE ... RETURNING plus the INSERT per message, one commit each, and
+the chat loaded once per request.
+"""
+from uuid import UUID
+
+import pytest
+
+from tests.conftest import register
+from tests.support import QueryCounter
+
+
+def test_streamed_turn_round_trips(api, db_mode, db_engine, auth_headers, chat_id):
+    # Warm the auth caches so only the turn itself touches the database
+    assert api.get("/users/me", headers=auth_headers).status_code == 200
+
+    with QueryCounter().watch(db_engine) as queries:
+        response = api.post(
+            "/messages/stream",
+            json={"chat_id": chat_id, "message": "hello"},
+            headers=auth_headers,
+        )
+    assert response.status_code == 200
+    assert "[DONE]" in response.text
+
+    # SELECTs: the chat (admission, reused for context) and the context window;
+    # then UPDATE chats ... RETURNING + INSERT for each of the two messages
+    assert queries.by_kind == {"SELECT": 2, "UPDATE": 2, "INSERT": 2}, queries.statements
+    assert queries.commits == 2
+
+    chat = api.get(f"/chats/{chat_id}", headers=auth_headers).json()
+    assert chat["message_count"] == 2
+
+
+def test_create_message_round_trips(app_url, auth_headers, chat_id):
+    from app.core.database import engine, session_scope
+    from app.models.message import MessageRole
+    from app.models.user import User
+    from app.schemas.message import MessageCreate
+    from app.services.message_service import MessageService
+
+    with session_scope() as session:
+        owner = session.get(User, UUID(_chat_owner(chat_id)))
+        session.expunge(owner)
+
+    with QueryCounter().watch(engine) as queries:
+        with session_scope() as session:
+            MessageService(session).create_message(
+                UUID(chat_id), MessageCreate(role=MessageRole.USER, content="hi"), owner)
+
+    assert queries.by_kind == {"UPDATE": 1, "INSERT": 1}, queries.statements
+    assert "RETURNING" in queries.statements[0]
+    assert queries.commits == 1
+
+
+def test_create_message_rejects_foreign_chat(api, app_url, chat_id):
+    from app.core.database import engine, session_scope
+    from app.models.message import MessageRole
+    from app.models.user import User
+    from app.schemas.message import MessageCreate
+    from app.services.message_service import MessageService
+    from app.utils.exceptions import NotFoundException
+    from sqlmodel import select
+
+    other_headers = register(api)
+    other_id = api.get("/users/me", headers=other_headers).json()["id"]
+    with session_scope() as session:
+        other = session.exec(select(User).where(User.id == UUID(other_id))).one()
+        session.expunge(other)
+
+    with QueryCounter().watch(engine) as queries:
+        with session_scope() as session, pytest.raises(NotFoundException):
+            MessageService(session).create_message(
+                UUID(chat_id), MessageCreate(role=MessageRole.USER, content="hi"), other)
+
+    # The ownership check is the UPDATE itself; nothing is inserted
+    assert queries.by_kind == {"UPDATE": 1}, queries.statements
+    assert queries.commits == 0
+
+
+def _chat_owner(chat_id: str) -> str:
+    from app.core.database import session_scope
+    from app.models.chat import Chat
+
+    with session_scope() as session:
+        return str(session.get(Chat, UUID(chat_id)).user_id)
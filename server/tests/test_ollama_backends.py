@@ -0,0 +1,148 @@
+"""
+BackendPool routing across three stub Ollamas: least-loaded spreading,
+per-chat affinity that outlives its TTL while the chat stays active,
+ejection after failed health checks and re-admission on recovery, and
+preferring the backend that already has the model loaded.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.core.http_client import create_http_client
+from app.services.model_residency import ModelResidency
+from app.services.ollama_service import OllamaService
+from tests.support import OllamaStub
+
+pytestmark = pytest.mark.anyio
+
+AFFINITY_TTL = 0.3
+
+
+@pytest.fixture(scope="module")
+def stubs() -> list[OllamaStub]:
+    # Only the middle one has "tinyllama" loaded
+    started = [
+        OllamaStub(models=("llama2",)).start(),
+        OllamaStub(models=("llama2", "tinyllama")).start(),
+        OllamaStub(models=("llama2",)).start(),
+    ]
+    yield started
+    for stub in started:
+        stub.stop()
+
+
+@pytest.fixture
+def pool(stubs, monkeypatch):
+    """A fresh pool over the stubs, in place of the app-wide one."""
+    from app.core.config import settings
+    from app.services import model_residency, ollama_backends, ollama_service
+
+    for stub in stubs:
+        stub.reset()
+    monkeypatch.setattr(settings, "OLLAMA_AFFINITY_TTL_SECONDS", AFFINITY_TTL)
+    monkeypatch.setattr(settings, "OLLAMA_UNHEALTHY_AFTER_FAILURES", 2)
+    monkeypatch.setattr(settings, "OLLAMA_HEALTHY_AFTER_SUCCESSES", 1)
+    pool = ollama_backends.BackendPool([stub.url for stub in stubs])
+    for module in (ollama_backends, ollama_service, model_residency):
+        monkeypatch.setattr(module, "backend_pool", pool)
+    yield pool
+    for stub in stubs:
+        stub.reset()
+
+
+async def turn(service: OllamaService, affinity_key: str = None) -> None:
+    async for _ in service.generate_stream("hi", model="llama2", affinity_key=affinity_key):
+        pass
+
+
+def served_by(stubs: list[OllamaStub], before: list[int]) -> list[int]:
+    """Indexes of the stubs that got a chat request since `before`."""
+    return [i for i, stub in enumerate(stubs) if stub.chat_requests > before[i]]
+
+
+async def test_least_loaded_spreads_streams(pool, stubs):
+    for stub in stubs:
+        stub.released.clear()
+
+    async with create_http_client() as client:
+        service = OllamaService(client)
+        tasks = [asyncio.create_task(turn(service)) for _ in range(6)]
+        try:
+            deadline = time.monotonic() + 10
+            while sum(stub.active_streams for stub in stubs) < 6 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            assert [stub.active_streams for stub in stubs] == [2, 2, 2]
+            assert [backend.in_flight for backend in pool.backends] == [2, 2, 2]
+        finally:
+            for stub in stubs:
+                stub.released.set()
+            await asyncio.gather(*tasks)
+
+    assert [backend.in_flight for backend in pool.backends] == [0, 0, 0]
+
+
+async def test_affinity_sticks_and_refreshes_on_hits(pool, stubs):
+    async with create_http_client() as client:
+        service = OllamaService(client)
+        before = [stub.chat_requests for stub in stubs]
+        await turn(service, affinity_key="chat")
+        [home] = served_by(stubs, before)
+
+        # Turns closer together than the TTL, spanning several TTLs in all
+        for _ in range(6):
+            await asyncio.sleep(AFFINITY_TTL / 2)
+            before = [stub.chat_requests for stub in stubs]
+            await turn(service, affinity_key="chat")
+            assert served_by(stubs, before) == [home]
+
+        # A busier home is still preferred within the slack...
+        with pool.lease(pool.backends[home]), pool.lease(pool.backends[home]):
+            assert pool.select("llama2", "chat") is pool.backends[home]
+            # ...but not beyond it
+            with pool.lease(pool.backends[home]):
+                assert pool.select("llama2", "chat") is not pool.backends[home]
+
+
+async def test_failed_health_checks_eject_until_recovery(pool, stubs):
+    down = pool.backends[2]
+    residency = ModelResidency()
+
+    async with create_http_client() as client:
+        service = OllamaService(client)
+        stubs[2].healthy = False
+
+        await residency.refresh(service)
+        assert down.healthy, "one failed check is not enough to eject"
+        await residency.refresh(service)
+        assert not down.healthy
+        assert down.ejections == 1
+        assert {pool.select("llama2") for _ in range(12)} == set(pool.backends[:2])
+
+        before = [stub.chat_requests for stub in stubs]
+        for _ in range(4):
+            await turn(service)
+        assert stubs[2].chat_requests == before[2]
+
+        stubs[2].healthy = True
+        await residency.refresh(service)
+        assert down.healthy
+        assert down.ejections == 1
+        assert {pool.select("llama2") for _ in range(12)} == set(pool.backends)
+
+
+async def test_prefers_backend_with_model_loaded(pool, stubs):
+    async with create_http_client() as client:
+        await ModelResidency().refresh(OllamaService(client))
+
+    warm = pool.backends[1]
+    assert [backend.has_model("tinyllama") for backend in pool.backends] == [False, True, False]
+    assert {pool.select("tinyllama") for _ in range(12)} == {warm}
+
+    # Even when it is the busiest, and for a chat last served elsewhere
+    assert pool.select("llama2", "chat", exclude=[warm]) is not warm
+    with pool.lease(warm), pool.lease(warm), pool.lease(warm):
+        assert pool.select("tinyllama", "chat") is warm
+
+    # A model loaded nowhere goes to any of them
+    assert {pool.select("mistral") for _ in range(12)} == set(pool.backends)
@@ -0,0 +1,127 @@
+"""
+The semantic indexer's queue: failing messages are skipped instead of
+stalling the batch, an unreachable embedder is retried without blaming
+messages, switching embedding models back and forth re-embeds
+everything once, and concurrent searches load a user's index once.
+"""
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+import pytest
+
+from app.core.database import session_scope
+from app.models.message import Message, MessageRole
+from app.services.embeddings import FakeEmbedder
+from app.services.semantic_search import SemanticSearch
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyEmbedder(FakeEmbedder):
+    """Fails any batch containing `poison`, or everything when `down`."""
+
+    def __init__(self, poison: Optional[str] = None):
+        super().__init__(dim=16)
+        self.poison = poison
+        self.down = False
+
+    async def embed(self, texts):
+        if self.down or (self.poison and any(self.poison in text for text in texts)):
+            raise RuntimeError("embedding failed")
+        return await super().embed(texts)
+
+
+def add_messages(chat_id: str, contents: list[str]) -> list[UUID]:
+    with session_scope() as session:
+        messages = [
+            Message(chat_id=UUID(chat_id), role=MessageRole.USER, content=content)
+            for content in contents
+        ]
+        session.add_all(messages)
+        session.commit()
+        return [message.id for message in messages]
+
+
+def embedded_models(ids: list[UUID]) -> list:
+    with session_scope() as session:
+        return [session.get(Message, message_id).embedded_model for message_id in ids]
+
+
+async def drain(search: SemanticSearch, embedder) -> None:
+    """Index until a batch stores nothing, as the indexer loop does."""
+    for _ in range(1000):
+        if not await search.index_pending(embedder):
+            return
+    pytest.fail("the indexer never ran out of work")
+
+
+async def test_failing_message_is_skipped(app_url, chat_id, monkeypatch):
+    from app.core.config import settings
+
+    search, embedder = SemanticSearch(), FlakyEmbedder(poison="poison")
+    await drain(search, embedder)
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 2)
+    poison = add_messages(chat_id, ["poison pill"])
+    good = add_messages(chat_id, [f"message {i}" for i in range(6)])
+
+    # Each pass pairs the poisoned message with the next good one, which
+    # still gets through, until the poisoned one runs out of attempts
+    for i in range(settings.EMBEDDING_MAX_ATTEMPTS):
+        assert await search.index_pending(embedder) == 1
+        assert embedded_models(good[:i + 1]) == [embedder.model] * (i + 1)
+    await drain(search, embedder)
+
+    assert embedded_models(good) == [embedder.model] * 6
+    assert embedded_models(poison) == [None]
+    assert search.stats()["skipped"] == 1
+    assert await search.index_pending(embedder) == 0
+
+
+async def test_unreachable_embedder_does_not_skip(app_url, chat_id):
+    search, embedder = SemanticSearch(), FlakyEmbedder()
+    await drain(search, embedder)
+    ids = add_messages(chat_id, ["one", "two", "three"])
+
+    embedder.down = True
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            await search.index_pending(embedder)
+    assert search.stats()["skipped"] == 0
+
+    embedder.down = False
+    await drain(search, embedder)
+    assert embedded_models(ids) == [embedder.model] * 3
+
+
+async def test_switching_models_back_and_forth(app_url, db_mode, chat_id, monkeypatch):
+    from app.core.config import settings
+
+    search = SemanticSearch()
+    await drain(search, FakeEmbedder(dim=256))
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 4)
+    ids = add_messages(chat_id, [f"message {i}" for i in range(6)])
+
+    for embedder in (FakeEmbedder(dim=256), FakeEmbedder(dim=128), FakeEmbedder(dim=256)):
+        await search._reset_other_models(embedder.model)
+        await drain(search, embedder)
+        assert embedded_models(ids) == [embedder.model] * 6
+
+
+async def test_concurrent_searches_load_index_once(app_url, chat_id, monkeypatch):
+    search = SemanticSearch()
+    user_id = UUID(chat_id)  # any key; the load is what is counted
+    loads = 0
+    original = search._get_user_embeddings
+
+    def counting_load(*args):
+        nonlocal loads
+        loads += 1
+        return original(*args)
+
+    monkeypatch.setattr(search, "_get_user_embeddings", counting_load)
+    indexes = await asyncio.gather(*(
+        search._index_for(user_id, "fake-16", 16) for _ in range(10)))
+
+    assert loads == 1
+    assert all(index is indexes[0] for index in indexes)
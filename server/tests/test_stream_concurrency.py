@@ -0,0 +1,50 @@
+"""
+Streams hold no database connection while they generate: hundreds of
+concurrent streams run on a handful of pooled connections.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+STREAMS = 200
+
+
+async def test_concurrent_streams_share_few_connections(app_url, db_engine, stub, auth_headers, api):
+    response = api.post(
+        "/chats", json={"title": "Busy chat", "model": "tinyllama"}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    chat_id = response.json()["id"]
+
+    async def stream(client: httpx.AsyncClient) -> str:
+        response = await client.post(
+            "/messages/stream", json={"chat_id": chat_id, "message": "hi"}, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return response.text
+
+    # Every stream is held open upstream until all of them are
+    stub.released.clear()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=f"{app_url}/api/v1", timeout=120, limits=limits) as client:
+        streams = asyncio.gather(*(stream(client) for _ in range(STREAMS)))
+        deadline = time.monotonic() + 60
+        while stub.active_streams < STREAMS and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        assert stub.active_streams == STREAMS
+
+        held = []
+        for _ in range(20):
+            held.append(db_engine.pool.checkedout())
+            await asyncio.sleep(0.01)
+        stub.released.set()
+        bodies = await streams
+
+    assert max(held) <= 2, held
+    errors = [body for body in bodies if "[DONE]" not in body or "[ERROR]" in body]
+    assert not errors, errors[0][-500:]
+
+    chat = api.get(f"/chats/{chat_id}", headers=auth_headers).json()
+    assert chat["message_count"] == 2 * STREAMS
@@ -0,0 +1,104 @@
+"""
+Stopping a stream stops the model: a client disconnect or an explicit
+cancel ends upstream token production within a bounded time and keeps
+the partial reply, while an upstream failure is reported and not saved.
+"""
+import time
+from typing import Iterator
+
+import httpx
+import pytest
+
+from app.services.generation_registry import generation_registry
+
+# Upstream must stop well within this after the client stops listening
+STOP_WITHIN = 1.0
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def assert_upstream_stopped(stub, stopped_at: float) -> None:
+    assert wait_for(lambda: stub.active_streams == 0, STOP_WITHIN), "upstream still streaming"
+    produced = stub.tokens_produced
+    time.sleep(0.3)
+    assert stub.tokens_produced == produced
+    assert stub.last_token_at - stopped_at < STOP_WITHIN
+
+
+def messages(api, chat_id: str, headers: dict) -> list[dict]:
+    response = api.get(f"/messages/chat/{chat_id}", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["items"]
+
+
+def iter_events(response: httpx.Response) -> Iterator[str]:
+    """The data of each SSE event, read through one iterator so the stream stays open."""
+    for line in response.iter_lines():
+        if line.startswith("data: "):
+            yield line[len("data: "):]
+
+
+def take(events: Iterator[str], count: int) -> list[str]:
+    return [next(events) for _ in range(count)]
+
+
+@pytest.fixture
+def endless(stub):
+    stub.reset(reply_tokens=None, token_delay=0.02)
+
+
+def test_disconnect_stops_upstream(api, stub, endless, auth_headers, chat_id):
+    with api.stream("POST", "/messages/stream", json={"chat_id": chat_id, "message": "hi"},
+                    headers=auth_headers) as response:
+        assert response.status_code == 200
+        take(iter_events(response), 3)
+    # Leaving the block closes the connection mid-stream
+    stopped_at = time.monotonic()
+
+    assert_upstream_stopped(stub, stopped_at)
+    assert wait_for(lambda: len(messages(api, chat_id, auth_headers)) == 2)
+    reply = messages(api, chat_id, auth_headers)[-1]
+    assert reply["role"] == "assistant" and reply["truncated"]
+
+
+def test_cancel_stops_upstream(api, stub, endless, auth_headers, chat_id):
+    with api.stream("POST", "/messages/stream", json={"chat_id": chat_id, "message": "hi"},
+                    headers=auth_headers) as response:
+        assert response.status_code == 200
+        events = iter_events(response)
+        take(events, 3)
+        generation_id = response.headers["X-Generation-Id"]
+
+        cancel = api.post(f"/messages/stream/{generation_id}/cancel", headers=auth_headers)
+        assert cancel.status_code == 204, cancel.text
+        stopped_at = time.monotonic()
+        # The stream itself finishes normally
+        assert list(events)[-1] == "[DONE]"
+        assert time.monotonic() - stopped_at < STOP_WITHIN
+
+    assert_upstream_stopped(stub, stopped_at)
+    reply = messages(api, chat_id, auth_headers)[-1]
+    assert reply["role"] == "assistant" and reply["truncated"]
+
+
+def test_upstream_failure_is_not_a_disconnect(api, stub, auth_headers, chat_id):
+    stub.reset(reply_tokens=None, token_delay=0.02, fail_after=5)
+    disconnected, failed = generation_registry.disconnected, generation_registry.failed
+
+    response = api.post(
+        "/messages/stream", json={"chat_id": chat_id, "message": "hi"}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert "[ERROR]" in response.text
+    assert generation_registry.failed == failed + 1
+    assert generation_registry.disconnected == disconnected
+    # Only the user's message; the broken reply is not kept
+    time.sleep(0.2)
+    assert [m["role"] for m in messages(api, chat_id, auth_headers)] == ["user"]
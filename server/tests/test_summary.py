@@ -0,0 +1,87 @@
+"""
+The rolling summary against the stub Ollama: one refresh folds the
+older turns into a stored summary, nothing is regenerated below the
+token threshold, and the next turn is sent the summary plus the turns
+after it, including those sharing a timestamp with the last folded one.
+"""
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import pytest
+
+from app.core.database import session_scope
+from app.core.http_client import create_http_client
+from app.models.chat import Chat
+from app.models.message import Message, MessageRole
+from app.services.context_builder import SUMMARY_PREFIX
+from app.services.ollama_service import OllamaService
+from app.services.summary_service import SummaryService
+
+pytestmark = pytest.mark.anyio
+
+KEEP = 3
+
+
+@pytest.fixture
+def summary_settings(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "SUMMARY_TRIGGER_TOKENS", 100)
+    monkeypatch.setattr(settings, "SUMMARY_KEEP_MESSAGES", KEEP)
+
+
+def add_turns(chat_id: str, count: int) -> list[Message]:
+    """`count` messages of 20 tokens, two to a timestamp, in (created_at, id) order."""
+    base = datetime(2025, 1, 1)
+    with session_scope() as session:
+        messages = [
+            Message(
+                chat_id=UUID(chat_id),
+                role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                content=f"turn {i}",
+                tokens=20,
+                created_at=base + timedelta(seconds=i // 2),
+            )
+            for i in range(count)
+        ]
+        session.add_all(messages)
+        session.commit()
+        for message in messages:
+            session.refresh(message)
+            session.expunge(message)
+    return sorted(messages, key=lambda msg: (msg.created_at, msg.id))
+
+
+def load_chat(chat_id: str) -> Chat:
+    with session_scope() as session:
+        return session.get(Chat, UUID(chat_id))
+
+
+async def test_refresh_folds_older_turns(api, stub, db_mode, summary_settings, auth_headers, chat_id):
+    # Nine foldable turns; the last folded one shares its timestamp with the first kept
+    messages = add_turns(chat_id, 9 + KEEP)
+    folded, kept = messages[:-KEEP], messages[-KEEP:]
+    assert folded[-1].created_at == kept[0].created_at
+
+    async with create_http_client() as client:
+        service = SummaryService(OllamaService(client))
+        assert await service.refresh(UUID(chat_id))
+        summary_requests = stub.chat_requests
+
+        chat = load_chat(chat_id)
+        assert chat.summary == "A summary."
+        assert chat.summarized_until == folded[-1].created_at
+        assert chat.summarized_until_id == folded[-1].id
+        assert "turn 0" in stub.chat_bodies[-1]["messages"][-1]["content"]
+
+        # Only KEEP turns (60 tokens) are unsummarized: below the threshold
+        assert not await service.refresh(UUID(chat_id))
+        assert stub.chat_requests == summary_requests
+
+    response = api.post(
+        "/messages/stream", json={"chat_id": chat_id, "message": "next"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+    sent = stub.chat_bodies[-1]["messages"]
+    assert sent[0] == {"role": "system", "content": f"{SUMMARY_PREFIX}\nA summary."}
+    assert [msg["content"] for msg in sent[1:]] == [msg.content for msg in kept] + ["next"]